@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Precomputes icon embeddings shipped in servers/fastapi/assets, so the
+FastAPI server doesn't embed every icon on its first search.
+
+Runs before the servers start (see start.js) and only rebuilds when the
+embeddings are missing or older than assets/icons.json. Pass --force to
+rebuild anyway.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FASTAPI_DIR = REPO_ROOT / "servers" / "fastapi"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    # Asset and model paths of the server are relative to its directory
+    os.chdir(FASTAPI_DIR)
+    sys.path.insert(0, str(FASTAPI_DIR))
+
+    from services.icon_finder_service import (
+        build_icon_embeddings,
+        icon_embeddings_are_stale,
+    )
+
+    if not args.force and not icon_embeddings_are_stale():
+        print("Icon embeddings are up to date")
+        return 0
+
+    build_icon_embeddings()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,13 @@ import os
 
 from fastapi import FastAPI
 
+from services.asset_resolver_service import ASSET_RESOLVER_SERVICE
+from services.chroma_janitor_service import CHROMA_JANITOR_SERVICE
 from services.database import create_db_and_tables
+from services.document_parser_pool import DOCUMENT_PARSER_POOL
+from services.kandinsky_client import KANDINSKY_CLIENT
+from services.process_pool_service import PROCESS_POOL_SERVICE
+from services.stock_image_client import STOCK_IMAGE_CLIENT
 from utils.get_env import get_app_data_directory_env
 from utils.model_availability import (
     check_llm_and_image_provider_api_or_model_availability,
@@ -14,10 +20,18 @@ from utils.model_availability import (
 async def app_lifespan(_: FastAPI):
     """
     Lifespan context manager for FastAPI application.
-    Initializes the application data directory and checks LLM model availability.
-
+    Initializes the application data directory, checks LLM model availability
+    and starts the chroma cleanup task.
+    Shuts down worker pools, background tasks and shared HTTP sessions on exit.
     """
     os.makedirs(get_app_data_directory_env(), exist_ok=True)
     await create_db_and_tables()
     await check_llm_and_image_provider_api_or_model_availability()
+    CHROMA_JANITOR_SERVICE.start()
     yield
+    await CHROMA_JANITOR_SERVICE.stop()
+    DOCUMENT_PARSER_POOL.shutdown()
+    PROCESS_POOL_SERVICE.shutdown()
+    await STOCK_IMAGE_CLIENT.close()
+    await KANDINSKY_CLIENT.close()
+    await ASSET_RESOLVER_SERVICE.close()
@@ -7,6 +7,7 @@ from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
 from services.database import get_async_session
 from services.image_generation_service import ImageGenerationService
+from services.resource_governor import RESOURCE_GOVERNOR, Priority
 from utils.asset_directory_utils import get_images_directory
 import os
 import uuid
@@ -23,7 +24,11 @@ async def generate_image(
     image_prompt = ImagePrompt(prompt=prompt)
     image_generation_service = ImageGenerationService(images_directory)
 
-    image = await image_generation_service.generate_image(image_prompt)
+    # Asked explicitly, so a new image is generated even for a known prompt
+    with RESOURCE_GOVERNOR.priority(Priority.INTERACTIVE):
+        image = await image_generation_service.generate_image(
+            image_prompt, use_cache=False
+        )
     if not isinstance(image, ImageAsset):
         return image
 
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from services.chroma_janitor_service import CHROMA_JANITOR_SERVICE
+from services.resource_governor import RESOURCE_GOVERNOR
+
+
+METRICS_ROUTER = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@METRICS_ROUTER.get("/chroma")
+async def get_chroma_metrics():
+    return await CHROMA_JANITOR_SERVICE.get_metrics()
+
+
+@METRICS_ROUTER.get("/resources")
+async def get_resource_metrics():
+    return RESOURCE_GOVERNOR.get_metrics()
@@ -16,9 +16,7 @@ from models.sse_response import (
     SSEResponse,
     SSEStatusResponse,
 )
-from services.temp_file_service import TEMP_FILE_SERVICE
 from services.database import get_async_session
-from services.documents_loader import DocumentsLoader
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline
 from utils.ppt_utils import get_presentation_title_from_outlines
 from services.document_processing_service import DOCUMENT_PROCESSING_SERVICE
@@ -35,8 +33,6 @@ async def stream_outlines(
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
 
-    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
-
     async def inner():
         retriever = None
         yield SSEStatusResponse(
@@ -45,12 +41,9 @@ async def stream_outlines(
 
         additional_context = ""
         if presentation.file_paths:
-            yield SSEStatusResponse(status="Processing documents...").to_string()
-            documents_loader = DocumentsLoader(file_paths=presentation.file_paths)
-            await documents_loader.load_documents(temp_dir)
-            documents = documents_loader.documents
-            if documents:
-                retriever = DOCUMENT_PROCESSING_SERVICE.get_retriever(presentation.id)
+            # Documents were already indexed when the presentation was created
+            retriever = DOCUMENT_PROCESSING_SERVICE.get_retriever(presentation.id)
+            if retriever:
                 yield SSEStatusResponse(status="Documents processed, generating outlines...").to_string()
 
         presentation_outlines_text = ""
@@ -83,7 +83,9 @@ async def process_pdf_slides(
 
             for i, screenshot_path in enumerate(screenshot_paths, 1):
                 # Move screenshot to permanent location
-                screenshot_filename = f"slide_{i}.png"
+                screenshot_filename = (
+                    f"slide_{i}{os.path.splitext(screenshot_path)[1] or '.png'}"
+                )
                 permanent_screenshot_path = os.path.join(
                     presentation_images_dir, screenshot_filename
                 )
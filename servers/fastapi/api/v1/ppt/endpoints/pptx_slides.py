@@ -13,6 +13,7 @@ import xml.etree.ElementTree as ET
 import re
 
 from services.documents_loader import DocumentsLoader
+from services.resource_governor import RESOURCE_GOVERNOR
 from utils.asset_directory_utils import get_images_directory
 import uuid
 from constants.documents import POWERPOINT_TYPES
@@ -362,7 +363,9 @@ async def process_pptx_slides(
                 zip(slide_xmls, screenshot_paths), 1
             ):
                 # Move screenshot to permanent location
-                screenshot_filename = f"slide_{i}.png"
+                screenshot_filename = (
+                    f"slide_{i}{os.path.splitext(screenshot_path)[1] or '.png'}"
+                )
                 permanent_screenshot_path = os.path.join(
                     presentation_images_dir, screenshot_filename
                 )
@@ -570,22 +573,24 @@ async def _convert_pptx_to_pdf(pptx_path: str, temp_dir: str) -> str:
         pdf_path = os.path.join(screenshots_dir, pdf_filename)
 
         try:
-            result = subprocess.run(
-                [
-                    "libreoffice",
-                    "--headless",
-                    "--convert-to",
-                    "pdf",
-                    "--outdir",
-                    screenshots_dir,
-                    pptx_path,
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=500,
-                env=env,
-            )
+            async with RESOURCE_GOVERNOR.slot("office"):
+                result = await asyncio.to_thread(
+                    subprocess.run,
+                    [
+                        "libreoffice",
+                        "--headless",
+                        "--convert-to",
+                        "pdf",
+                        "--outdir",
+                        screenshots_dir,
+                        pptx_path,
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                    timeout=500,
+                    env=env,
+                )
 
             print(f"LibreOffice PDF conversion output: {result.stdout}")
             if result.stderr:
@@ -9,12 +9,14 @@ from typing import Annotated, List, Literal, Optional, Tuple
 import dirtyjson
 from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Path
 from fastapi.responses import StreamingResponse
+from pathvalidate import sanitize_filename
 from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from constants.presentation import DEFAULT_TEMPLATES
 from enums.webhook_event import WebhookEvent
 from models.api_error_model import APIErrorModel
+from models.document_chunk import OUTLINE_MAX_LENGTH
 from models.generate_presentation_request import GeneratePresentationRequest
 from models.presentation_and_path import PresentationPathAndEditPath
 from models.presentation_from_template import EditPresentationRequest
@@ -32,20 +34,38 @@ from models.presentation_with_slides import (
 )
 from models.sql.template import TemplateModel
 
-from services.documents_loader import DocumentsLoader
 from services.webhook_service import WebhookService
 from utils.get_layout_by_name import get_layout_by_name
 from services.image_generation_service import ImageGenerationService
 from utils.dict_utils import deep_update
-from utils.export_utils import export_presentation
+from utils.export_utils import (
+    EXPORT_MEDIA_TYPES,
+    export_presentation,
+    get_content_disposition,
+    iterate_file,
+    open_presentation_export,
+    remove_expired_bulk_exports,
+    write_exports_zip,
+)
+from utils.get_env import (
+    get_bulk_export_concurrency_env,
+    get_bulk_export_max_age_env,
+)
+from services.resource_governor import RESOURCE_GOVERNOR, Priority
 from utils.llm_calls.generate_presentation_outlines import generate_ppt_outline
 from models.sql.slide import SlideModel
-from models.sse_response import SSECompleteResponse, SSEErrorResponse, SSEResponse
+from models.sse_response import (
+    SSECompleteResponse,
+    SSEErrorResponse,
+    SSEProgressResponse,
+    SSEResponse,
+)
 
 from services.database import get_async_session
 from services.temp_file_service import TEMP_FILE_SERVICE
 from services.concurrent_service import CONCURRENT_SERVICE
 from models.sql.presentation import PresentationModel
+from services.export_cache_service import EXPORT_CACHE_SERVICE
 from services.pptx_presentation_creator import PptxPresentationCreator
 from models.sql.async_presentation_generation_status import (
     AsyncPresentationGenerationTaskModel,
@@ -64,10 +84,13 @@ from utils.ppt_utils import (
 from utils.process_slides import (
     process_slide_add_placeholder_assets,
     process_slide_and_fetch_assets,
+    process_slides_and_fetch_icons,
 )
 import uuid
 from langchain_core.retrievers import BaseRetriever
 from services.document_processing_service import DOCUMENT_PROCESSING_SERVICE
+from services.documents_loader import DocumentsLoader
+from services.score_based_chunker import ScoreBasedChunker
 
 
 PRESENTATION_ROUTER = APIRouter(prefix="/presentation", tags=["Presentation"])
@@ -127,7 +150,8 @@ async def delete_presentation(
     await sql_session.delete(presentation)
     await sql_session.commit()
 
-    DOCUMENT_PROCESSING_SERVICE.cleanup(id)
+    DOCUMENT_PROCESSING_SERVICE.delete_index(id)
+    EXPORT_CACHE_SERVICE.delete(id)
 
 
 @PRESENTATION_ROUTER.post("/create", response_model=PresentationModel)
@@ -155,12 +179,9 @@ async def create_presentation(
 
     if file_paths:
         # Создаем векторную базу данных сразу при создании презентации
-        temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
-        documents_loader = DocumentsLoader(file_paths=file_paths)
-        await documents_loader.load_documents(temp_dir)
-        documents = documents_loader.documents
-        if documents:
-            DOCUMENT_PROCESSING_SERVICE.create_vectorstore(presentation_id, documents)
+        await DOCUMENT_PROCESSING_SERVICE.create_vectorstore_from_files(
+            presentation_id, file_paths
+        )
 
     presentation = PresentationModel(
         id=presentation_id,
@@ -334,8 +355,11 @@ async def stream_presentation(
             process_slide_add_placeholder_assets(slide)
 
             # This will mutate slide
+            # Icons are fetched for all slides at once after generation
             async_assets_generation_tasks.append(
-                process_slide_and_fetch_assets(image_generation_service, slide)
+                process_slide_and_fetch_assets(
+                    image_generation_service, slide, fetch_icons=False
+                )
             )
 
             yield SSEResponse(
@@ -348,7 +372,10 @@ async def stream_presentation(
             data=json.dumps({"type": "chunk", "chunk": " ] }"}),
         ).to_string()
 
-        generated_assets_lists = await asyncio.gather(*async_assets_generation_tasks)
+        generated_assets_lists, _ = await asyncio.gather(
+            asyncio.gather(*async_assets_generation_tasks),
+            process_slides_and_fetch_icons(slides),
+        )
         generated_assets = []
         for assets_list in generated_assets_lists:
             generated_assets.extend(assets_list)
@@ -423,14 +450,17 @@ async def export_presentation_as_pptx(
 ):
     temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
 
-    pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
-    await pptx_creator.create_ppt()
+    try:
+        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
+        await pptx_creator.create_ppt()
 
-    export_directory = get_exports_directory()
-    pptx_path = os.path.join(
-        export_directory, f"{pptx_model.name or uuid.uuid4()}.pptx"
-    )
-    pptx_creator.save(pptx_path)
+        export_directory = get_exports_directory()
+        pptx_path = os.path.join(
+            export_directory, f"{pptx_model.name or uuid.uuid4()}.pptx"
+        )
+        await asyncio.to_thread(pptx_creator.save, pptx_path)
+    finally:
+        await asyncio.to_thread(TEMP_FILE_SERVICE.cleanup_temp_dir, temp_dir)
 
     return pptx_path
 
@@ -460,6 +490,126 @@ async def export_presentation_as_pptx_or_pdf(
     )
 
 
+@PRESENTATION_ROUTER.post("/export/stream")
+async def stream_presentation_as_pptx_or_pdf(
+    id: Annotated[uuid.UUID, Body(description="Presentation ID to export")],
+    export_as: Annotated[
+        Literal["pptx", "pdf"], Body(description="Format to export the presentation as")
+    ] = "pptx",
+    sql_session: AsyncSession = Depends(get_async_session),
+):
+    presentation = await sql_session.get(PresentationModel, id)
+
+    if not presentation:
+        raise HTTPException(status_code=404, detail="Presentation not found")
+
+    file, filename = await open_presentation_export(
+        id, presentation.title, export_as
+    )
+    file.seek(0, os.SEEK_END)
+    content_length = file.tell()
+    file.seek(0)
+
+    return StreamingResponse(
+        iterate_file(file),
+        media_type=EXPORT_MEDIA_TYPES[export_as],
+        headers={
+            "Content-Disposition": get_content_disposition(filename),
+            "Content-Length": str(content_length),
+        },
+    )
+
+
+@PRESENTATION_ROUTER.post("/export/bulk")
+async def export_presentations_in_bulk(
+    ids: Annotated[List[uuid.UUID], Body(description="Presentation IDs to export")],
+    formats: Annotated[
+        List[Literal["pptx", "pdf"]],
+        Body(description="Formats to export every presentation as"),
+    ] = ["pptx"],
+    sql_session: AsyncSession = Depends(get_async_session),
+):
+    ids = list(dict.fromkeys(ids))
+    formats = list(dict.fromkeys(formats))
+    if not ids or not formats:
+        raise HTTPException(status_code=400, detail="No presentations to export")
+
+    presentations = {
+        presentation.id: presentation
+        for presentation in await sql_session.scalars(
+            select(PresentationModel).where(PresentationModel.id.in_(ids))
+        )
+    }
+    semaphore = asyncio.Semaphore(int(get_bulk_export_concurrency_env() or 4))
+
+    async def export_one(id: uuid.UUID, export_as: str):
+        presentation = presentations.get(id)
+        if not presentation:
+            raise HTTPException(status_code=404, detail="Presentation not found")
+        async with semaphore:
+            # Bulk exports give way to interactive requests
+            with RESOURCE_GOVERNOR.priority(Priority.BACKGROUND):
+                presentation_and_path = await export_presentation(
+                    id, presentation.title or str(id), export_as
+                )
+        filename = f"{sanitize_filename(presentation.title or str(id))}.{export_as}"
+        return presentation_and_path.path, filename
+
+    async def inner():
+        async def run(id: uuid.UUID, export_as: str):
+            try:
+                return id, export_as, await export_one(id, export_as), None
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                return id, export_as, None, detail
+
+        tasks = [
+            asyncio.create_task(run(id, export_as))
+            for id in ids
+            for export_as in formats
+        ]
+        exports = []
+        try:
+            for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+                id, export_as, export, error = await task
+                if export:
+                    exports.append(export)
+                else:
+                    print(f"Bulk export of {id} as {export_as} failed: {error}")
+                yield SSEProgressResponse(
+                    progress={
+                        "id": str(id),
+                        "export_as": export_as,
+                        "status": "error" if error else "done",
+                        "detail": error,
+                        "completed": completed,
+                        "total": len(tasks),
+                    }
+                ).to_string()
+        finally:
+            # Stops remaining exports when the client disconnects
+            for task in tasks:
+                task.cancel()
+
+        if not exports:
+            yield SSEErrorResponse(detail="No presentation could be exported").to_string()
+            return
+
+        bulk_directory = os.path.join(get_exports_directory(), "bulk")
+        os.makedirs(bulk_directory, exist_ok=True)
+        await asyncio.to_thread(
+            remove_expired_bulk_exports,
+            bulk_directory,
+            float(get_bulk_export_max_age_env() or 60 * 60),
+        )
+        zip_path = os.path.join(bulk_directory, f"{uuid.uuid4()}.zip")
+        await asyncio.to_thread(write_exports_zip, exports, zip_path)
+
+        yield SSECompleteResponse(key="path", value=zip_path).to_string()
+
+    return StreamingResponse(inner(), media_type="text/event-stream")
+
+
 async def check_if_api_request_is_valid(
     request: GeneratePresentationRequest,
     sql_session: AsyncSession = Depends(get_async_session),
@@ -503,6 +653,58 @@ async def check_if_api_request_is_valid(
     return (presentation_id,)
 
 
+def get_title_slide_outline(
+    content: Optional[str], documents: List[str]
+) -> SlideOutlineModel:
+    """
+    Title slide about the prompt, or else the first line of the documents,
+    which mostly is their title.
+    """
+    topic = (content or "").strip()
+    if not topic:
+        first_line = next(
+            (
+                line
+                for document in documents
+                for line in document.splitlines()
+                if line.strip()
+            ),
+            "",
+        )
+        topic = first_line.strip().lstrip("#").strip()
+    return SlideOutlineModel(content=f"Title slide: {topic}"[:OUTLINE_MAX_LENGTH])
+
+
+async def get_outlines_from_documents(
+    documents: List[str],
+    n_slides: int,
+    include_title_slide: bool = False,
+    content: Optional[str] = None,
+) -> Optional[PresentationOutlineModel]:
+    """
+    Picks the n most important sections of the documents by their headings and
+    uses them as slide outlines. With include_title_slide, a title slide comes
+    first and one section less is picked. Returns None if the documents have
+    too few headings.
+    """
+    n_chunks = n_slides - 1 if include_title_slide else n_slides
+    try:
+        chunks = (
+            await ScoreBasedChunker().get_n_chunks("\n\n".join(documents), n_chunks)
+            if n_chunks > 0
+            else []
+        )
+    except ValueError as e:
+        print(f"Generating outlines with LLM, document structure is not enough: {e}")
+        return None
+
+    print(f"Using {len(chunks)} document sections as outlines")
+    slides = [chunk.to_slide_outline() for chunk in chunks]
+    if include_title_slide:
+        slides.insert(0, get_title_slide_outline(content, documents))
+    return PresentationOutlineModel(slides=slides)
+
+
 async def generate_presentation_handler(
     request: GeneratePresentationRequest,
     presentation_id: uuid.UUID,
@@ -510,16 +712,17 @@ async def generate_presentation_handler(
     sql_session: AsyncSession = Depends(get_async_session),
 ):
     retriever: BaseRetriever | None = None
+    # Keeps the document collection from being collected while generating
+    DOCUMENT_PROCESSING_SERVICE.mark_active(presentation_id)
     try:
         using_slides_markdown = False
+        presentation_outlines: Optional[PresentationOutlineModel] = None
 
         if request.slides_markdown:
             using_slides_markdown = True
             request.n_slides = len(request.slides_markdown)
 
         if not using_slides_markdown:
-            additional_context = ""
-
             # Updating async status
             if async_status:
                 async_status.message = "Generating presentation outlines"
@@ -527,14 +730,15 @@ async def generate_presentation_handler(
                 sql_session.add(async_status)
                 await sql_session.commit()
 
+            documents: List[str] = []
             if request.files:
-                documents_loader = DocumentsLoader(file_paths=request.files)
-                await documents_loader.load_documents()
-                documents = documents_loader.documents
-                print("Documents loaded: ", len(documents))
-                if documents:
-                    # additional_context = "\n\n".join(documents)
-                    DOCUMENT_PROCESSING_SERVICE.create_vectorstore(presentation_id, documents)
+                # Document text is needed for outlines too, so files are parsed once
+                vectorstore = await DOCUMENT_PROCESSING_SERVICE.create_vectorstore_from_files(
+                    presentation_id,
+                    request.files,
+                    documents if request.outline_from_documents else None,
+                )
+                if vectorstore:
                     retriever = DOCUMENT_PROCESSING_SERVICE.get_retriever(presentation_id)
                     print("Retriever created")
 
@@ -553,22 +757,26 @@ async def generate_presentation_handler(
                     (request.n_slides - needed_toc_count) / 10
                 )
 
-            presentation_outlines_text = ""
+            if documents:
+                presentation_outlines = await get_outlines_from_documents(
+                    documents,
+                    n_slides_to_generate,
+                    request.include_title_slide,
+                    request.content,
+                )
 
-            additional_context = ''
-            if retriever:
-                print('Creating relevant docs in outlines')
-                relevant_docs = await retriever.ainvoke(request.content)
-                print('Relevant docs created', len(relevant_docs))
-                additional_context = "\n\n---\n\n".join([doc.page_content for doc in relevant_docs])
-                print('Additional context created', additional_context[:10])
-                print('Additional context len', len(additional_context))
+        if presentation_outlines:
+            total_outlines = n_slides_to_generate
 
+        elif not using_slides_markdown:
+            presentation_outlines_text = ""
+
+            # Relevant document chunks are retrieved inside generate_ppt_outline
             async for chunk in generate_ppt_outline(
                 request.content,
                 n_slides_to_generate,
                 request.language,
-                additional_context,
+                retriever,
                 request.tone.value,
                 request.verbosity.value,
                 request.instructions,
@@ -750,7 +958,9 @@ async def generate_presentation_handler(
 
             # Start asset fetch tasks for just-generated slides so they run while next batch is processed
             asset_tasks = [
-                process_slide_and_fetch_assets(image_generation_service, slide)
+                process_slide_and_fetch_assets(
+                    image_generation_service, slide, fetch_icons=False
+                )
                 for slide in batch_slides
             ]
             async_assets_generation_tasks.extend(asset_tasks)
@@ -762,7 +972,11 @@ async def generate_presentation_handler(
             await sql_session.commit()
 
         # Run all asset tasks concurrently while batches may still be generating content
-        generated_assets_list = await asyncio.gather(*async_assets_generation_tasks)
+        # Icons of the whole presentation are resolved in one batched search
+        generated_assets_list, _ = await asyncio.gather(
+            asyncio.gather(*async_assets_generation_tasks),
+            process_slides_and_fetch_icons(slides),
+        )
         generated_assets = []
         for assets_list in generated_assets_list:
             generated_assets.extend(assets_list)
@@ -834,6 +1048,7 @@ async def generate_presentation_handler(
 
     finally:
         DOCUMENT_PROCESSING_SERVICE.cleanup(presentation_id)
+        DOCUMENT_PROCESSING_SERVICE.mark_inactive(presentation_id)
 
 
 @PRESENTATION_ROUTER.post("/generate", response_model=PresentationPathAndEditPath)
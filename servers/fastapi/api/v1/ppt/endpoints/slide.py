@@ -6,7 +6,9 @@ import uuid
 from models.sql.presentation import PresentationModel
 from models.sql.slide import SlideModel
 from services.database import get_async_session
+from services.document_processing_service import DOCUMENT_PROCESSING_SERVICE
 from services.image_generation_service import ImageGenerationService
+from services.resource_governor import RESOURCE_GOVERNOR, Priority
 from utils.asset_directory_utils import get_images_directory
 from utils.llm_calls.edit_slide import get_edited_slide_content
 from utils.llm_calls.edit_slide_html import get_edited_slide_html
@@ -31,23 +33,29 @@ async def edit_slide(
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
 
-    presentation_layout = presentation.get_layout()
-    slide_layout = await get_slide_layout_from_prompt(
-        prompt, presentation_layout, slide
-    )
-
-    edited_slide_content = await get_edited_slide_content(
-        prompt, slide, presentation.language, slide_layout
-    )
-
-    image_generation_service = ImageGenerationService(get_images_directory())
-
-    # This will mutate edited_slide_content
-    new_assets = await process_old_and_new_slides_and_fetch_assets(
-        image_generation_service,
-        slide.content,
-        edited_slide_content,
-    )
+    # Single slide edits are waited for by the user, so they go before deck generation
+    with RESOURCE_GOVERNOR.priority(Priority.INTERACTIVE):
+        presentation_layout = presentation.get_layout()
+        slide_layout = await get_slide_layout_from_prompt(
+            prompt, presentation_layout, slide
+        )
+
+        edited_slide_content = await get_edited_slide_content(
+            prompt,
+            slide,
+            presentation.language,
+            slide_layout,
+            retriever=DOCUMENT_PROCESSING_SERVICE.get_retriever(presentation.id),
+        )
+
+        image_generation_service = ImageGenerationService(get_images_directory())
+
+        # This will mutate edited_slide_content
+        new_assets = await process_old_and_new_slides_and_fetch_assets(
+            image_generation_service,
+            slide.content,
+            edited_slide_content,
+        )
 
     # Always assign a new unique id to the slide
     slide.id = uuid.uuid4()
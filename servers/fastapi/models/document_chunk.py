@@ -3,11 +3,31 @@ from pydantic import BaseModel
 from models.presentation_outline_model import SlideOutlineModel
 
 
+# Generated slide outlines are 100 to 300 characters long
+OUTLINE_MAX_LENGTH = 300
+
+
 class DocumentChunk(BaseModel):
     heading: str
     content: str
     heading_index: int
     score: float
 
-    def to_slide_outline(self) -> SlideOutlineModel:
-        return SlideOutlineModel(content=f"{self.heading}\n{self.content}")
+    def to_slide_outline(self, max_length: int = OUTLINE_MAX_LENGTH) -> SlideOutlineModel:
+        """
+        Heading and the start of the section, cut at a sentence or word end
+        so the outline is as long as one generated by the LLM.
+        """
+        outline = f"{self.heading}\n{self.content}".strip()
+        if len(outline) <= max_length:
+            return SlideOutlineModel(content=outline)
+
+        outline = outline[: max_length - 1]
+        sentence_end = max(outline.rfind(". "), outline.rfind(".\n"))
+        if sentence_end > max_length // 2:
+            return SlideOutlineModel(content=outline[: sentence_end + 1])
+
+        word_end = max(outline.rfind(" "), outline.rfind("\n"))
+        if word_end > 0:
+            outline = outline[:word_end]
+        return SlideOutlineModel(content=f"{outline.rstrip()}…")
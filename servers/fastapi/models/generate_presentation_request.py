@@ -34,6 +34,10 @@ class GeneratePresentationRequest(BaseModel):
     files: Optional[List[str]] = Field(
         default=None, description="Files to use for the presentation"
     )
+    outline_from_documents: bool = Field(
+        default=False,
+        description="Whether to build slide outlines from the headings of the uploaded files instead of generating them",
+    )
     export_as: Literal["pptx", "pdf"] = Field(
         default="pptx", description="Export format"
     )
@@ -38,3 +38,13 @@ class SSECompleteResponse(BaseModel):
             event="response",
             data=json.dumps({"type": "complete", self.key: self.value}),
         ).to_string()
+
+
+class SSEProgressResponse(BaseModel):
+    progress: dict
+
+    def to_string(self):
+        return SSEResponse(
+            event="response",
+            data=json.dumps({"type": "progress", **self.progress}),
+        ).to_string()
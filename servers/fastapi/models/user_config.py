@@ -31,6 +31,7 @@ class UserConfig(BaseModel):
     PEXELS_API_KEY: Optional[str] = None
     PIXABAY_API_KEY: Optional[str] = None
     KANDINSKY_API_KEY: Optional[str] = None
+    KANDINSKY_SECRET_KEY: Optional[str] = None
 
     # Reasoning
     TOOL_CALLS: Optional[bool] = None
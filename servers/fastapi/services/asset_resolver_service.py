@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+
+from services.resource_governor import RESOURCE_GOVERNOR
+from utils.asset_directory_utils import get_remote_assets_directory
+from utils.get_env import (
+    get_app_data_directory_env,
+    get_remote_asset_cache_max_mb_env,
+    get_remote_asset_max_age_env,
+)
+
+
+STATIC_DIRECTORY = "static"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0"}
+
+
+class AssetResolverService:
+    """
+    Resolves picture urls of an export to local files.
+
+    Urls of our own assets (/app_data/..., /static/...) map straight to disk.
+    Other urls are downloaded once into a persistent cache keyed by url, which
+    is revalidated with ETag / Last-Modified after REMOTE_ASSET_MAX_AGE seconds.
+    All downloads share one pooled session and the governor's download slots.
+    """
+
+    def __init__(self):
+        self.max_age = float(get_remote_asset_max_age_env() or 60 * 60)
+        self.max_bytes = (
+            int(get_remote_asset_cache_max_mb_env() or 1024) * 1024 * 1024
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=60, connect=10),
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _join_inside(base_directory: str, relative_path: str) -> Optional[str]:
+        """
+        Returns the real path of relative_path in base_directory, None if it
+        points outside of it.
+        """
+        base_directory = os.path.realpath(base_directory)
+        local_path = os.path.realpath(os.path.join(base_directory, relative_path))
+        if os.path.commonpath([base_directory, local_path]) != base_directory:
+            return None
+        return local_path
+
+    @staticmethod
+    def get_local_path(url: str) -> Optional[str]:
+        """
+        Returns the file behind an url of our own assets if it exists.
+        Paths that lead out of the app data or static directory are rejected.
+        """
+        parsed_url = urlparse(url)
+        if parsed_url.scheme in ("http", "https"):
+            if (
+                parsed_url.hostname not in LOCAL_HOSTS
+                and not parsed_url.path.startswith("/app_data/")
+            ):
+                return None
+        elif parsed_url.scheme:
+            return None
+
+        path = unquote(parsed_url.path)
+        local_path = None
+        if "/app_data/" in path:
+            local_path = AssetResolverService._join_inside(
+                get_app_data_directory_env(), path.split("/app_data/", 1)[1]
+            )
+        elif path.startswith("/static/"):
+            local_path = AssetResolverService._join_inside(
+                STATIC_DIRECTORY, path[len("/static/") :]
+            )
+
+        if local_path and os.path.isfile(local_path):
+            return local_path
+        return None
+
+    @property
+    def cache_directory(self) -> str:
+        return get_remote_assets_directory()
+
+    def _get_cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_directory, key), os.path.join(
+            self.cache_directory, f"{key}.json"
+        )
+
+    def _read_metadata(self, metadata_path: str) -> Optional[dict]:
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.isfile(metadata.get("path", "")):
+            return None
+        return metadata
+
+    def _write_metadata(self, metadata_path: str, metadata: dict):
+        temp_path = f"{metadata_path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(temp_path, metadata_path)
+
+    def _get_total_bytes(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(
+                entry.stat().st_size
+                for entry in os.scandir(self.cache_directory)
+                if entry.is_file()
+            )
+        return self._total_bytes
+
+    def _evict(self):
+        with self._lock:
+            if self._get_total_bytes() <= self.max_bytes:
+                return
+            entries = [
+                entry
+                for entry in os.scandir(self.cache_directory)
+                if entry.is_file() and not entry.name.endswith((".json", ".tmp"))
+            ]
+            # Modification time is the LRU clock
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                base_path = os.path.splitext(entry.path)[0]
+                for path in (entry.path, f"{base_path}.json"):
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                        self._total_bytes -= size
+                    except OSError:
+                        pass
+
+    def _add_bytes(self, size: int):
+        with self._lock:
+            self._total_bytes = self._get_total_bytes() + size
+
+    async def _download(self, url: str, metadata: Optional[dict]) -> Optional[dict]:
+        cache_path, metadata_path = self._get_cache_paths(url)
+        headers = {}
+        if metadata and metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata and metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+        async with RESOURCE_GOVERNOR.slot("download"):
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304 and metadata:
+                    metadata["validated_at"] = time.time()
+                    self._write_metadata(metadata_path, metadata)
+                    return metadata
+
+                if response.status != 200:
+                    print(f"Failed to download {url}. HTTP status: {response.status}")
+                    return None
+
+                extension = os.path.splitext(urlparse(url).path)[1]
+                if not extension:
+                    content_type = response.headers.get("Content-Type", "")
+                    extension = (
+                        mimetypes.guess_extension(content_type.split(";")[0]) or ""
+                    )
+
+                # Written next to the cache entry and moved in place when complete
+                temp_path = f"{cache_path}.{uuid.uuid4()}.tmp"
+                size = 0
+                with open(temp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        f.write(chunk)
+                        size += len(chunk)
+                path = f"{cache_path}{extension}"
+                with self._lock:
+                    if metadata:
+                        try:
+                            size -= os.path.getsize(metadata["path"])
+                            if metadata["path"] != path:
+                                os.remove(metadata["path"])
+                        except FileNotFoundError:
+                            # Evicted meanwhile, eviction already counted it
+                            pass
+                    os.replace(temp_path, path)
+
+                metadata = {
+                    "url": url,
+                    "path": path,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "validated_at": time.time(),
+                }
+                self._write_metadata(metadata_path, metadata)
+                self._add_bytes(size)
+                return metadata
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        _, metadata_path = self._get_cache_paths(url)
+        metadata = await asyncio.to_thread(self._read_metadata, metadata_path)
+        if metadata and time.time() - metadata["validated_at"] < self.max_age:
+            return metadata["path"]
+
+        try:
+            new_metadata = await self._download(url, metadata)
+        except Exception as e:
+            print(f"Error downloading {url}: {e}")
+            new_metadata = None
+
+        if new_metadata:
+            await asyncio.to_thread(self._evict)
+            return new_metadata["path"]
+        # A stale copy is better than a missing picture
+        return metadata and metadata["path"]
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """
+        Returns the cached file of a remote url, downloading it if needed.
+        Concurrent requests for the same url share one download.
+        """
+        in_flight = self._in_flight.get(url)
+        if in_flight:
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[url] = future
+        path = None
+        try:
+            path = await self._fetch(url)
+            return path
+        finally:
+            future.set_result(path)
+            del self._in_flight[url]
+
+    def _link_into(self, cached_path: str, output_directory: str) -> Optional[str]:
+        """
+        Links a cache file into output_directory while eviction can't run.
+        Returns None if the file was evicted since it was fetched.
+        """
+        extension = os.path.splitext(cached_path)[1]
+        output_path = os.path.join(output_directory, f"{uuid.uuid4()}{extension}")
+        with self._lock:
+            if not os.path.isfile(cached_path):
+                return None
+            # Modification time is the LRU clock
+            os.utime(cached_path)
+            try:
+                os.link(cached_path, output_path)
+            except OSError:
+                shutil.copyfile(cached_path, output_path)
+        return output_path
+
+    async def fetch_into(self, url: str, output_directory: str) -> Optional[str]:
+        """
+        Fetches a remote url and links its cache file into output_directory.
+        A file evicted by a concurrent export before it was linked is
+        fetched again.
+        """
+        for _ in range(2):
+            cached_path = await self.fetch(url)
+            if not cached_path:
+                return None
+            output_path = await asyncio.to_thread(
+                self._link_into, cached_path, output_directory
+            )
+            if output_path:
+                return output_path
+            print(f"{url} was evicted from the asset cache, fetching it again")
+        return None
+
+    async def resolve(
+        self, urls: Iterable[str], output_directory: str
+    ) -> Dict[str, Optional[str]]:
+        """
+        Maps every distinct url to a local file, None if it can't be resolved.
+        Remote files are linked into output_directory, so cache eviction
+        can't remove them during the rest of the export.
+        """
+        distinct_urls: List[str] = list(dict.fromkeys(urls))
+        resolved: Dict[str, Optional[str]] = {}
+        remote_urls = []
+        for url in distinct_urls:
+            local_path = self.get_local_path(url)
+            if local_path:
+                resolved[url] = local_path
+            elif url.startswith("http"):
+                remote_urls.append(url)
+            else:
+                resolved[url] = url if os.path.isfile(url) else None
+
+        os.makedirs(output_directory, exist_ok=True)
+        output_paths = await asyncio.gather(
+            *[self.fetch_into(url, output_directory) for url in remote_urls]
+        )
+        resolved.update(zip(remote_urls, output_paths))
+
+        print(
+            f"Resolved {len(distinct_urls)} distinct assets, {len(remote_urls)} remote"
+        )
+        return resolved
+
+
+ASSET_RESOLVER_SERVICE = AssetResolverService()
@@ -0,0 +1,256 @@
+import asyncio
+from contextlib import closing
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlmodel import select
+
+from models.sql.presentation import PresentationModel
+from services.database import async_session_maker
+from services.db_clients import CHROMA_DIRECTORY
+from services.document_processing_service import DOCUMENT_PROCESSING_SERVICE
+from utils.get_env import (
+    get_chroma_collection_max_age_env,
+    get_chroma_disk_budget_mb_env,
+    get_chroma_janitor_interval_env,
+    get_chroma_orphan_grace_period_env,
+)
+
+
+def get_directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+class ChromaJanitorService:
+    """
+    Periodically cleans the persistent chroma directory through the chroma client:
+    - drops document collections whose presentation no longer exists and
+      which are not being indexed or used for generation,
+    - drops collections older than CHROMA_COLLECTION_MAX_AGE, e.g. of
+      presentations that were created but never generated,
+    - drops the oldest document collections while chroma uses more than the
+      disk budget, their compact indexes keep them available for editing.
+
+    Chroma only frees space on disk when it is vacuumed offline, so the budget
+    counts live data: the sqlite database without its free pages and the
+    segment directories chroma still references. Embedding models that older
+    versions downloaded into the chroma directory don't count.
+    """
+
+    def __init__(self):
+        self.directory = CHROMA_DIRECTORY
+        self.interval = float(get_chroma_janitor_interval_env() or 3600)
+        self.grace_period = float(get_chroma_orphan_grace_period_env() or 3600)
+        self.max_age = float(get_chroma_collection_max_age_env() or 24 * 60 * 60)
+        self.disk_budget_bytes = (
+            int(get_chroma_disk_budget_mb_env() or 0) * 1024 * 1024
+        )
+
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.last_run_at: Optional[float] = None
+        self.removed_orphans = 0
+        self.removed_expired = 0
+        self.evicted_for_budget = 0
+        self.reclaimed_bytes = 0
+
+    @property
+    def client(self):
+        return DOCUMENT_PROCESSING_SERVICE.client
+
+    @property
+    def database_path(self) -> str:
+        return os.path.join(self.directory, "chroma.sqlite3")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Chroma cleanup failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _list_document_collections(self) -> List[Tuple[str, uuid.UUID, float]]:
+        """
+        Returns (name, presentation id, created at) of every document collection.
+        Collections created before created_at was recorded count as old.
+        """
+        prefix = f"{DOCUMENT_PROCESSING_SERVICE.collection_prefix}-"
+        collections = []
+        for collection in self.client.list_collections():
+            if not collection.name.startswith(prefix):
+                continue
+            try:
+                presentation_id = uuid.UUID(collection.name[len(prefix) :])
+            except ValueError:
+                continue
+            created_at = (collection.metadata or {}).get("created_at", 0)
+            collections.append((collection.name, presentation_id, float(created_at)))
+        return collections
+
+    async def _get_live_presentation_ids(
+        self, presentation_ids: List[uuid.UUID]
+    ) -> Set[uuid.UUID]:
+        if not presentation_ids:
+            return set()
+        async with async_session_maker() as sql_session:
+            result = await sql_session.scalars(
+                select(PresentationModel.id).where(
+                    PresentationModel.id.in_(presentation_ids)
+                )
+            )
+            return set(result)
+
+    def _drop_collection(self, presentation_id: uuid.UUID, keep_index: bool):
+        if keep_index and not os.path.exists(
+            DOCUMENT_PROCESSING_SERVICE.get_compact_index_path(presentation_id)
+        ):
+            DOCUMENT_PROCESSING_SERVICE.save_compact_index(presentation_id)
+        DOCUMENT_PROCESSING_SERVICE.cleanup(presentation_id)
+
+    async def run_once(self):
+        async with self._lock:
+            used_before = await asyncio.to_thread(self.get_used_bytes)
+
+            collections = await asyncio.to_thread(self._list_document_collections)
+            live_ids = await self._get_live_presentation_ids(
+                [presentation_id for _, presentation_id, _ in collections]
+            )
+
+            now = time.time()
+            remaining = []
+            for name, presentation_id, created_at in collections:
+                if DOCUMENT_PROCESSING_SERVICE.is_active(presentation_id):
+                    continue
+                if presentation_id not in live_ids:
+                    if now - created_at < self.grace_period:
+                        continue
+                    print(f"Removing orphan chroma collection {name}")
+                    await asyncio.to_thread(
+                        self._drop_collection, presentation_id, False
+                    )
+                    self.removed_orphans += 1
+                elif now - created_at >= self.max_age:
+                    print(f"Removing expired chroma collection {name}")
+                    await asyncio.to_thread(
+                        self._drop_collection, presentation_id, True
+                    )
+                    self.removed_expired += 1
+                else:
+                    remaining.append((created_at, presentation_id))
+
+            if self.disk_budget_bytes:
+                await self._enforce_disk_budget(sorted(remaining))
+
+            used_after = await asyncio.to_thread(self.get_used_bytes)
+            self.reclaimed_bytes += max(0, used_before - used_after)
+            self.last_run_at = time.time()
+
+    async def _enforce_disk_budget(self, candidates: List[Tuple[float, uuid.UUID]]):
+        # Oldest collections go first
+        for _, presentation_id in candidates:
+            if await asyncio.to_thread(self.get_used_bytes) <= self.disk_budget_bytes:
+                return
+            if DOCUMENT_PROCESSING_SERVICE.is_active(presentation_id):
+                continue
+            print(f"Chroma is over disk budget, evicting collection of {presentation_id}")
+            await asyncio.to_thread(self._drop_collection, presentation_id, True)
+            self.evicted_for_budget += 1
+
+    def _read_database_stats(self) -> Tuple[int, Set[str]]:
+        """
+        Returns the size of free sqlite pages and the ids of referenced segments.
+        The database is opened read only, chroma keeps writing to it meanwhile.
+        """
+        if not os.path.exists(self.database_path):
+            return 0, set()
+        try:
+            with closing(
+                sqlite3.connect(
+                    f"file:{self.database_path}?mode=ro", uri=True, timeout=30
+                )
+            ) as connection:
+                page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+                free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                rows = connection.execute("SELECT id FROM segments").fetchall()
+        except sqlite3.Error as e:
+            print(f"Could not read chroma database stats: {e}")
+            return 0, set()
+        return page_size * free_pages, {str(row[0]) for row in rows}
+
+    def get_storage_usage(self) -> Dict[str, int]:
+        free_bytes, segment_ids = self._read_database_stats()
+        database_bytes = (
+            os.path.getsize(self.database_path)
+            if os.path.exists(self.database_path)
+            else 0
+        )
+        segment_bytes = 0
+        stale_segment_bytes = 0
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                # Embedding models were downloaded to chroma/models before
+                if not entry.is_dir() or entry.name == "models":
+                    continue
+                size = get_directory_size(entry.path)
+                if entry.name in segment_ids:
+                    segment_bytes += size
+                else:
+                    stale_segment_bytes += size
+        return {
+            "used_bytes": database_bytes - free_bytes + segment_bytes,
+            "sqlite_bytes": database_bytes,
+            "sqlite_free_bytes": free_bytes,
+            "segment_bytes": segment_bytes,
+            # Freed by running `chroma vacuum` while the server is stopped
+            "stale_segment_bytes": stale_segment_bytes,
+        }
+
+    def get_used_bytes(self) -> int:
+        return self.get_storage_usage()["used_bytes"]
+
+    def _collect_metrics(self) -> dict:
+        prefix = f"{DOCUMENT_PROCESSING_SERVICE.collection_prefix}-"
+        collection_names = [each.name for each in self.client.list_collections()]
+        return {
+            "collections": len(collection_names),
+            "document_collections": len(
+                [name for name in collection_names if name.startswith(prefix)]
+            ),
+            **self.get_storage_usage(),
+            "disk_budget_bytes": self.disk_budget_bytes or None,
+            "removed_orphans": self.removed_orphans,
+            "removed_expired": self.removed_expired,
+            "evicted_for_budget": self.evicted_for_budget,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run_at": self.last_run_at,
+        }
+
+    async def get_metrics(self) -> dict:
+        return await asyncio.to_thread(self._collect_metrics)
+
+
+CHROMA_JANITOR_SERVICE = ChromaJanitorService()
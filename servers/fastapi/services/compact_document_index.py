@@ -0,0 +1,135 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+
+MAGIC = b"PDIX"
+VERSION = 1
+# magic, version, number of chunks, embedding dimension
+HEADER = struct.Struct("<4sIII")
+
+
+class CompactDocumentIndex:
+    """
+    Read-only index of one presentation's documents stored in a single file:
+    int8 embeddings with a float32 scale per row, followed by zlib-compressed
+    chunk texts. The file is memory-mapped, only the matched chunks are
+    decompressed on search.
+
+    Layout: header | int8[n, dim] | float32[n] scales | uint64[n + 1] offsets | texts
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_rows, dim = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a compact document index")
+
+        offset = HEADER.size
+        self.vectors = np.frombuffer(
+            self._mmap, dtype=np.int8, count=n_rows * dim, offset=offset
+        ).reshape(n_rows, dim)
+        offset += n_rows * dim
+        self.scales = np.frombuffer(
+            self._mmap, dtype=np.float32, count=n_rows, offset=offset
+        )
+        offset += n_rows * 4
+        self.text_offsets = np.frombuffer(
+            self._mmap, dtype=np.uint64, count=n_rows + 1, offset=offset
+        )
+        self._texts_start = offset + (n_rows + 1) * 8
+
+    def __len__(self) -> int:
+        return len(self.scales)
+
+    @staticmethod
+    def write(
+        path: str,
+        embeddings: np.ndarray,
+        texts: List[str],
+        metadatas: Optional[List[Optional[dict]]] = None,
+    ):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(texts):
+            raise ValueError("Number of embeddings and texts must match")
+        if embeddings.ndim != 2:
+            embeddings = embeddings.reshape(len(texts), -1)
+        metadatas = metadatas or [None] * len(texts)
+
+        # Symmetric per-row quantization keeps cosine ranking of normalized vectors
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        vectors = np.round(embeddings / scales[:, np.newaxis]).astype(np.int8)
+
+        compressed_texts = [
+            zlib.compress(json.dumps([text, metadata or {}]).encode("utf-8"), 9)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        text_offsets = np.zeros(len(texts) + 1, dtype=np.uint64)
+        text_offsets[1:] = np.cumsum([len(each) for each in compressed_texts])
+
+        # Written next to the target and renamed, so readers never see a partial file
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, *vectors.shape))
+            file.write(vectors.tobytes())
+            file.write(scales.astype(np.float32).tobytes())
+            file.write(text_offsets.tobytes())
+            for each in compressed_texts:
+                file.write(each)
+        os.replace(temp_path, path)
+
+    def get_document(self, index: int) -> Document:
+        start = self._texts_start + int(self.text_offsets[index])
+        end = self._texts_start + int(self.text_offsets[index + 1])
+        text, metadata = json.loads(zlib.decompress(self._mmap[start:end]))
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Document, float]]:
+        if not len(self):
+            return []
+
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        scores = (self.vectors @ query_embedding) * self.scales
+
+        k = min(k, len(scores))
+        top_indices = np.argpartition(-scores, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-scores[top_indices])]
+        return [(self.get_document(int(i)), float(scores[i])) for i in top_indices]
+
+    def close(self):
+        self.vectors = self.scales = self.text_offsets = None
+        self._mmap.close()
+
+
+class CompactIndexRetriever(BaseRetriever):
+    """
+    Retriever over a CompactDocumentIndex file, the file is mapped only while a search runs.
+    """
+
+    index_path: str
+    embeddings: Embeddings
+    k: int = 5
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        query_embedding = self.embeddings.embed_query(query)
+        index = CompactDocumentIndex(self.index_path)
+        try:
+            return [document for document, _ in index.search(query_embedding, self.k)]
+        finally:
+            index.close()
@@ -1,3 +1,5 @@
 import chromadb
 
-chroma_client = chromadb.PersistentClient(path="chroma")
\ No newline at end of file
+CHROMA_DIRECTORY = "chroma"
+
+chroma_client = chromadb.PersistentClient(path=CHROMA_DIRECTORY)
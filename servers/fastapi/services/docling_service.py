@@ -28,6 +28,15 @@ class DoclingService:
             },
         )
 
+    def warm_up(self):
+        # Builds the DOCX and PPTX pipelines up front so the first file
+        # parsed by a long-lived converter does not pay for their setup
+        for input_format in (InputFormat.DOCX, InputFormat.PPTX):
+            try:
+                self.converter.initialize_pipeline(input_format)
+            except Exception as e:
+                print(f"Could not warm up docling pipeline {input_format}: {e}")
+
     def parse_to_markdown(self, file_path: str) -> str:
         result = self.converter.convert(file_path)
         return result.document.export_to_markdown()
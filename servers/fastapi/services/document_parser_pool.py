@@ -0,0 +1,180 @@
+import asyncio
+from collections import deque
+import multiprocessing
+import os
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable, Deque, List, Optional, Tuple
+
+from services.resource_governor import RESOURCE_GOVERNOR
+from utils.get_env import (
+    get_document_parse_timeout_env,
+    get_document_parser_memory_limit_mb_env,
+    get_document_parser_workers_env,
+    get_pdf_pages_per_task_env,
+)
+
+
+# Lives inside each worker process, created once by the pool initializer
+_WORKER_DOCLING_SERVICE = None
+
+
+def _init_worker(memory_limit_mb: Optional[int]):
+    global _WORKER_DOCLING_SERVICE
+
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # Failing here would break the whole pool, PDF extraction doesn't need docling
+    try:
+        from services.docling_service import DoclingService
+
+        _WORKER_DOCLING_SERVICE = DoclingService()
+        _WORKER_DOCLING_SERVICE.warm_up()
+    except Exception as e:
+        print(f"Could not initialize docling in parser worker: {e}")
+
+
+def _parse_to_markdown(file_path: str) -> str:
+    if _WORKER_DOCLING_SERVICE is None:
+        raise RuntimeError("Docling converter is not available in this worker")
+    return _WORKER_DOCLING_SERVICE.parse_to_markdown(file_path)
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pdf_text(file_path: str, start_page: int, end_page: int) -> str:
+    import pdfplumber
+
+    # pdfplumber page numbers are 1-based
+    with pdfplumber.open(
+        file_path, pages=list(range(start_page + 1, end_page + 1))
+    ) as pdf:
+        texts = []
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                texts.append(page_text)
+            page.close()
+        return "\n\n".join(texts)
+
+
+class DocumentParserPool:
+    """
+    Long-lived pool of worker processes for CPU-heavy document parsing.
+    Every worker keeps its own warmed docling converter, and large PDFs are
+    split into page ranges so they are extracted on several cores at once.
+    """
+
+    def __init__(self):
+        self.max_workers = int(
+            get_document_parser_workers_env() or min(4, os.cpu_count() or 1)
+        )
+        self.timeout = float(get_document_parse_timeout_env() or 300)
+        self.memory_limit_mb = int(get_document_parser_memory_limit_mb_env() or 0)
+        self.pages_per_task = int(get_pdf_pages_per_task_env() or 20)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb or None,),
+            )
+        return self._executor
+
+    async def _run(self, func: Callable[..., str], *args) -> str:
+        executor = self.executor
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            print(f"Document parsing timed out after {self.timeout}s: {args}")
+            self._replace_executor(executor)
+            raise
+        except BrokenProcessPool:
+            # A worker died, most likely by hitting the memory limit
+            print(f"Document parser worker crashed while parsing: {args}")
+            self._replace_executor(executor)
+            raise
+
+    def _replace_executor(self, executor: ProcessPoolExecutor):
+        if self._executor is not executor:
+            return
+        self._executor = None
+
+        # Let other in-flight tasks finish within their own timeout,
+        # then terminate whatever is still hanging in the old pool
+        asyncio.get_running_loop().call_later(
+            self.timeout, self._terminate_executor, executor
+        )
+
+    @staticmethod
+    def _terminate_executor(executor: ProcessPoolExecutor):
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _get_page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        return [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+
+    async def parse_to_markdown(self, file_path: str) -> str:
+        async with RESOURCE_GOVERNOR.slot("parse"):
+            return await self._run(_parse_to_markdown, file_path)
+
+    async def _extract_page_range(
+        self, file_path: str, start_page: int, end_page: int
+    ) -> str:
+        async with RESOURCE_GOVERNOR.slot("parse"):
+            return await self._run(_extract_pdf_text, file_path, start_page, end_page)
+
+    async def stream_pdf_text(self, file_path: str) -> AsyncIterator[str]:
+        """
+        Yields the text of consecutive page ranges in page order. Ranges are
+        extracted in parallel, at most max_workers of them ahead of the consumer.
+        """
+        page_count = await asyncio.to_thread(_count_pdf_pages, file_path)
+        page_ranges = deque(self._get_page_ranges(page_count))
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            while page_ranges or pending:
+                while page_ranges and len(pending) < self.max_workers:
+                    start, end = page_ranges.popleft()
+                    pending.append(
+                        asyncio.ensure_future(
+                            self._extract_page_range(file_path, start, end)
+                        )
+                    )
+                text = await pending.popleft()
+                if text:
+                    yield text
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def extract_pdf_text(self, file_path: str) -> str:
+        texts = [text async for text in self.stream_pdf_text(file_path)]
+        return "\n\n".join(texts)
+
+    def shutdown(self):
+        if self._executor:
+            self._terminate_executor(self._executor)
+            self._executor = None
+
+
+DOCUMENT_PARSER_POOL = DocumentParserPool()
@@ -1,11 +1,25 @@
+import asyncio
+from contextlib import suppress
+import mimetypes
+import os
+import time
+from typing import Dict, List, Optional
 import uuid
 
 import chromadb
+from chromadb.errors import NotFoundError
 from langchain_core.documents.base import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.retrievers import BaseRetriever
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from constants.documents import PDF_MIME_TYPES
+from services.compact_document_index import CompactDocumentIndex, CompactIndexRetriever
+from services.documents_loader import DocumentsLoader
+from services.embedding_service import EMBEDDING_SERVICE
+from services.resource_governor import RESOURCE_GOVERNOR
+from services.score_based_chunker import ScoreBasedChunker
+from utils.asset_directory_utils import get_document_indexes_directory
+from utils.get_env import get_document_chunker_env
 from .db_clients import chroma_client
 
 
@@ -24,13 +38,9 @@ class DocumentProcessingService:
         # Подключаемся к локальной, персистентной ChromaDB. Файлы будут храниться в папке `chroma`.
         self.client = chroma_client
 
-        # Инициализируем модель для создания эмбеддингов.
-        # 'sentence-transformers/all-MiniLM-L6-v2' - это популярная и легковесная модель,
-        # которая хорошо работает для семантического поиска. Она будет скачана и закеширована в 'chroma/models'.
-        self.embedding_function = HuggingFaceEmbeddings(
-            model_name='sentence-transformers/all-MiniLM-L6-v2',
-            cache_folder='chroma/models'
-        )
+        # Эмбеддинги считает общий ONNX-рантайм all-MiniLM-L6-v2, тот же,
+        # что используется для поиска иконок. Модель загружается при первом вызове.
+        self.embedding_function = EMBEDDING_SERVICE
 
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,  # Максимальный размер одного чанка в символах.
@@ -38,8 +48,45 @@ class DocumentProcessingService:
             # Это помогает сохранить контекст на стыках.
             length_function=len
         )
+        # Структурный сплиттер режет markdown-документы (результат docling)
+        # по разделам и сохраняет путь заголовков в метаданных чанка.
+        # Выбирается переменной DOCUMENT_CHUNKER: "structural" (по умолчанию) или "recursive".
+        if (get_document_chunker_env() or "structural") == "recursive":
+            self.document_splitter = self.text_splitter
+        else:
+            self.document_splitter = ScoreBasedChunker(
+                chunk_size=1000, chunk_overlap=200
+            )
         self.collection_prefix = collection_prefix
 
+        # Параметры потоковой индексации: сколько чанков эмбеддится за раз
+        # и сколько текста копится перед очередным разбиением на чанки.
+        self.embedding_batch_size = 64
+        self.stream_split_threshold = 8000
+
+        # Презентации, документы которых сейчас индексируются или используются
+        # при генерации. Их коллекции не трогает фоновая очистка Chroma.
+        self._active_presentations: Dict[uuid.UUID, int] = {}
+
+    def mark_active(self, presentation_id: uuid.UUID):
+        self._active_presentations[presentation_id] = (
+            self._active_presentations.get(presentation_id, 0) + 1
+        )
+
+    def mark_inactive(self, presentation_id: uuid.UUID):
+        count = self._active_presentations.get(presentation_id, 0) - 1
+        if count > 0:
+            self._active_presentations[presentation_id] = count
+        else:
+            self._active_presentations.pop(presentation_id, None)
+
+    def is_active(self, presentation_id: uuid.UUID) -> bool:
+        return presentation_id in self._active_presentations
+
+    def get_collection_metadata(self) -> dict:
+        # Время создания нужно фоновой очистке, чтобы не удалять свежие коллекции
+        return {"created_at": time.time()}
+
     def get_collection_name(self, presentation_id: uuid.UUID) -> str:
         """
         Генерирует уникальное, изолированное имя коллекции для каждой сессии генерации презентации.
@@ -62,7 +109,7 @@ class DocumentProcessingService:
             return None
 
         # Разбиваем `Document` объекты на более мелкие чанки.
-        all_splits = self.text_splitter.split_documents(docs)
+        all_splits = self.document_splitter.split_documents(docs)
 
         if not all_splits:
             return None
@@ -72,14 +119,173 @@ class DocumentProcessingService:
         # 2. Создается новая пустая коллекция.
         # 3. Для каждого чанка из `all_splits` вычисляется эмбеддинг с помощью `self.embedding_function`.
         # 4. Пары (текст чанка + его эмбеддинг) сохраняются в ChromaDB в указанную коллекцию.
-        vectorstore = Chroma.from_documents(
-            documents=all_splits,
-            embedding=self.embedding_function,
+        self.mark_active(presentation_id)
+        try:
+            vectorstore = Chroma.from_documents(
+                documents=all_splits,
+                embedding=self.embedding_function,
+                client=self.client,
+                collection_name=collection_name,
+                collection_metadata=self.get_collection_metadata(),
+            )
+            self.save_compact_index(presentation_id)
+        finally:
+            self.mark_inactive(presentation_id)
+        return vectorstore
+
+    async def create_vectorstore_from_files(
+        self,
+        presentation_id: uuid.UUID,
+        file_paths: List[str],
+        documents: Optional[List[str]] = None,
+    ) -> Chroma | None:
+        """
+        Потоковая индексация файлов. PDF читаются диапазонами страниц в пуле
+        DOCUMENT_PARSER_POOL: диапазоны извлекаются параллельно, режутся на чанки
+        и эмбеддятся батчами по мере поступления,
+        поэтому пиковая память не зависит от размера документа, а вычисление
+        эмбеддингов идёт параллельно с извлечением следующих страниц.
+        Если передан список `documents`, в него добавляется полный текст
+        каждого файла (например, для построения плана по заголовкам).
+        """
+        self.cleanup(presentation_id)
+        self.mark_active(presentation_id)
+        try:
+            return await self._index_files(presentation_id, file_paths, documents)
+        finally:
+            self.mark_inactive(presentation_id)
+
+    async def _index_files(
+        self,
+        presentation_id: uuid.UUID,
+        file_paths: List[str],
+        documents: Optional[List[str]] = None,
+    ) -> Chroma | None:
+        vectorstore = Chroma(
             client=self.client,
-            collection_name=collection_name,
+            collection_name=self.get_collection_name(presentation_id),
+            embedding_function=self.embedding_function,
+            collection_metadata=self.get_collection_metadata(),
         )
+
+        pdf_paths = []
+        other_paths = []
+        for file_path in file_paths:
+            mime_type, _ = mimetypes.guess_type(file_path)
+            if mime_type in PDF_MIME_TYPES:
+                pdf_paths.append(file_path)
+            else:
+                other_paths.append(file_path)
+
+        batch: List[Document] = []
+        pending_insert: Optional[asyncio.Future] = None
+        total_chunks = 0
+
+        async def flush(final: bool = False):
+            nonlocal batch, pending_insert, total_chunks
+            while len(batch) >= self.embedding_batch_size or (final and batch):
+                batch_documents = batch[: self.embedding_batch_size]
+                batch = batch[self.embedding_batch_size :]
+                # Only one batch is embedded at a time, the next one is prepared meanwhile
+                if pending_insert:
+                    await pending_insert
+                total_chunks += len(batch_documents)
+                pending_insert = asyncio.ensure_future(
+                    RESOURCE_GOVERNOR.run_in_thread(
+                        "embed", vectorstore.add_documents, batch_documents
+                    )
+                )
+            if final and pending_insert:
+                await pending_insert
+                pending_insert = None
+
+        try:
+            for pdf_path in pdf_paths:
+                metadata = {"source": os.path.basename(pdf_path)}
+                buffer = ""
+                page_texts: List[str] = []
+                async for page_text in DocumentsLoader.stream_pdf_pages(pdf_path):
+                    if documents is not None:
+                        page_texts.append(page_text)
+                    buffer = f"{buffer}\n\n{page_text}" if buffer else page_text
+                    if len(buffer) < self.stream_split_threshold:
+                        continue
+                    # Last chunk may continue on the next page, so it is carried over
+                    chunks = self.text_splitter.split_text(buffer)
+                    batch.extend(
+                        Document(page_content=chunk, metadata=metadata)
+                        for chunk in chunks[:-1]
+                    )
+                    buffer = chunks[-1] if chunks else ""
+                    await flush()
+                if buffer:
+                    batch.extend(
+                        Document(page_content=chunk, metadata=metadata)
+                        for chunk in self.text_splitter.split_text(buffer)
+                    )
+                    await flush()
+                if page_texts:
+                    documents.append("\n\n".join(page_texts))
+
+            if other_paths:
+                documents_loader = DocumentsLoader(file_paths=other_paths)
+                await documents_loader.load_documents()
+                if documents is not None:
+                    documents.extend(documents_loader.documents)
+                batch.extend(
+                    self.document_splitter.split_documents(
+                        [
+                            Document(page_content=document)
+                            for document in documents_loader.documents
+                        ]
+                    )
+                )
+                await flush()
+
+            await flush(final=True)
+        except Exception:
+            if pending_insert:
+                # An insert already running in its thread can't be cancelled,
+                # so it has to finish before the collection is removed
+                with suppress(Exception):
+                    await pending_insert
+            self.cleanup(presentation_id)
+            raise
+
+        print(f"Indexed {total_chunks} chunks from {len(file_paths)} files")
+        if not total_chunks:
+            self.cleanup(presentation_id)
+            return None
+
+        await asyncio.to_thread(self.save_compact_index, presentation_id)
         return vectorstore
 
+    def get_compact_index_path(self, presentation_id: uuid.UUID) -> str:
+        return os.path.join(
+            get_document_indexes_directory(), f"{presentation_id}.index"
+        )
+
+    def save_compact_index(self, presentation_id: uuid.UUID):
+        """
+        Сохраняет компактную копию коллекции (int8-эмбеддинги и сжатые тексты
+        чанков) в один файл. Коллекция Chroma удаляется после генерации, а этот
+        файл остаётся, чтобы редактирование слайдов тоже могло опираться на документы.
+        """
+        try:
+            collection = self.client.get_collection(
+                self.get_collection_name(presentation_id)
+            )
+            data = collection.get(include=["embeddings", "documents", "metadatas"])
+            CompactDocumentIndex.write(
+                self.get_compact_index_path(presentation_id),
+                data["embeddings"],
+                data["documents"],
+                data["metadatas"],
+            )
+        except Exception as e:
+            # The index is only used for editing, generation continues without it
+            print(f"Could not save compact document index for {presentation_id}: {e}")
+
     def get_retriever(self, presentation_id: uuid.UUID) -> BaseRetriever | None:
         """
         Получает "извлекатель" (retriever) для уже проиндексированных документов.
@@ -90,6 +296,12 @@ class DocumentProcessingService:
         # Проверяем, существует ли вообще такая коллекция.
         # Это нужно на случай, если документы не были загружены, но код пытается получить retriever.
         if not any(c.name == collection_name for c in self.client.list_collections()):
+            # После генерации коллекция удалена, остаётся только компактный индекс.
+            index_path = self.get_compact_index_path(presentation_id)
+            if os.path.exists(index_path):
+                return CompactIndexRetriever(
+                    index_path=index_path, embeddings=self.embedding_function, k=5
+                )
             return None
 
         # Создаем объект `Chroma`, который "смотрит" на уже существующую коллекцию.
@@ -109,10 +321,19 @@ class DocumentProcessingService:
         collection_name = self.get_collection_name(presentation_id)
         try:
             self.client.delete_collection(name=collection_name)
-        except ValueError:
+        except (ValueError, NotFoundError):
             # Ошибки не будет, если коллекции и так не было. Просто игнорируем.
             pass
 
+    def delete_index(self, presentation_id: uuid.UUID):
+        """
+        Полностью удаляет документы презентации: коллекцию и компактный индекс.
+        """
+        self.cleanup(presentation_id)
+        index_path = self.get_compact_index_path(presentation_id)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
 
 # Создаем единственный экземпляр (синглтон) этого сервиса,
 # который будет использоваться во всем приложении.
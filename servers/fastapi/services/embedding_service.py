@@ -0,0 +1,158 @@
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.asset_directory_utils import get_embedding_models_directory
+from utils.get_env import get_embedding_quantize_env, get_embedding_threads_env
+from utils.parsers import parse_bool_or_none
+
+
+class EmbeddingService(Embeddings):
+    """
+    Single all-MiniLM-L6-v2 runtime on top of onnxruntime, shared by icon search
+    and document RAG. The model is downloaded and loaded on first use only.
+    """
+
+    MAX_TOKENS = 256
+
+    def __init__(self, batch_size: int = 32):
+        self.batch_size = batch_size
+        self.num_threads = int(get_embedding_threads_env() or 0)
+        self.quantize = parse_bool_or_none(get_embedding_quantize_env()) or False
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._tokenizer = None
+
+    @property
+    def model_directory(self) -> str:
+        return get_embedding_models_directory()
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.model_directory, "onnx", "model.onnx")
+
+    @property
+    def quantized_model_path(self) -> str:
+        return os.path.join(self.model_directory, "onnx", "model_int8.onnx")
+
+    def _download_model_if_not_exists(self):
+        # Reuses chroma's downloader so existing model files are picked up as is
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        onnx_model = ONNXMiniLM_L6_V2()
+        onnx_model.DOWNLOAD_PATH = self.model_directory
+        onnx_model._download_model_if_not_exists()
+
+    def _quantize_model_if_not_exists(self):
+        if os.path.exists(self.quantized_model_path):
+            return
+
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print("Quantizing embedding model to int8...")
+        quantize_dynamic(
+            self.model_path, self.quantized_model_path, weight_type=QuantType.QInt8
+        )
+
+    def _load(self):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self._download_model_if_not_exists()
+        model_path = self.model_path
+        if self.quantize:
+            try:
+                self._quantize_model_if_not_exists()
+                model_path = self.quantized_model_path
+            except Exception as e:
+                print(f"Could not quantize embedding model, using fp32: {e}")
+
+        tokenizer = Tokenizer.from_file(
+            os.path.join(self.model_directory, "onnx", "tokenizer.json")
+        )
+        tokenizer.enable_truncation(max_length=self.MAX_TOKENS)
+        # Pads to the longest text of a batch instead of always MAX_TOKENS
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        session_options = ort.SessionOptions()
+        session_options.log_severity_level = 3
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        session_options.intra_op_num_threads = self.num_threads
+        session_options.inter_op_num_threads = 1
+
+        self._session = ort.InferenceSession(
+            model_path,
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._tokenizer = tokenizer
+        print(f"Embedding model loaded from {model_path}")
+
+    def _ensure_loaded(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._load()
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encoded = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([each.ids for each in encoded], dtype=np.int64)
+        attention_mask = np.array(
+            [each.attention_mask for each in encoded], dtype=np.int64
+        )
+
+        last_hidden_state = self._session.run(
+            None,
+            {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.zeros_like(input_ids),
+            },
+        )[0]
+
+        # Mean pooling over real tokens, followed by L2 normalization
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        embeddings = (last_hidden_state * mask).sum(axis=1) / np.clip(
+            mask.sum(axis=1), 1e-9, None
+        )
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-12
+        return (embeddings / norms).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns normalized embeddings with shape (len(texts), 384).
+        Texts are batched by length so that padding stays small.
+        Async callers take an "embed" slot before dispatching this to a thread.
+        """
+        self._ensure_loaded()
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings: Optional[np.ndarray] = None
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start : start + self.batch_size]
+            batch_embeddings = self._forward([texts[i] for i in batch_indices])
+            if embeddings is None:
+                embeddings = np.empty(
+                    (len(texts), batch_embeddings.shape[1]), dtype=np.float32
+                )
+            embeddings[batch_indices] = batch_embeddings
+
+        if embeddings is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+
+EMBEDDING_SERVICE = EmbeddingService()
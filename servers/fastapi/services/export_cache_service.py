@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import uuid
+
+from sqlmodel import func, select
+
+from models.sql.presentation import PresentationModel
+from models.sql.presentation_layout_code import PresentationLayoutCodeModel
+from models.sql.slide import SlideModel
+from services.database import async_session_maker
+from utils.asset_directory_utils import get_exports_directory
+from utils.get_env import get_export_cache_versions_env
+
+
+# Bump when export output changes for the same content
+EXPORT_FORMAT_VERSION = 1
+
+
+class ExportCacheService:
+    """
+    Keeps exported PPTX and PDF files under
+    exports/versions/<presentation id>/<content fingerprint>/<title>.<format>,
+    so exporting an unchanged presentation again returns the existing file.
+
+    The fingerprint is a hash of everything the export is rendered from:
+    title, layout, slides and custom template code. It is computed from the
+    database at export time, so edits from any endpoint are picked up.
+    Only the newest EXPORT_CACHE_VERSIONS versions of a presentation are kept.
+    """
+
+    def __init__(self):
+        self.max_versions = int(get_export_cache_versions_env() or 3)
+        self._in_flight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    @property
+    def versions_directory(self) -> str:
+        versions_directory = os.path.join(get_exports_directory(), "versions")
+        os.makedirs(versions_directory, exist_ok=True)
+        return versions_directory
+
+    def get_presentation_directory(self, presentation_id: uuid.UUID) -> str:
+        return os.path.join(self.versions_directory, str(presentation_id))
+
+    @staticmethod
+    def _get_template_ids(slides) -> set:
+        template_ids = set()
+        for slide in slides:
+            if slide.layout_group and slide.layout_group.startswith("custom-"):
+                try:
+                    template_ids.add(uuid.UUID(slide.layout_group[len("custom-") :]))
+                except ValueError:
+                    pass
+        return template_ids
+
+    async def get_fingerprint(self, presentation_id: uuid.UUID) -> Optional[str]:
+        """
+        Returns the content fingerprint, None if the presentation doesn't exist.
+        """
+        async with async_session_maker() as sql_session:
+            presentation = await sql_session.get(PresentationModel, presentation_id)
+            if not presentation:
+                return None
+            slides = list(
+                await sql_session.scalars(
+                    select(SlideModel)
+                    .where(SlideModel.presentation == presentation_id)
+                    .order_by(SlideModel.index)
+                )
+            )
+
+            templates = []
+            for template_id in sorted(self._get_template_ids(slides), key=str):
+                count, updated_at = (
+                    await sql_session.execute(
+                        select(
+                            func.count(PresentationLayoutCodeModel.id),
+                            func.max(PresentationLayoutCodeModel.updated_at),
+                        ).where(PresentationLayoutCodeModel.presentation == template_id)
+                    )
+                ).one()
+                templates.append([str(template_id), count, str(updated_at)])
+
+        content = {
+            "version": EXPORT_FORMAT_VERSION,
+            "title": presentation.title,
+            "layout": presentation.layout,
+            "slides": [
+                [
+                    str(slide.id),
+                    slide.index,
+                    slide.layout_group,
+                    slide.layout,
+                    slide.content,
+                    slide.html_content,
+                    slide.speaker_note,
+                    slide.properties,
+                ]
+                for slide in slides
+            ],
+            "templates": templates,
+        }
+        serialized = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:32]
+
+    def _find_artifact(self, version_directory: str, export_as: str) -> Optional[str]:
+        if not os.path.isdir(version_directory):
+            return None
+        for entry in os.scandir(version_directory):
+            if entry.is_file() and entry.name.endswith(f".{export_as}"):
+                # Marks the version as recently used for garbage collection
+                os.utime(version_directory)
+                return entry.path
+        return None
+
+    async def get_cached(
+        self, presentation_id: uuid.UUID, fingerprint: str, export_as: str
+    ) -> Optional[str]:
+        version_directory = os.path.join(
+            self.get_presentation_directory(presentation_id), fingerprint
+        )
+        return await asyncio.to_thread(
+            self._find_artifact, version_directory, export_as
+        )
+
+    def _collect_garbage(self, presentation_id: uuid.UUID):
+        presentation_directory = self.get_presentation_directory(presentation_id)
+        versions = [
+            entry for entry in os.scandir(presentation_directory) if entry.is_dir()
+        ]
+        versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in versions[self.max_versions :]:
+            print(f"Removing old export version {entry.path}")
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    async def get_or_export(
+        self,
+        presentation_id: uuid.UUID,
+        fingerprint: str,
+        export_as: str,
+        export: Callable[[str], Awaitable[str]],
+    ) -> str:
+        """
+        Returns the cached artifact for this version, or calls `export` with
+        the version directory and keeps the file it returns.
+        Concurrent exports of the same version share one export. If the
+        caller running it is cancelled, a waiting caller exports instead.
+        """
+        cached_path = await self.get_cached(presentation_id, fingerprint, export_as)
+        if cached_path:
+            print(f"Using cached export {cached_path}")
+            return cached_path
+
+        key = (str(presentation_id), fingerprint, export_as)
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller that owned the export was cancelled, this one takes over
+                return await self.get_or_export(
+                    presentation_id, fingerprint, export_as, export
+                )
+
+        version_directory = os.path.join(
+            self.get_presentation_directory(presentation_id), fingerprint
+        )
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            os.makedirs(version_directory, exist_ok=True)
+            path = await export(version_directory)
+            if os.path.dirname(os.path.abspath(path)) != os.path.abspath(
+                version_directory
+            ):
+                cached_path = os.path.join(version_directory, os.path.basename(path))
+                await asyncio.to_thread(shutil.copyfile, path, cached_path)
+                path = cached_path
+            await asyncio.to_thread(self._collect_garbage, presentation_id)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved when no one else waits for it
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def delete(self, presentation_id: uuid.UUID):
+        shutil.rmtree(self.get_presentation_directory(presentation_id), ignore_errors=True)
+
+
+EXPORT_CACHE_SERVICE = ExportCacheService()
@@ -1,55 +1,153 @@
 import asyncio
+from collections import OrderedDict
 import json
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
-from .db_clients import chroma_client
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.embedding_service import EMBEDDING_SERVICE
+from services.resource_governor import RESOURCE_GOVERNOR
+
+
+ICONS_PATH = "assets/icons.json"
+ICON_EMBEDDINGS_PATH = "assets/icon_embeddings.npy"
+ICON_IDS_PATH = "assets/icon_ids.json"
+
+
+def load_icon_documents() -> Tuple[List[str], List[str]]:
+    """
+    Returns ids and searchable texts of the bold icons in assets/icons.json.
+    """
+    with open(ICONS_PATH, "r") as f:
+        icons = json.load(f)
+
+    ids = []
+    documents = []
+    for each in icons["icons"]:
+        if each["name"].split("-")[-1] == "bold":
+            ids.append(each["name"])
+            documents.append(f"{each['name']} {each['tags']}")
+    return ids, documents
+
+
+def build_icon_embeddings():
+    """
+    Precomputes normalized embeddings of all icons, row i belongs to ids[i].
+    """
+    ids, documents = load_icon_documents()
+    embeddings = EMBEDDING_SERVICE.embed(documents)
+
+    np.save(ICON_EMBEDDINGS_PATH, embeddings)
+    with open(ICON_IDS_PATH, "w") as f:
+        json.dump(ids, f)
+    print(f"Saved embeddings of {len(ids)} icons to {ICON_EMBEDDINGS_PATH}")
+
+
+def icon_embeddings_are_stale() -> bool:
+    """
+    True if the embeddings are missing or older than assets/icons.json.
+    """
+    if not (os.path.exists(ICON_EMBEDDINGS_PATH) and os.path.exists(ICON_IDS_PATH)):
+        return True
+    built_at = min(
+        os.path.getmtime(ICON_EMBEDDINGS_PATH), os.path.getmtime(ICON_IDS_PATH)
+    )
+    return built_at < os.path.getmtime(ICONS_PATH)
 
 
 class IconFinderService:
-    def __init__(self):
-        self.collection_name = "icons"
-        self.client = chroma_client
-        print("Initializing icons collection...")
-        self._initialize_icons_collection()
-        print("Icons collection initialized.")
-
-    def _initialize_icons_collection(self):
-        self.embedding_function = ONNXMiniLM_L6_V2()
-        self.embedding_function.DOWNLOAD_PATH = "chroma/models"
-        self.embedding_function._download_model_if_not_exists()
-        try:
-            self.collection = self.client.get_collection(
-                self.collection_name, embedding_function=self.embedding_function
+    """
+    Finds icons by cosine similarity against a precomputed embedding matrix.
+    The matrix is memory-mapped on the first search. start.js builds it before
+    the server starts, it is built here only if it is still missing or stale.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self._lock = threading.Lock()
+        self._embeddings: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+
+        self.cache_size = cache_size
+        self._cache: OrderedDict[Tuple[str, int], List[str]] = OrderedDict()
+
+    def _load(self):
+        if icon_embeddings_are_stale():
+            print("Icon embeddings are missing or stale, building them...")
+            build_icon_embeddings()
+
+        embeddings = np.load(ICON_EMBEDDINGS_PATH, mmap_mode="r")
+        with open(ICON_IDS_PATH, "r") as f:
+            ids = json.load(f)
+        if len(ids) != len(embeddings):
+            raise ValueError(
+                f"{ICON_IDS_PATH} has {len(ids)} ids but {ICON_EMBEDDINGS_PATH} has {len(embeddings)} rows"
+            )
+
+        self._ids = ids
+        self._embeddings = embeddings
+
+    def _ensure_loaded(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._load()
+
+    def _search(self, queries: List[str], k: int) -> List[List[str]]:
+        self._ensure_loaded()
+        query_embeddings = EMBEDDING_SERVICE.embed(queries)
+
+        # Rows are normalized, so the dot product is the cosine similarity
+        scores = query_embeddings @ self._embeddings.T
+        k = min(k, scores.shape[1])
+        top_indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row_scores, row_indices in zip(scores, top_indices):
+            row_indices = row_indices[np.argsort(-row_scores[row_indices])]
+            results.append(
+                [f"/static/icons/bold/{self._ids[i]}.svg" for i in row_indices]
             )
-        except Exception:
-            with open("assets/icons.json", "r") as f:
-                icons = json.load(f)
-
-            documents = []
-            ids = []
-
-            for i, each in enumerate(icons["icons"]):
-                if each["name"].split("-")[-1] == "bold":
-                    doc_text = f"{each['name']} {each['tags']}"
-                    documents.append(doc_text)
-                    ids.append(each["name"])
-
-            if documents:
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    embedding_function=self.embedding_function,
-                    metadata={"hnsw:space": "cosine"},
-                )
-                self.collection.add(documents=documents, ids=ids)
+        return results
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    async def search_icons_batch(self, queries: List[str], k: int = 1) -> List[List[str]]:
+        """
+        Returns icon urls for every query. Queries that were searched before
+        come from the cache, the rest are embedded and ranked in one pass.
+        """
+        normalized_queries = [self._normalize_query(query) for query in queries]
+
+        results: Dict[str, List[str]] = {}
+        missing_queries = []
+        for query in normalized_queries:
+            if query in results:
+                continue
+            cached = self._cache.get((query, k))
+            if cached is not None:
+                self._cache.move_to_end((query, k))
+                results[query] = cached
+            else:
+                results[query] = None
+                missing_queries.append(query)
+
+        if missing_queries:
+            found = await RESOURCE_GOVERNOR.run_in_thread(
+                "embed", self._search, missing_queries, k
+            )
+            for query, icons in zip(missing_queries, found):
+                results[query] = icons
+                self._cache[(query, k)] = icons
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return [list(results[query]) for query in normalized_queries]
 
     async def search_icons(self, query: str, k: int = 1):
-        result = await asyncio.to_thread(
-            self.collection.query,
-            query_texts=[query],
-            n_results=k,
-        )
-        return [f"/static/icons/bold/{each}.svg" for each in result["ids"][0]]
+        return (await self.search_icons_batch([query], k))[0]
 
 
 ICON_FINDER_SERVICE = IconFinderService()
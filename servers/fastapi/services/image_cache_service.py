@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from utils.asset_directory_utils import get_images_directory
+from utils.get_env import get_image_cache_max_mb_env
+
+
+class ImageCacheService:
+    """
+    Content-addressed cache of generated images, stored under
+    images/cache/<sha256 of the key>.<ext>.
+
+    Images are handed out as hard links (copies on other filesystems) in the
+    caller's output directory, so evicting a cache file never breaks images
+    that are already used in presentations. Concurrent requests for the same
+    key wait for a single generation.
+    """
+
+    def __init__(self):
+        self.max_bytes = int(get_image_cache_max_mb_env() or 2048) * 1024 * 1024
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Index and byte count are updated from worker threads
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, str]] = None
+        self._total_bytes = 0
+
+    @property
+    def cache_directory(self) -> str:
+        cache_directory = os.path.join(get_images_directory(), "cache")
+        os.makedirs(cache_directory, exist_ok=True)
+        return cache_directory
+
+    @staticmethod
+    def get_key(
+        provider: str,
+        model: str,
+        prompt: str,
+        theme_prompt: Optional[str],
+        size: str,
+    ) -> str:
+        normalized_prompt = " ".join(prompt.lower().split())
+        normalized_theme = " ".join((theme_prompt or "").lower().split())
+        key_parts = [provider, model, normalized_prompt, normalized_theme, size]
+        return hashlib.sha256(json.dumps(key_parts).encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, str]:
+        if self._index is None:
+            index = {}
+            total_bytes = 0
+            for entry in os.scandir(self.cache_directory):
+                if entry.is_file():
+                    index[os.path.splitext(entry.name)[0]] = entry.path
+                    total_bytes += entry.stat().st_size
+            self._index = index
+            self._total_bytes = total_bytes
+        return self._index
+
+    def _lookup_locked(self, key: str) -> Optional[str]:
+        path = self._load_index().get(key)
+        if path and not os.path.exists(path):
+            self._index.pop(key, None)
+            return None
+        if path:
+            # Modification time is the LRU clock
+            os.utime(path)
+        return path
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._lookup_locked(key)
+
+    @staticmethod
+    def _link(source_path: str, target_path: str):
+        try:
+            os.link(source_path, target_path)
+        except OSError:
+            shutil.copyfile(source_path, target_path)
+
+    def _link_into(self, key: str, output_directory: str) -> Optional[str]:
+        """
+        Links the cached image of the key into output_directory, None if it
+        isn't cached. Holds the lock, so eviction can't remove the file
+        between the lookup and the link.
+        """
+        os.makedirs(output_directory, exist_ok=True)
+        with self._lock:
+            cached_path = self._lookup_locked(key)
+            if not cached_path:
+                return None
+            extension = os.path.splitext(cached_path)[1]
+            output_path = os.path.join(output_directory, f"{uuid.uuid4()}{extension}")
+            self._link(cached_path, output_path)
+            return output_path
+
+    def _store(self, key: str, image_path: str) -> str:
+        extension = os.path.splitext(image_path)[1]
+        cached_path = os.path.join(self.cache_directory, f"{key}{extension}")
+
+        with self._lock:
+            index = self._load_index()
+            for previous_path in {index.pop(key, None), cached_path}:
+                if previous_path and os.path.exists(previous_path):
+                    self._total_bytes -= os.path.getsize(previous_path)
+                    os.remove(previous_path)
+
+            self._link(image_path, cached_path)
+            index[key] = cached_path
+            self._total_bytes += os.path.getsize(cached_path)
+            self._evict()
+        return cached_path
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        entries: List[os.DirEntry] = [
+            entry for entry in os.scandir(self.cache_directory) if entry.is_file()
+        ]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self._index.pop(os.path.splitext(entry.name)[0], None)
+
+    async def get_or_generate(
+        self,
+        key: str,
+        output_directory: str,
+        generate: Callable[[], Awaitable[Optional[str]]],
+        use_cached: bool = True,
+    ) -> Optional[str]:
+        """
+        Returns the path of an image for the key inside output_directory.
+        `generate` is only called if the image isn't cached or being generated.
+        With use_cached=False a new image is always generated and replaces the
+        cached one.
+        """
+        if use_cached:
+            output_path = await asyncio.to_thread(
+                self._link_into, key, output_directory
+            )
+            if output_path:
+                print(f"Using cached image for key {key[:12]}")
+                return output_path
+
+            in_flight = self._in_flight.get(key)
+            if in_flight:
+                cached_path = await asyncio.shield(in_flight)
+                output_path = cached_path and await asyncio.to_thread(
+                    self._link_into, key, output_directory
+                )
+                if output_path:
+                    return output_path
+                # The first request failed or its image was already evicted,
+                # so this one generates on its own
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        cached_path = None
+        try:
+            image_path = await generate()
+            if image_path and os.path.exists(image_path):
+                try:
+                    cached_path = await asyncio.to_thread(self._store, key, image_path)
+                except Exception as e:
+                    print(f"Could not cache generated image {image_path}: {e}")
+            return image_path
+        finally:
+            future.set_result(cached_path)
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+
+IMAGE_CACHE_SERVICE = ImageCacheService()
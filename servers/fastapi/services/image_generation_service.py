@@ -1,16 +1,18 @@
 import asyncio
+from contextlib import nullcontext
 import os
-import aiohttp
 from google import genai
 from google.genai.types import GenerateContentConfig
 from openai import AsyncOpenAI
 from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
+from services.image_cache_service import IMAGE_CACHE_SERVICE
+from services.kandinsky_client import KANDINSKY_CLIENT
+from services.resource_governor import RESOURCE_GOVERNOR
+from services.stock_image_client import STOCK_IMAGE_CLIENT
 from utils.download_helpers import download_file
-from utils.get_env import get_pexels_api_key_env
-from utils.get_env import get_pixabay_api_key_env
-from utils.get_env import get_kandinsky_api_key_env
 from utils.image_provider import (
+    get_selected_image_provider,
     is_pixels_selected,
     is_pixabay_selected,
     is_gemini_flash_selected,
@@ -18,14 +20,13 @@ from utils.image_provider import (
     is_kandinsky_selected
 )
 import uuid
-from fusionbrain_sdk_python import AsyncFBClient, PipelineType
-import base64
 
 
 class ImageGenerationService:
 
     def __init__(self, output_directory: str):
         self.output_directory = output_directory
+        self.used_stock_images = set()
         self.image_gen_func = self.get_image_gen_func()
 
     def get_image_gen_func(self):
@@ -44,13 +45,36 @@ class ImageGenerationService:
     def is_stock_provider_selected(self):
         return is_pixels_selected() or is_pixabay_selected()
 
-    async def generate_image(self, prompt: ImagePrompt) -> str | ImageAsset:
+    def get_image_model_and_size(self) -> tuple[str, str]:
+        if is_dalle3_selected():
+            return "dall-e-3", "1024x1024"
+        elif is_gemini_flash_selected():
+            return "gemini-2.5-flash-image-preview", "default"
+        elif is_kandinsky_selected():
+            return "text2image", "default"
+        return "", ""
+
+    def get_cache_key(self, prompt: ImagePrompt) -> str:
+        model, size = self.get_image_model_and_size()
+        return IMAGE_CACHE_SERVICE.get_key(
+            get_selected_image_provider().value,
+            model,
+            prompt.prompt,
+            prompt.theme_prompt,
+            size,
+        )
+
+    async def generate_image(
+        self, prompt: ImagePrompt, use_cache: bool = True
+    ) -> str | ImageAsset:
         """
         Generates an image based on the provided prompt.
         - If no image generation function is available, returns a placeholder image.
         - If the stock provider is selected, it uses the prompt directly,
         otherwise it uses the full image prompt with theme.
         - Output Directory is used for saving the generated image not the stock provider.
+        - Generated images are reused for the same provider, model and prompt,
+        unless use_cache is False.
         """
         if not self.image_gen_func:
             print("No image generation function found. Using placeholder image.")
@@ -61,12 +85,27 @@ class ImageGenerationService:
         )
         print(f"Request - Generating Image for {image_prompt}")
 
+        async def generate():
+            # Kandinsky only takes a slot to submit, tasks of a deck are polled together
+            slot = (
+                nullcontext()
+                if is_kandinsky_selected()
+                else RESOURCE_GOVERNOR.slot("image")
+            )
+            async with slot:
+                if self.is_stock_provider_selected():
+                    return await self.image_gen_func(image_prompt)
+                return await self.image_gen_func(image_prompt, self.output_directory)
+
         try:
             if self.is_stock_provider_selected():
-                image_path = await self.image_gen_func(image_prompt)
+                image_path = await generate()
             else:
-                image_path = await self.image_gen_func(
-                    image_prompt, self.output_directory
+                image_path = await IMAGE_CACHE_SERVICE.get_or_generate(
+                    self.get_cache_key(prompt),
+                    self.output_directory,
+                    generate,
+                    use_cached=use_cache,
                 )
             if image_path:
                 if image_path.startswith("http"):
@@ -118,65 +157,27 @@ class ImageGenerationService:
         return image_path
 
     async def generate_image_kandinsky(self, prompt: str, output_directory: str) -> str:
-        def save_base64_list(base64_list, uuid, out_dir="outputs", fmt="jpg"):
-            import os
-            os.makedirs(out_dir, exist_ok=True)
-            saved_files = []
-            for i, b64_str in enumerate(base64_list):
-                image_data = base64.b64decode(b64_str)
-                path = os.path.join(out_dir, f"image_{uuid}.{fmt}")
-                with open(path, "wb") as f:
-                    f.write(image_data)
-                saved_files.append(path)
-            return saved_files
-
-        async_client = AsyncFBClient(x_key=get_kandinsky_api_key_env(), #'AAC7740E40E6623D3F6940F908B25D02'
-                                     x_secret='2AEC252182C203D9EC6F6828F5BF50CD')
-
-        pipelines = await async_client.get_pipelines_by_type(PipelineType.TEXT2IMAGE)
-        text2image_pipeline = pipelines[0]  # Using the first available pipeline
-        # print(f"Using pipeline: {text2image_pipeline.name}")
-
-        run_result = await async_client.run_pipeline(
-            pipeline_id=text2image_pipeline.id,
-            prompt=prompt,
-            negative_prompt="blurry, cartoon, painting, low quality",
-            style="infografics, realistic"
-        )
+        return await KANDINSKY_CLIENT.generate(prompt, output_directory)
 
-        uuid = run_result.uuid
-        # print(f"Task started with UUID: {run_result.uuid}")
-        final_status = await async_client.wait_for_completion(
-            request_id=run_result.uuid,
-            initial_delay=run_result.status_time
-        )
+    async def get_stock_image(self, provider: str, prompt: str) -> str:
+        """
+        Picks a photo from the cached search candidates, preferring ones not yet
+        used by this service, so slides of one deck don't repeat a photo.
+        """
+        candidates = await STOCK_IMAGE_CLIENT.search(provider, prompt)
+        if not candidates:
+            raise Exception(f"No {provider} images found for {prompt}")
 
-        saved_files = ''
-        if final_status.status == 'DONE':
-            files = final_status.result.files
-            saved_files = save_base64_list(files, uuid, out_dir=output_directory)
-            # print("Kandinsky saved:", saved_files)
+        for image_url in candidates:
+            if image_url not in self.used_stock_images:
+                break
         else:
-            print(f"Generation failed with status: {final_status.status}")
-
-        # print('saved_files: ', saved_files)
-        return saved_files[0]
+            image_url = candidates[0]
+        self.used_stock_images.add(image_url)
+        return image_url
 
     async def get_image_from_pexels(self, prompt: str) -> str:
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            response = await session.get(
-                f"https://api.pexels.com/v1/search?query={prompt}&per_page=1",
-                headers={"Authorization": f"{get_pexels_api_key_env()}"},
-            )
-            data = await response.json()
-            image_url = data["photos"][0]["src"]["large"]
-            return image_url
+        return await self.get_stock_image("pexels", prompt)
 
     async def get_image_from_pixabay(self, prompt: str) -> str:
-        async with aiohttp.ClientSession(trust_env=True) as session:
-            response = await session.get(
-                f"https://pixabay.com/api/?key={get_pixabay_api_key_env()}&q={prompt}&image_type=photo&per_page=3"
-            )
-            data = await response.json()
-            image_url = data["hits"][0]["largeImageURL"]
-            return image_url
+        return await self.get_stock_image("pixabay", prompt)
@@ -0,0 +1,171 @@
+import asyncio
+import base64
+from dataclasses import dataclass
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fusionbrain_sdk_python import AsyncFBClient, PipelineType
+from fusionbrain_sdk_python.models import PipelineResultStatus, RunPipelineBlockedResult
+
+from services.resource_governor import RESOURCE_GOVERNOR
+from utils.get_env import get_kandinsky_api_key_env, get_kandinsky_secret_key_env
+
+
+@dataclass
+class _PendingTask:
+    future: asyncio.Future
+    next_poll_at: float
+    deadline: float
+
+
+def _save_base64_images(
+    base64_images: List[str], task_id: UUID, output_directory: str, fmt: str = "jpg"
+) -> List[str]:
+    os.makedirs(output_directory, exist_ok=True)
+    saved_files = []
+    for i, b64_str in enumerate(base64_images):
+        suffix = f"_{i}" if i else ""
+        path = os.path.join(output_directory, f"image_{task_id}{suffix}.{fmt}")
+        with open(path, "wb") as f:
+            f.write(base64.b64decode(b64_str))
+        saved_files.append(path)
+    return saved_files
+
+
+class KandinskyClient:
+    """
+    Long-lived FusionBrain client. The text2image pipeline id is cached for
+    PIPELINE_TTL seconds, every image is submitted as soon as it's requested
+    and the statuses of all submitted tasks are checked by one poll loop.
+    """
+
+    PIPELINE_TTL = 10 * 60
+    POLL_INTERVAL = 1.0
+    TASK_TIMEOUT = 5 * 60
+
+    def __init__(self):
+        self._client: Optional[AsyncFBClient] = None
+        self._credentials: Optional[Tuple[Optional[str], Optional[str]]] = None
+        self._pipeline_id: Optional[UUID] = None
+        self._pipeline_expires_at = 0.0
+        self._pipeline_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[UUID, _PendingTask] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> AsyncFBClient:
+        credentials = (get_kandinsky_api_key_env(), get_kandinsky_secret_key_env())
+        # Keys can be changed in user config while the server is running
+        if self._client is None or credentials != self._credentials:
+            api_key, secret_key = credentials
+            self._client = AsyncFBClient(x_key=api_key, x_secret=secret_key)
+            self._credentials = credentials
+            self._pipeline_id = None
+        return self._client
+
+    async def get_pipeline_id(self) -> UUID:
+        client = self.client
+        if self._pipeline_id and time.monotonic() < self._pipeline_expires_at:
+            return self._pipeline_id
+
+        if self._pipeline_lock is None:
+            self._pipeline_lock = asyncio.Lock()
+        async with self._pipeline_lock:
+            if self._pipeline_id is None or time.monotonic() >= self._pipeline_expires_at:
+                pipelines = await client.get_pipelines_by_type(PipelineType.TEXT2IMAGE)
+                # Using the first available pipeline
+                self._pipeline_id = pipelines[0].id
+                self._pipeline_expires_at = time.monotonic() + self.PIPELINE_TTL
+        return self._pipeline_id
+
+    async def _poll_status(self, task_id: UUID, task: _PendingTask):
+        try:
+            status = await self.client.get_status(task_id)
+        except Exception as e:
+            print(f"Kandinsky status check for {task_id} failed: {e}")
+            return
+
+        if status.status == PipelineResultStatus.DONE:
+            self._pending.pop(task_id, None)
+            if not task.future.done():
+                task.future.set_result(status.result.files)
+        elif status.status == PipelineResultStatus.FAIL:
+            self._pending.pop(task_id, None)
+            if not task.future.done():
+                task.future.set_exception(
+                    Exception(f"Kandinsky generation {task_id} failed")
+                )
+
+    async def _poll_loop(self):
+        while self._pending:
+            now = time.monotonic()
+            due = []
+            for task_id, task in list(self._pending.items()):
+                if task.future.done():
+                    self._pending.pop(task_id, None)
+                elif now >= task.deadline:
+                    self._pending.pop(task_id, None)
+                    task.future.set_exception(
+                        TimeoutError(f"Kandinsky generation {task_id} timed out")
+                    )
+                elif now >= task.next_poll_at:
+                    task.next_poll_at = now + self.POLL_INTERVAL
+                    due.append((task_id, task))
+
+            if due:
+                await asyncio.gather(
+                    *[self._poll_status(task_id, task) for task_id, task in due]
+                )
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    def _ensure_polling(self):
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def submit(self, prompt: str) -> Tuple[UUID, asyncio.Future]:
+        """
+        Starts generation and returns the task id with a future that gets
+        base64 images of the result. Only the submit request takes an image
+        slot, waiting for the result doesn't.
+        """
+        pipeline_id = await self.get_pipeline_id()
+        async with RESOURCE_GOVERNOR.slot("image"):
+            run_result = await self.client.run_pipeline(
+                pipeline_id=pipeline_id,
+                prompt=prompt,
+                negative_prompt="blurry, cartoon, painting, low quality",
+                style="infografics, realistic",
+            )
+        if isinstance(run_result, RunPipelineBlockedResult):
+            raise Exception(f"Kandinsky pipeline is unavailable: {run_result.model_status}")
+
+        now = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[run_result.uuid] = _PendingTask(
+            future=future,
+            next_poll_at=now + run_result.status_time,
+            deadline=now + run_result.status_time + self.TASK_TIMEOUT,
+        )
+        self._ensure_polling()
+        return run_result.uuid, future
+
+    async def generate(self, prompt: str, output_directory: str) -> str:
+        task_id, future = await self.submit(prompt)
+        base64_images = await future
+        saved_files = await asyncio.to_thread(
+            _save_base64_images, base64_images, task_id, output_directory
+        )
+        return saved_files[0]
+
+    async def close(self):
+        if self._poll_task and not self._poll_task.done():
+            self._poll_task.cancel()
+        for task in self._pending.values():
+            if not task.future.done():
+                task.future.cancel()
+        self._pending.clear()
+
+
+KANDINSKY_CLIENT = KandinskyClient()
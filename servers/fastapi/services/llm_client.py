@@ -42,6 +42,7 @@ from models.llm_tool_call import (
 )
 from models.llm_tools import LLMDynamicTool, LLMTool
 from services.llm_tool_calls_handler import LLMToolCallsHandler
+from services.resource_governor import RESOURCE_GOVERNOR
 from utils.async_iterator import iterator_to_async
 from utils.dummy_functions import do_nothing_async
 from utils.get_env import (
@@ -417,36 +418,37 @@ class LLMClient:
         parsed_tools = self.tool_calls_handler.parse_tools(tools)
 
         content = None
-        match self.llm_provider:
-            case LLMProvider.OPENAI:
-                content = await self._generate_openai(
-                    model=model,
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    tools=parsed_tools,
-                )
-            case LLMProvider.GOOGLE:
-                content = await self._generate_google(
-                    model=model,
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    tools=parsed_tools,
-                )
-            case LLMProvider.ANTHROPIC:
-                content = await self._generate_anthropic(
-                    model=model,
-                    messages=messages,
-                    max_tokens=max_tokens,
-                    tools=parsed_tools,
-                )
-            case LLMProvider.OLLAMA:
-                content = await self._generate_ollama(
-                    model=model, messages=messages, max_tokens=max_tokens
-                )
-            case LLMProvider.CUSTOM:
-                content = await self._generate_custom(
-                    model=model, messages=messages, max_tokens=max_tokens
-                )
+        async with RESOURCE_GOVERNOR.slot("llm"):
+            match self.llm_provider:
+                case LLMProvider.OPENAI:
+                    content = await self._generate_openai(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        tools=parsed_tools,
+                    )
+                case LLMProvider.GOOGLE:
+                    content = await self._generate_google(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        tools=parsed_tools,
+                    )
+                case LLMProvider.ANTHROPIC:
+                    content = await self._generate_anthropic(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        tools=parsed_tools,
+                    )
+                case LLMProvider.OLLAMA:
+                    content = await self._generate_ollama(
+                        model=model, messages=messages, max_tokens=max_tokens
+                    )
+                case LLMProvider.CUSTOM:
+                    content = await self._generate_custom(
+                        model=model, messages=messages, max_tokens=max_tokens
+                    )
         if content is None:
             raise HTTPException(
                 status_code=400,
@@ -811,48 +813,49 @@ class LLMClient:
         parsed_tools = self.tool_calls_handler.parse_tools(tools)
 
         content = None
-        match self.llm_provider:
-            case LLMProvider.OPENAI:
-                content = await self._generate_openai_structured(
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                    strict=strict,
-                    tools=parsed_tools,
-                    max_tokens=max_tokens,
-                )
-            case LLMProvider.GOOGLE:
-                content = await self._generate_google_structured(
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                    tools=parsed_tools,
-                    max_tokens=max_tokens,
-                )
-            case LLMProvider.ANTHROPIC:
-                content = await self._generate_anthropic_structured(
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                    tools=parsed_tools,
-                    max_tokens=max_tokens,
-                )
-            case LLMProvider.OLLAMA:
-                content = await self._generate_ollama_structured(
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                    strict=strict,
-                    max_tokens=max_tokens,
-                )
-            case LLMProvider.CUSTOM:
-                content = await self._generate_custom_structured(
-                    model=model,
-                    messages=messages,
-                    response_format=response_format,
-                    strict=strict,
-                    max_tokens=max_tokens,
-                )
+        async with RESOURCE_GOVERNOR.slot("llm"):
+            match self.llm_provider:
+                case LLMProvider.OPENAI:
+                    content = await self._generate_openai_structured(
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        strict=strict,
+                        tools=parsed_tools,
+                        max_tokens=max_tokens,
+                    )
+                case LLMProvider.GOOGLE:
+                    content = await self._generate_google_structured(
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        tools=parsed_tools,
+                        max_tokens=max_tokens,
+                    )
+                case LLMProvider.ANTHROPIC:
+                    content = await self._generate_anthropic_structured(
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        tools=parsed_tools,
+                        max_tokens=max_tokens,
+                    )
+                case LLMProvider.OLLAMA:
+                    content = await self._generate_ollama_structured(
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        strict=strict,
+                        max_tokens=max_tokens,
+                    )
+                case LLMProvider.CUSTOM:
+                    content = await self._generate_custom_structured(
+                        model=model,
+                        messages=messages,
+                        response_format=response_format,
+                        strict=strict,
+                        max_tokens=max_tokens,
+                    )
         if content is None:
             raise HTTPException(
                 status_code=400,
@@ -1121,7 +1124,7 @@ class LLMClient:
             depth=depth,
         )
 
-    def stream(
+    def _stream(
         self,
         model: str,
         messages: List[LLMMessage],
@@ -1161,6 +1164,20 @@ class LLMClient:
                     model=model, messages=messages, max_tokens=max_tokens
                 )
 
+    def stream(
+        self,
+        model: str,
+        messages: List[LLMMessage],
+        max_tokens: Optional[int] = None,
+        tools: Optional[List[type[LLMTool] | LLMDynamicTool]] = None,
+    ):
+        return RESOURCE_GOVERNOR.stream(
+            "llm",
+            self._stream(
+                model=model, messages=messages, max_tokens=max_tokens, tools=tools
+            ),
+        )
+
     # ? Stream Structured Content
     async def _stream_openai_structured(
         self,
@@ -1543,7 +1560,7 @@ class LLMClient:
             depth=depth,
         )
 
-    def stream_structured(
+    def _stream_structured(
         self,
         model: str,
         messages: List[LLMMessage],
@@ -1597,6 +1614,27 @@ class LLMClient:
                     max_tokens=max_tokens,
                 )
 
+    def stream_structured(
+        self,
+        model: str,
+        messages: List[LLMMessage],
+        response_format: dict,
+        strict: bool = False,
+        tools: Optional[List[type[LLMTool] | LLMDynamicTool]] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        return RESOURCE_GOVERNOR.stream(
+            "llm",
+            self._stream_structured(
+                model=model,
+                messages=messages,
+                response_format=response_format,
+                strict=strict,
+                tools=tools,
+                max_tokens=max_tokens,
+            ),
+        )
+
     # ? Web search
     async def _search_openai(self, query: str) -> str:
         client: AsyncOpenAI = self._client
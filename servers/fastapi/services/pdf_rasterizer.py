@@ -0,0 +1,134 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from services.process_pool_service import PROCESS_POOL_SERVICE
+from utils.get_env import (
+    get_pdf_raster_dpi_env,
+    get_pdf_raster_format_env,
+    get_pdf_raster_thumbnail_width_env,
+    get_pdf_raster_timeout_env,
+)
+
+
+IMAGE_FORMATS = {"png": "PNG", "webp": "WEBP"}
+
+
+def _count_pages(file_path: str) -> int:
+    import pypdfium2
+
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _render_pages(
+    file_path: str,
+    page_indices: List[int],
+    output_dir: str,
+    dpi: int,
+    image_format: str,
+    thumbnail_width: int,
+) -> List[Tuple[str, Optional[str]]]:
+    import pypdfium2
+
+    extension = image_format.lower()
+    save_kwargs = (
+        {"quality": 90, "method": 4} if image_format == "WEBP" else {"compress_level": 3}
+    )
+
+    pdf = pypdfium2.PdfDocument(file_path)
+    rendered = []
+    try:
+        for page_index in page_indices:
+            page = pdf[page_index]
+            try:
+                image = page.render(scale=dpi / 72).to_pil()
+            finally:
+                page.close()
+
+            # Page numbers in file names are 1-based, as with pdfplumber before
+            image_path = os.path.join(output_dir, f"page_{page_index + 1}.{extension}")
+            image.save(image_path, image_format, **save_kwargs)
+
+            thumbnail_path = None
+            if thumbnail_width:
+                thumbnail_path = os.path.join(
+                    output_dir, f"page_{page_index + 1}_thumbnail.{extension}"
+                )
+                image.thumbnail((thumbnail_width, thumbnail_width * 10))
+                image.save(thumbnail_path, image_format, **save_kwargs)
+
+            rendered.append((image_path, thumbnail_path))
+    finally:
+        pdf.close()
+    return rendered
+
+
+class PdfRasterizer:
+    """
+    Renders PDF pages to images with pdfium. Pages are split into contiguous
+    ranges that are rendered in parallel in the shared process pool.
+    """
+
+    def __init__(self):
+        self.dpi = int(get_pdf_raster_dpi_env() or 150)
+        self.image_format = IMAGE_FORMATS.get(
+            (get_pdf_raster_format_env() or "png").lower(), "PNG"
+        )
+        self.thumbnail_width = int(get_pdf_raster_thumbnail_width_env() or 0)
+        # Per range of pages, so one pathological page can't block an import
+        self.timeout = float(get_pdf_raster_timeout_env() or 120)
+
+    def _get_page_ranges(self, page_count: int) -> List[List[int]]:
+        # A few ranges per worker keeps the pool busy when pages differ in cost
+        n_ranges = min(page_count, PROCESS_POOL_SERVICE.max_workers * 2)
+        if not n_ranges:
+            return []
+        pages_per_range = -(-page_count // n_ranges)
+        return [
+            list(range(start, min(start + pages_per_range, page_count)))
+            for start in range(0, page_count, pages_per_range)
+        ]
+
+    async def rasterize(
+        self,
+        file_path: str,
+        output_dir: str,
+        dpi: Optional[int] = None,
+        image_format: Optional[str] = None,
+        thumbnail_width: Optional[int] = None,
+    ) -> List[Tuple[str, Optional[str]]]:
+        """
+        Returns (image path, thumbnail path) of every page in page order.
+        Thumbnail path is None unless thumbnails are enabled.
+        """
+        dpi = dpi or self.dpi
+        image_format = (
+            IMAGE_FORMATS[image_format.lower()] if image_format else self.image_format
+        )
+        if thumbnail_width is None:
+            thumbnail_width = self.thumbnail_width
+
+        page_count = await asyncio.to_thread(_count_pages, file_path)
+        results = await asyncio.gather(
+            *[
+                PROCESS_POOL_SERVICE.run(
+                    _render_pages,
+                    file_path,
+                    page_indices,
+                    output_dir,
+                    dpi,
+                    image_format,
+                    thumbnail_width,
+                    timeout=self.timeout,
+                )
+                for page_indices in self._get_page_ranges(page_count)
+            ]
+        )
+        return [page for pages in results for page in pages]
+
+
+PDF_RASTERIZER = PdfRasterizer()
@@ -1,5 +1,9 @@
+import asyncio
+import io
+import json
 import os
-from typing import List, Optional
+import zipfile
+from typing import IO, Dict, List, Optional, Tuple, Union
 from lxml import etree
 from services.html_to_text_runs_service import (
     parse_html_text_to_text_runs as parse_inline_html_to_runs,
@@ -10,8 +14,9 @@ from pptx.shapes.autoshape import Shape
 from pptx.slide import Slide
 from pptx.text.text import _Paragraph, TextFrame, Font, _Run
 from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
 from lxml.etree import fromstring, tostring
-from PIL import Image
 from pptx.oxml.xmlchemy import OxmlElement
 
 from pptx.util import Pt
@@ -34,28 +39,50 @@ from models.pptx_models import (
     PptxTextBoxModel,
     PptxTextRunModel,
 )
-from utils.download_helpers import download_files
-from utils.image_utils import (
-    clip_image,
-    create_circle_image,
-    fit_image,
-    invert_image,
-    round_image_corners,
-    set_image_opacity,
-)
+from services.asset_resolver_service import ASSET_RESOLVER_SERVICE
+from services.process_pool_service import PROCESS_POOL_SERVICE
+from services.processed_image_cache_service import PROCESSED_IMAGE_CACHE_SERVICE
+from services.slide_part_cache_service import SLIDE_PART_CACHE_SERVICE
+from utils.image_utils import process_image_file
+from utils.pptx_package_writer import save_presentation
 import uuid
 
 BLANK_SLIDE_LAYOUT = 6
 
+# Smaller decks build faster than they are sent to worker processes
+PARALLEL_MIN_SLIDES = 8
+
+# Slide XML and its pictures by relationship id, as read by read_slide_parts
+SlideParts = Tuple[etree._Element, Dict[str, bytes]]
+
 
 class PptxPresentationCreator:
 
-    def __init__(self, ppt_model: PptxPresentationModel, temp_dir: str):
+    def __init__(
+        self,
+        ppt_model: PptxPresentationModel,
+        temp_dir: str,
+        incremental: bool = False,
+        parallel: bool = False,
+    ):
         self._temp_dir = temp_dir
 
         self._ppt_model = ppt_model
         self._slide_models = ppt_model.slides
 
+        # Processed image path of every picture model that needs processing
+        self._processed_images: Dict[int, Optional[str]] = {}
+
+        # In incremental mode, unchanged slides are copied from earlier exports
+        self._incremental = incremental
+        self._slide_fingerprints: List[Optional[str]] = [None] * len(
+            self._slide_models
+        )
+        self._cached_slide_parts: Dict[int, SlideParts] = {}
+
+        # In parallel mode, slides are built in worker processes
+        self._parallel = parallel
+
         self._ppt = Presentation()
         self._ppt.slide_width = Pt(1280)
         self._ppt.slide_height = Pt(720)
@@ -67,59 +94,337 @@ class PptxPresentationCreator:
         parent.append(element)
         return element
 
-    async def fetch_network_assets(self):
-        image_urls = []
-        models_with_network_asset: List[PptxPictureBoxModel] = []
-
-        if self._ppt_model.shapes:
-            for each_shape in self._ppt_model.shapes:
-                if isinstance(each_shape, PptxPictureBoxModel):
-                    image_path = each_shape.picture.path
-                    if image_path.startswith("http"):
-                        if "app_data/" in image_path:
-                            relative_path = image_path.split("app_data/")[1]
-                            each_shape.picture.path = os.path.join(
-                                "/app_data", relative_path
-                            )
-                            each_shape.picture.is_network = False
-                            continue
-                        image_urls.append(image_path)
-                        models_with_network_asset.append(each_shape)
+    def get_slide_models_to_build(self) -> List[PptxSlideModel]:
+        return [
+            slide_model
+            for index, slide_model in enumerate(self._slide_models)
+            if index not in self._cached_slide_parts
+        ]
+
+    def get_asset_hashes(self) -> Dict[str, str]:
+        """
+        Returns the content hash of every picture of the deck by path.
+        Pictures that couldn't be fetched keep their url.
+        """
+        asset_hashes = {}
+        for slide_model in [self._ppt_model, *self._slide_models]:
+            for shape_model in slide_model.shapes or []:
+                if not isinstance(shape_model, PptxPictureBoxModel):
+                    continue
+                path = shape_model.picture.path
+                if path in asset_hashes or shape_model.picture.is_network:
+                    continue
+                try:
+                    asset_hashes[path] = PROCESSED_IMAGE_CACHE_SERVICE.get_source_hash(
+                        path
+                    )
+                except OSError:
+                    pass
+        return asset_hashes
+
+    def find_cached_slides(self):
+        """
+        Fingerprints every slide model and reads the slides built by earlier
+        exports. Runs after assets are fetched, so pictures are fingerprinted
+        by content: an image that changed behind the same url, which the
+        asset resolver revalidates, rebuilds its slide.
+
+        Parts are read here, so corrupted entries are rebuilt like changed
+        slides, with their pictures processed.
+        """
+        asset_hashes = self.get_asset_hashes()
+        for index, slide_model in enumerate(self._slide_models):
+            fingerprint = SLIDE_PART_CACHE_SERVICE.get_fingerprint(
+                slide_model, self._ppt_model.shapes, asset_hashes
+            )
+            self._slide_fingerprints[index] = fingerprint
+            cached_parts = SLIDE_PART_CACHE_SERVICE.get(fingerprint)
+            if not cached_parts:
+                continue
+            slide_parts = self.read_slide_parts(io.BytesIO(cached_parts))
+            if slide_parts:
+                self._cached_slide_parts[index] = slide_parts
+
+        print(
+            f"Reusing {len(self._cached_slide_parts)} of "
+            f"{len(self._slide_models)} slides from earlier exports"
+        )
 
+    async def fetch_network_assets(self):
+        picture_models: List[PptxPictureBoxModel] = []
+        for each_shape in self._ppt_model.shapes or []:
+            if isinstance(each_shape, PptxPictureBoxModel):
+                picture_models.append(each_shape)
+        # Pictures of cached slides are fetched too, they are part of the fingerprint
         for each_slide in self._slide_models:
             for each_shape in each_slide.shapes:
                 if isinstance(each_shape, PptxPictureBoxModel):
-                    image_path = each_shape.picture.path
-                    if image_path.startswith("http"):
-                        if "app_data" in image_path:
-                            relative_path = image_path.split("app_data/")[1]
-                            each_shape.picture.path = os.path.join(
-                                "/app_data", relative_path
-                            )
-                            each_shape.picture.is_network = False
-                            continue
-                        image_urls.append(image_path)
-                        models_with_network_asset.append(each_shape)
-
-        if image_urls:
-            image_paths = await download_files(image_urls, self._temp_dir)
-
-            for each_shape, each_image_path in zip(
-                models_with_network_asset, image_paths
-            ):
-                if each_image_path:
-                    each_shape.picture.path = each_image_path
-                    each_shape.picture.is_network = False
+                    picture_models.append(each_shape)
+
+        if not picture_models:
+            return
+
+        # Identical urls of a deck are resolved or downloaded once
+        resolved_paths = await ASSET_RESOLVER_SERVICE.resolve(
+            [each.picture.path for each in picture_models], self._temp_dir
+        )
+        for each_model in picture_models:
+            image_path = resolved_paths.get(each_model.picture.path)
+            if image_path:
+                each_model.picture.path = image_path
+                each_model.picture.is_network = False
+
+    @staticmethod
+    def needs_image_processing(picture_model: PptxPictureBoxModel) -> bool:
+        return bool(
+            picture_model.clip
+            or picture_model.border_radius
+            or picture_model.invert
+            or picture_model.opacity
+            or picture_model.object_fit
+            or picture_model.shape
+        )
+
+    @staticmethod
+    def get_image_processing_args(picture_model: PptxPictureBoxModel) -> Tuple:
+        return (
+            picture_model.picture.path,
+            picture_model.position.width,
+            picture_model.position.height,
+            picture_model.clip,
+            picture_model.border_radius,
+            picture_model.object_fit,
+            picture_model.shape == PptxBoxShapeEnum.CIRCLE,
+            picture_model.invert,
+            picture_model.opacity,
+        )
+
+    @staticmethod
+    def dump_image_processing_args(args: Tuple) -> str:
+        return json.dumps(args, default=lambda value: value.model_dump(mode="json"))
+
+    async def process_images(self):
+        """
+        Processes every picture of the deck in the shared process pool before
+        slides are assembled. Pictures with the same source and transformation
+        are processed once, and reused from the processed image cache across
+        exports.
+        """
+        jobs: Dict[str, Tuple[Tuple, List[PptxPictureBoxModel]]] = {}
+        for slide_model in self.get_slide_models_to_build():
+            for shape_model in slide_model.shapes:
+                if type(shape_model) is not PptxPictureBoxModel:
+                    continue
+                if not self.needs_image_processing(shape_model):
+                    continue
+                args = self.get_image_processing_args(shape_model)
+                # Border radius and object fit aren't hashable, so json is the key
+                job_key = self.dump_image_processing_args(args)
+                jobs.setdefault(job_key, (args, []))[1].append(shape_model)
+
+        if not jobs:
+            return
+
+        results = await asyncio.gather(
+            *[self.process_image(args) for args, _ in jobs.values()],
+            return_exceptions=True,
+        )
+        for (args, picture_models), result in zip(jobs.values(), results):
+            if isinstance(result, Exception):
+                print(f"Could not process image {args[0]}: {result}")
+                result = None
+            for picture_model in picture_models:
+                self._processed_images[id(picture_model)] = result
+
+    async def process_image(self, args: Tuple) -> Optional[str]:
+        def process():
+            return PROCESS_POOL_SERVICE.run(
+                process_image_file,
+                args[0],
+                os.path.join(self._temp_dir, f"{uuid.uuid4()}.png"),
+                *args[1:],
+            )
+
+        try:
+            source_hash = await asyncio.to_thread(
+                PROCESSED_IMAGE_CACHE_SERVICE.get_source_hash, args[0]
+            )
+        except OSError:
+            # Missing sources are reported by the processing itself
+            return await process()
+
+        transform = self.dump_image_processing_args(args[1:])
+        return await PROCESSED_IMAGE_CACHE_SERVICE.get_or_generate(
+            PROCESSED_IMAGE_CACHE_SERVICE.get_transform_key(source_hash, transform),
+            self._temp_dir,
+            process,
+        )
 
     async def create_ppt(self):
         await self.fetch_network_assets()
+        if self._incremental:
+            await asyncio.to_thread(self.find_cached_slides)
+        await self.process_images()
 
         for slide_model in self._slide_models:
             # Adding global shapes to slide
             if self._ppt_model.shapes:
                 slide_model.shapes.append(self._ppt_model.shapes)
 
-            self.add_and_populate_slide(slide_model)
+        built_slide_parts: Dict[int, bytes] = {}
+        if self._parallel:
+            built_slide_parts = await self.build_slides_in_parallel()
+
+        for index, slide_model in enumerate(self._slide_models):
+            cached_slide_parts = self._cached_slide_parts.get(index)
+            if cached_slide_parts:
+                self.add_slide_from_parts(slide_model, cached_slide_parts)
+                continue
+
+            slide_parts = built_slide_parts.get(index)
+            read_slide_parts = slide_parts and self.read_slide_parts(
+                io.BytesIO(slide_parts)
+            )
+            if read_slide_parts:
+                self.add_slide_from_parts(slide_model, read_slide_parts)
+            else:
+                slide = self.add_and_populate_slide(slide_model)
+                if not self._incremental:
+                    continue
+                buffer = io.BytesIO()
+                self.dump_slide_parts(slide, buffer)
+                slide_parts = buffer.getvalue()
+
+            if self._incremental:
+                self.cache_slide_parts(self._slide_fingerprints[index], slide_parts)
+
+    async def build_slides_in_parallel(self) -> Dict[int, bytes]:
+        """
+        Builds the slides that aren't cached in the shared process pool.
+        Every worker builds a batch of slides into its own presentation and
+        returns their parts, which add_slide_from_parts merges in order.
+        Slides of a failed batch are built here instead.
+        """
+        indexes = [
+            index
+            for index in range(len(self._slide_models))
+            if index not in self._cached_slide_parts
+        ]
+        if len(indexes) < PARALLEL_MIN_SLIDES:
+            return {}
+
+        batch_count = min(PROCESS_POOL_SERVICE.max_workers, len(indexes))
+        batches = [indexes[start::batch_count] for start in range(batch_count)]
+        results = await asyncio.gather(
+            *[
+                PROCESS_POOL_SERVICE.run(
+                    build_slide_parts,
+                    [self._slide_models[index] for index in batch],
+                    [self.get_processed_images_of_slide(index) for index in batch],
+                    self._temp_dir,
+                )
+                for batch in batches
+            ],
+            return_exceptions=True,
+        )
+
+        built_slide_parts = {}
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"Could not build slides in parallel: {result}")
+                continue
+            built_slide_parts.update(zip(batch, result))
+        return built_slide_parts
+
+    def get_processed_images_of_slide(self, index: int) -> Dict[int, Optional[str]]:
+        # Picture models are copied into the worker, so paths go by shape index
+        return {
+            shape_index: self._processed_images[id(shape_model)]
+            for shape_index, shape_model in enumerate(self._slide_models[index].shapes)
+            if id(shape_model) in self._processed_images
+        }
+
+    def dump_slide_parts(self, slide: Slide, file: Union[str, IO[bytes]]):
+        """
+        Writes the slide XML and its pictures as a zip, which
+        read_slide_parts reads back.
+        """
+        with zipfile.ZipFile(file, "w") as parts:
+            parts.writestr("slide.xml", tostring(slide._element.cSld))
+            for rId, relationship in slide.part.rels.items():
+                if relationship.is_external or relationship.reltype != RT.IMAGE:
+                    continue
+                image_part = relationship.target_part
+                # Pictures are already compressed
+                parts.writestr(
+                    f"media/{rId}.{image_part.partname.ext}",
+                    image_part.blob,
+                    compress_type=zipfile.ZIP_STORED,
+                )
+
+    def cache_slide_parts(self, fingerprint: str, slide_parts: bytes):
+        """
+        Stores the parts of a slide, keyed by the fingerprint of its model.
+        """
+        parts_path = os.path.join(self._temp_dir, f"{uuid.uuid4()}.zip")
+        try:
+            os.makedirs(self._temp_dir, exist_ok=True)
+            with open(parts_path, "wb") as f:
+                f.write(slide_parts)
+            SLIDE_PART_CACHE_SERVICE.put(fingerprint, parts_path)
+        except Exception as e:
+            print(f"Could not cache slide parts: {e}")
+        finally:
+            if os.path.exists(parts_path):
+                os.remove(parts_path)
+
+    def read_slide_parts(self, file: Union[str, IO[bytes]]) -> Optional[SlideParts]:
+        """
+        Reads parts written by dump_slide_parts into memory.
+        """
+        try:
+            with zipfile.ZipFile(file) as parts:
+                common_slide_data = parse_xml(parts.read("slide.xml"))
+                images = {
+                    os.path.splitext(os.path.basename(name))[0]: parts.read(name)
+                    for name in parts.namelist()
+                    if name.startswith("media/")
+                }
+        except Exception as e:
+            print(f"Could not read slide parts: {e}")
+            return None
+        return common_slide_data, images
+
+    def add_slide_from_parts(self, slide_model: PptxSlideModel, slide_parts: SlideParts):
+        """
+        Adds a slide from parts read by read_slide_parts, pointing the copied
+        XML to the pictures added to this presentation. Parts are added in the
+        same order as add_and_populate_slide does, so the package is identical
+        to building the slide here.
+        """
+        common_slide_data, images = slide_parts
+        slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
+        if slide_model.note:
+            slide.notes_slide.notes_text_frame.text = slide_model.note
+
+        relationship_ids = {}
+        for old_rId, blob in images.items():
+            _, relationship_ids[old_rId] = slide.part.get_or_add_image_part(
+                io.BytesIO(blob)
+            )
+        for element in common_slide_data.iter():
+            for attribute in (qn("r:embed"), qn("r:link")):
+                old_rId = element.get(attribute)
+                if old_rId in relationship_ids:
+                    element.set(attribute, relationship_ids[old_rId])
+
+        # Children are moved instead of the element, which would carry
+        # namespace declarations that the slide root already has
+        c_sld = slide._element.cSld
+        c_sld.attrib.update(common_slide_data.attrib)
+        for child in list(c_sld):
+            c_sld.remove(child)
+        c_sld.extend(list(common_slide_data))
 
     def set_presentation_theme(self):
         slide_master = self._ppt.slide_master
@@ -141,7 +446,7 @@ class PptxPresentationCreator:
 
         theme_part._blob = tostring(theme)
 
-    def add_and_populate_slide(self, slide_model: PptxSlideModel):
+    def add_and_populate_slide(self, slide_model: PptxSlideModel) -> Slide:
         slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
 
         if slide_model.background:
@@ -165,6 +470,8 @@ class PptxPresentationCreator:
             elif model_type is PptxConnectorModel:
                 self.add_connector(slide, shape_model)
 
+        return slide
+
     def add_connector(self, slide: Slide, connector_model: PptxConnectorModel):
         if connector_model.thickness == 0:
             return
@@ -177,47 +484,19 @@ class PptxPresentationCreator:
 
     def add_picture(self, slide: Slide, picture_model: PptxPictureBoxModel):
         image_path = picture_model.picture.path
-        if (
-            picture_model.clip
-            or picture_model.border_radius
-            or picture_model.invert
-            or picture_model.opacity
-            or picture_model.object_fit
-            or picture_model.shape
-        ):
-            try:
-                image = Image.open(image_path)
-            except:
-                print(f"Could not open image: {image_path}")
-                return
-
-            image = image.convert("RGBA")
-            # ? Applying border radius twice to support both clip and object fit
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.object_fit:
-                image = fit_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
-                    picture_model.object_fit,
+        if self.needs_image_processing(picture_model):
+            if id(picture_model) in self._processed_images:
+                image_path = self._processed_images[id(picture_model)]
+            else:
+                # Picture wasn't part of the preprocessing phase
+                args = self.get_image_processing_args(picture_model)
+                image_path = process_image_file(
+                    args[0],
+                    os.path.join(self._temp_dir, f"{uuid.uuid4()}.png"),
+                    *args[1:],
                 )
-            elif picture_model.clip:
-                image = clip_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
-                )
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.shape == PptxBoxShapeEnum.CIRCLE:
-                image = create_circle_image(image)
-            if picture_model.invert:
-                image = invert_image(image)
-            if picture_model.opacity:
-                image = set_image_opacity(image, picture_model.opacity)
-            image_path = os.path.join(self._temp_dir, f"{uuid.uuid4()}.png")
-            image.save(image_path)
+            if not image_path:
+                return
 
         margined_position = self.get_margined_position(
             picture_model.position, picture_model.margin
@@ -478,5 +757,29 @@ class PptxPresentationCreator:
         except Exception as e:
             print(f"Could not apply strikethrough: {e}")
 
-    def save(self, path: str):
-        self._ppt.save(path)
+    def save(self, path: Union[str, IO[bytes]]):
+        save_presentation(self._ppt, path)
+
+
+def build_slide_parts(
+    slide_models: List[PptxSlideModel],
+    processed_images: List[Dict[int, Optional[str]]],
+    temp_dir: str,
+) -> List[bytes]:
+    """
+    Builds slides into a presentation of their own and returns the parts of
+    every slide. Runs in the process pool.
+    """
+    pptx_creator = PptxPresentationCreator(
+        PptxPresentationModel(slides=slide_models), temp_dir
+    )
+    slide_parts = []
+    for slide_model, slide_processed_images in zip(slide_models, processed_images):
+        for shape_index, image_path in slide_processed_images.items():
+            shape_model = slide_model.shapes[shape_index]
+            pptx_creator._processed_images[id(shape_model)] = image_path
+        slide = pptx_creator.add_and_populate_slide(slide_model)
+        buffer = io.BytesIO()
+        pptx_creator.dump_slide_parts(slide, buffer)
+        slide_parts.append(buffer.getvalue())
+    return slide_parts
@@ -0,0 +1,72 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from utils.get_env import get_cpu_pool_workers_env
+
+
+class ProcessPoolService:
+    """
+    Shared pool of worker processes for short CPU-bound jobs such as
+    rasterizing PDF pages or processing images. Functions submitted here must
+    be importable module-level functions with picklable arguments.
+    """
+
+    def __init__(self):
+        self.max_workers = int(get_cpu_pool_workers_env() or os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(
+        self, func: Callable[..., Any], *args, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Runs func in the pool. When it takes longer than timeout seconds,
+        asyncio.TimeoutError is raised and the pool is replaced, since the
+        hanging worker can't be stopped on its own.
+        """
+        executor = self.executor
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"{func.__name__} timed out after {timeout}s in the process pool")
+            if self._executor is executor:
+                self._executor = None
+                # Other in-flight jobs get the same time to finish
+                asyncio.get_running_loop().call_later(
+                    timeout, self._terminate_executor, executor
+                )
+            raise
+        except BrokenProcessPool:
+            # Next call starts a fresh pool instead of failing forever
+            if self._executor is executor:
+                self._executor = None
+            raise
+
+    @staticmethod
+    def _terminate_executor(executor: ProcessPoolExecutor):
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+PROCESS_POOL_SERVICE = ProcessPoolService()
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+import hashlib
+import os
+from typing import Tuple
+
+from services.image_cache_service import ImageCacheService
+from utils.asset_directory_utils import get_processed_images_directory
+from utils.get_env import get_processed_image_cache_max_mb_env
+
+
+class ProcessedImageCacheService(ImageCacheService):
+    """
+    Cache of pictures processed for PPTX export (resized, clipped, rounded...),
+    keyed by the content hash of the source image and the transformation.
+    Re-exporting a deck reuses them instead of repeating the PIL work.
+    """
+
+    def __init__(self, hash_cache_size: int = 4096):
+        super().__init__()
+        self.max_bytes = (
+            int(get_processed_image_cache_max_mb_env() or 1024) * 1024 * 1024
+        )
+        self.hash_cache_size = hash_cache_size
+        self._source_hashes: OrderedDict[Tuple[str, int, int], str] = OrderedDict()
+
+    @property
+    def cache_directory(self) -> str:
+        return get_processed_images_directory()
+
+    def get_source_hash(self, image_path: str) -> str:
+        """
+        Returns sha256 of the file, remembered while its size and mtime don't change.
+        """
+        stat = os.stat(image_path)
+        stat_key = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            source_hash = self._source_hashes.get(stat_key)
+            if source_hash:
+                self._source_hashes.move_to_end(stat_key)
+                return source_hash
+
+        sha256 = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        source_hash = sha256.hexdigest()
+
+        with self._lock:
+            self._source_hashes[stat_key] = source_hash
+            while len(self._source_hashes) > self.hash_cache_size:
+                self._source_hashes.popitem(last=False)
+        return source_hash
+
+    @staticmethod
+    def get_transform_key(source_hash: str, transform: str) -> str:
+        return hashlib.sha256(f"{source_hash}:{transform}".encode("utf-8")).hexdigest()
+
+
+PROCESSED_IMAGE_CACHE_SERVICE = ProcessedImageCacheService()
@@ -0,0 +1,250 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, TypeVar
+
+from utils.get_env import (
+    get_download_concurrency_env,
+    get_embed_concurrency_env,
+    get_image_concurrency_env,
+    get_llm_concurrency_env,
+    get_office_concurrency_env,
+    get_parse_concurrency_env,
+)
+
+
+class Priority(IntEnum):
+    # Lower value is served first
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+T = TypeVar("T")
+
+
+# Priority of the current request, inherited by its tasks and worker threads
+CURRENT_PRIORITY: ContextVar[Priority] = ContextVar(
+    "resource_priority", default=Priority.NORMAL
+)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    enqueued_at: float = field(compare=False)
+    wake: Callable[[], None] = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    cancelled: bool = field(default=False, compare=False)
+
+
+class ResourcePool:
+    """
+    Counting semaphore that hands free slots to waiters by priority and then
+    in arrival order. Slots are acquired on the event loop, so waiting never
+    blocks a worker thread, and can be released from any thread.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+
+        self._acquired = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _record_wait(self, wait: float):
+        self._acquired += 1
+        if wait > 0:
+            self._waited += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+    def _try_acquire(
+        self, priority: Priority, wake: Callable[[], None]
+    ) -> Optional[_Waiter]:
+        """
+        Takes a slot right away and returns None, or queues and returns the waiter.
+        """
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                self._record_wait(0)
+                return None
+
+            waiter = _Waiter(
+                priority=int(priority),
+                sequence=next(self._sequence),
+                enqueued_at=time.monotonic(),
+                wake=wake,
+            )
+            heapq.heappush(self._waiters, waiter)
+            return waiter
+
+    def _cancel(self, waiter: _Waiter):
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                return
+        # The slot was handed over while the waiter was being cancelled
+        self.release()
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter.cancelled:
+                    continue
+                # The slot passes to the waiter, so the active count stays the same
+                waiter.granted = True
+                self._record_wait(time.monotonic() - waiter.enqueued_at)
+                waiter.wake()
+                return
+            self._active -= 1
+
+    async def acquire(self, priority: Priority):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(None)
+            )
+
+        waiter = self._try_acquire(priority, wake)
+        if waiter is None:
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            queued: Dict[str, int] = {}
+            for waiter in self._waiters:
+                if not waiter.cancelled:
+                    name = Priority(waiter.priority).name.lower()
+                    queued[name] = queued.get(name, 0) + 1
+            return {
+                "limit": self.limit,
+                "active": self._active,
+                "queued": sum(queued.values()),
+                "queued_by_priority": queued,
+                "acquired_total": self._acquired,
+                "waited_total": self._waited,
+                "average_wait_ms": round(
+                    self._total_wait / self._waited * 1000 if self._waited else 0, 2
+                ),
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+            }
+
+
+class ResourceGovernor:
+    """
+    Named concurrency pools for the expensive stages of presentation generation.
+    Services take a slot around every provider call or CPU-heavy job, so many
+    decks in parallel queue up instead of overloading providers and cores.
+
+    Requests get Priority.NORMAL unless they run inside `priority(...)`,
+    e.g. single slide edits are interactive and jump ahead of deck generation.
+    """
+
+    def __init__(self):
+        self.pools: Dict[str, ResourcePool] = {
+            "llm": ResourcePool("llm", int(get_llm_concurrency_env() or 16)),
+            "image": ResourcePool("image", int(get_image_concurrency_env() or 8)),
+            "embed": ResourcePool("embed", int(get_embed_concurrency_env() or 2)),
+            "parse": ResourcePool("parse", int(get_parse_concurrency_env() or 4)),
+            # LibreOffice instances share one user profile, so one at a time
+            "office": ResourcePool("office", int(get_office_concurrency_env() or 1)),
+            "download": ResourcePool(
+                "download", int(get_download_concurrency_env() or 16)
+            ),
+        }
+
+    @contextmanager
+    def priority(self, priority: Priority):
+        token = CURRENT_PRIORITY.set(priority)
+        try:
+            yield
+        finally:
+            CURRENT_PRIORITY.reset(token)
+
+    @asynccontextmanager
+    async def slot(self, name: str, priority: Optional[Priority] = None):
+        pool = self.pools[name]
+        await pool.acquire(CURRENT_PRIORITY.get() if priority is None else priority)
+        try:
+            yield
+        finally:
+            pool.release()
+
+    async def run_in_thread(
+        self, name: str, func: Callable[..., T], *args, priority: Optional[Priority] = None
+    ) -> T:
+        """
+        Takes a slot on the event loop and then runs `func` in a worker thread,
+        so threads of the default executor never wait for a slot.
+        """
+        async with self.slot(name, priority):
+            return await asyncio.to_thread(func, *args)
+
+    async def stream(
+        self, name: str, iterator: AsyncIterator, priority: Optional[Priority] = None
+    ):
+        """
+        Reads the async iterator under a slot and yields its items. Items are
+        buffered, so the slot is released as soon as the iterator is exhausted,
+        not when a slow consumer has read them all.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        end_of_items = object()
+        if priority is None:
+            priority = CURRENT_PRIORITY.get()
+
+        async def produce():
+            try:
+                async with self.slot(name, priority):
+                    async for each in iterator:
+                        queue.put_nowait((each, None))
+            except Exception as e:
+                queue.put_nowait((end_of_items, e))
+            else:
+                queue.put_nowait((end_of_items, None))
+            finally:
+                # Closes the upstream generator when the consumer stops early
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                each, error = await queue.get()
+                if each is end_of_items:
+                    if error:
+                        raise error
+                    return
+                yield each
+        finally:
+            producer.cancel()
+
+    def get_metrics(self) -> dict:
+        return {name: pool.get_metrics() for name, pool in self.pools.items()}
+
+
+RESOURCE_GOVERNOR = ResourceGovernor()
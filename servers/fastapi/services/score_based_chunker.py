@@ -1,21 +1,43 @@
 import asyncio
-from typing import List
+import re
+from typing import List, Optional, Tuple
+
+from langchain_core.documents.base import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from models.document_chunk import DocumentChunk
 
 
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
 class ScoreBasedChunker:
+    """
+    Works on markdown produced by docling.
+    - Scores headings to pick the most important sections of a document.
+    - Splits a document into section-aligned chunks with heading-path metadata,
+      so it can be used in place of a plain character splitter.
+    Both operate in a single pass over the lines of the text.
+    """
 
-    def extract_headings(self, text: str) -> List[str]:
-        lines = text.split("\n")
-        headings = []
-        
-        for line in lines:
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.fallback_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+
+    def _find_heading_lines(self, lines: List[str]) -> List[Tuple[int, str]]:
+        heading_lines = []
+        for i, line in enumerate(lines):
             line = line.strip()
             if line.startswith("#"):
-                headings.append(line)
-        
-        return headings
+                heading_lines.append((i, line))
+        return heading_lines
+
+    def extract_headings(self, text: str) -> List[str]:
+        return [heading for _, heading in self._find_heading_lines(text.split("\n"))]
 
     def score_headings(self, headings: List[str]) -> List[float]:
         heading_scores = []
@@ -24,9 +46,9 @@ class ScoreBasedChunker:
 
         for i, heading in enumerate(headings):
             score = 0.0
-            
+
             heading_level = len(heading) - len(heading.lstrip("#"))
-            
+
             if heading_level <= 3:
                 score += 10.0 - (heading_level - 1) * 2.0
             else:
@@ -46,17 +68,9 @@ class ScoreBasedChunker:
 
         return heading_scores
 
-    def get_chunks_from_headings(
-        self,
-        text: str,
-        headings: List[str],
-        heading_scores: List[float],
-        top_k: int = 10,
-    ) -> List[DocumentChunk]:
-        if not heading_scores:
-            heading_scores = self.score_headings(headings)
-
-        chunks = []
+    def _select_heading_indices(
+        self, heading_scores: List[float], top_k: int
+    ) -> List[int]:
         heading_indices = []
 
         for i, score in enumerate(heading_scores):
@@ -64,100 +78,217 @@ class ScoreBasedChunker:
                 heading_indices.append((i, score))
 
         if len(heading_indices) == 0:
-            return chunks
+            return []
 
         heading_indices.sort(key=lambda x: (-x[1], x[0]))
 
         if len(heading_indices) <= top_k:
             selected_indices = [idx for idx, _ in heading_indices]
             selected_indices.sort()
-        else:
-            score_groups = {}
-            for idx, score in heading_indices:
-                rounded_score = round(score)
-                if rounded_score not in score_groups:
-                    score_groups[rounded_score] = []
-                score_groups[rounded_score].append(idx)
-
-            sorted_groups = sorted(
-                score_groups.items(), key=lambda x: x[0], reverse=True
-            )
+            return selected_indices
 
-            selected_indices = []
+        score_groups = {}
+        for idx, score in heading_indices:
+            rounded_score = round(score)
+            if rounded_score not in score_groups:
+                score_groups[rounded_score] = []
+            score_groups[rounded_score].append(idx)
 
-            for score, indices in sorted_groups:
-                indices.sort()
-                remaining_needed = top_k - len(selected_indices)
+        sorted_groups = sorted(
+            score_groups.items(), key=lambda x: x[0], reverse=True
+        )
+
+        selected_indices = []
+
+        for score, indices in sorted_groups:
+            indices.sort()
+            remaining_needed = top_k - len(selected_indices)
 
-                if remaining_needed <= 0:
-                    break
+            if remaining_needed <= 0:
+                break
 
-                if len(indices) <= remaining_needed:
-                    selected_indices.extend(indices)
+            if len(indices) <= remaining_needed:
+                selected_indices.extend(indices)
+            else:
+                if remaining_needed == 1:
+                    mid_idx = len(indices) // 2
+                    selected_indices.append(indices[mid_idx])
+                elif remaining_needed == 2:
+                    selected_indices.append(indices[0])
+                    selected_indices.append(indices[-1])
                 else:
-                    if remaining_needed == 1:
-                        mid_idx = len(indices) // 2
-                        selected_indices.append(indices[mid_idx])
-                    elif remaining_needed == 2:
-                        selected_indices.append(indices[0])
-                        selected_indices.append(indices[-1])
-                    else:
-                        step = (len(indices) - 1) / (remaining_needed - 1)
-
-                        for i in range(remaining_needed):
-                            index = int(round(i * step))
-                            if index < len(indices):
-                                selected_indices.append(indices[index])
+                    step = (len(indices) - 1) / (remaining_needed - 1)
 
-            selected_indices.sort()
+                    for i in range(remaining_needed):
+                        index = int(round(i * step))
+                        if index < len(indices):
+                            selected_indices.append(indices[index])
 
-        lines = text.split("\n")
-        heading_positions = {}
-        
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-            if line_stripped.startswith("#"):
-                for heading_idx, heading in enumerate(headings):
-                    if heading == line_stripped and heading_idx not in heading_positions:
-                        heading_positions[heading_idx] = i
-                        break
-        
+        selected_indices.sort()
+        return selected_indices
+
+    def _build_chunks(
+        self,
+        lines: List[str],
+        heading_lines: List[Tuple[int, str]],
+        heading_scores: List[float],
+        selected_indices: List[int],
+    ) -> List[DocumentChunk]:
+        chunks = []
         for i, heading_idx in enumerate(selected_indices):
-            if heading_idx not in heading_positions:
-                continue
-                
-            heading = headings[heading_idx]
-            heading_line_idx = heading_positions[heading_idx]
-            
+            heading_line_idx, heading = heading_lines[heading_idx]
+
             if i + 1 < len(selected_indices):
-                next_heading_idx = selected_indices[i + 1]
-                if next_heading_idx in heading_positions:
-                    next_heading_line_idx = heading_positions[next_heading_idx]
-                    content_end = next_heading_line_idx
-                else:
-                    content_end = len(lines)
+                content_end = heading_lines[selected_indices[i + 1]][0]
             else:
                 content_end = len(lines)
 
-            content_lines = lines[heading_line_idx + 1 : content_end]
-            content = "\n".join(content_lines).strip()
+            content = "\n".join(lines[heading_line_idx + 1 : content_end]).strip()
 
-            chunk = DocumentChunk(
-                heading=heading,
-                content=content,
-                heading_index=heading_idx,
-                score=heading_scores[heading_idx],
+            chunks.append(
+                DocumentChunk(
+                    heading=heading,
+                    content=content,
+                    heading_index=heading_idx,
+                    score=heading_scores[heading_idx],
+                )
             )
-            chunks.append(chunk)
-            
         return chunks
 
-    async def get_n_chunks(self, text: str, n: int) -> List[DocumentChunk]:
-        headings = await asyncio.to_thread(self.extract_headings, text)
-        heading_scores = await asyncio.to_thread(self.score_headings, headings)
-        chunks = await asyncio.to_thread(
-            self.get_chunks_from_headings, text, headings, heading_scores, n
+    def get_chunks_from_headings(
+        self,
+        text: str,
+        headings: List[str],
+        heading_scores: List[float],
+        top_k: int = 10,
+    ) -> List[DocumentChunk]:
+        if not heading_scores:
+            heading_scores = self.score_headings(headings)
+
+        # Heading lines appear in the text in the same order as in `headings`
+        lines = text.split("\n")
+        heading_lines = self._find_heading_lines(lines)[: len(headings)]
+        selected_indices = [
+            idx
+            for idx in self._select_heading_indices(heading_scores, top_k)
+            if idx < len(heading_lines)
+        ]
+        return self._build_chunks(
+            lines, heading_lines, heading_scores, selected_indices
         )
+
+    def get_top_chunks(self, text: str, n: int) -> List[DocumentChunk]:
+        lines = text.split("\n")
+        heading_lines = self._find_heading_lines(lines)
+        heading_scores = self.score_headings(
+            [heading for _, heading in heading_lines]
+        )
+        selected_indices = self._select_heading_indices(heading_scores, n)
+        return self._build_chunks(
+            lines, heading_lines, heading_scores, selected_indices
+        )
+
+    async def get_n_chunks(self, text: str, n: int) -> List[DocumentChunk]:
+        chunks = await asyncio.to_thread(self.get_top_chunks, text, n)
         if len(chunks) < n:
             raise ValueError(f"Only {len(chunks)} chunks found, requested {n}")
         return chunks
+
+    def _split_into_sections(self, text: str) -> List[Tuple[List[str], str]]:
+        """
+        Splits markdown into (heading path, section text) pairs in one pass,
+        keeping a stack of the currently open headings.
+        """
+        sections = []
+        heading_stack: List[Tuple[int, str]] = []
+        section_lines: List[str] = []
+
+        def close_section():
+            body = "\n".join(section_lines).strip()
+            if body:
+                sections.append(([title for _, title in heading_stack], body))
+
+        for line in text.split("\n"):
+            match = HEADING_PATTERN.match(line.strip())
+            if not match:
+                section_lines.append(line)
+                continue
+
+            close_section()
+            section_lines = [line.strip()]
+            level = len(match.group(1))
+            while heading_stack and heading_stack[-1][0] >= level:
+                heading_stack.pop()
+            heading_stack.append((level, match.group(2).strip()))
+
+        close_section()
+        return sections
+
+    def split_text_with_metadata(self, text: str) -> List[Tuple[str, dict]]:
+        chunks: List[Tuple[str, dict]] = []
+        group_paths: List[List[str]] = []
+        group_bodies: List[str] = []
+        group_length = 0
+
+        def flush_group():
+            nonlocal group_paths, group_bodies, group_length
+            if group_bodies:
+                common_path = group_paths[0]
+                for path in group_paths[1:]:
+                    common_path = self._common_path(common_path, path)
+                chunks.append(self._make_chunk("\n\n".join(group_bodies), common_path))
+            group_paths, group_bodies, group_length = [], [], 0
+
+        for path, body in self._split_into_sections(text):
+            if len(body) > self.chunk_size:
+                flush_group()
+                for piece in self.fallback_splitter.split_text(body):
+                    chunks.append(self._make_chunk(piece, path))
+                continue
+
+            # Small sections are merged with their subsections or siblings
+            if group_bodies:
+                root_path, previous_path = group_paths[0], group_paths[-1]
+                is_descendant = path[: len(root_path)] == root_path
+                is_sibling = path[:-1] == previous_path[:-1]
+                if (
+                    not (is_descendant or is_sibling)
+                    or group_length + len(body) > self.chunk_size
+                ):
+                    flush_group()
+
+            group_paths.append(path)
+            group_bodies.append(body)
+            group_length += len(body)
+
+        flush_group()
+        return chunks
+
+    def _common_path(self, first: List[str], second: List[str]) -> List[str]:
+        common = []
+        for a, b in zip(first, second):
+            if a != b:
+                break
+            common.append(a)
+        return common
+
+    def _make_chunk(self, body: str, path: List[str]) -> Tuple[str, dict]:
+        heading_path = " > ".join(path)
+        return body, {"heading_path": heading_path}
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.split_text_with_metadata(text)]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        split_documents = []
+        for document in documents:
+            for chunk, metadata in self.split_text_with_metadata(
+                document.page_content
+            ):
+                split_documents.append(
+                    Document(
+                        page_content=chunk,
+                        metadata={**document.metadata, **metadata},
+                    )
+                )
+        return split_documents
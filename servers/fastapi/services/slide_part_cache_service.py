@@ -0,0 +1,82 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from models.pptx_models import PptxSlideModel
+from services.image_cache_service import ImageCacheService
+from utils.asset_directory_utils import get_slide_parts_directory
+from utils.get_env import get_slide_part_cache_max_mb_env
+
+
+# Bump when the slide XML written for the same model changes
+SLIDE_PARTS_VERSION = 1
+
+
+class SlidePartCacheService(ImageCacheService):
+    """
+    Cache of slides built for PPTX export, keyed by the fingerprint of their
+    PptxSlideModel. Every entry is a zip with the slide XML and its media,
+    so re-exporting a deck only rebuilds the slides that changed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_bytes = int(get_slide_part_cache_max_mb_env() or 512) * 1024 * 1024
+
+    @property
+    def cache_directory(self) -> str:
+        return get_slide_parts_directory()
+
+    @staticmethod
+    def dump_shape(shape, asset_hashes: Dict[str, str]) -> dict:
+        shape_content = shape.model_dump(mode="json")
+        picture = shape_content.get("picture")
+        if picture:
+            # Fetched pictures have a temporary path, their content is the key
+            shape_content["picture"] = asset_hashes.get(picture["path"], picture)
+        return shape_content
+
+    @staticmethod
+    def get_fingerprint(
+        slide_model: PptxSlideModel,
+        global_shapes: Optional[List] = None,
+        asset_hashes: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """
+        Pictures are fingerprinted by the content hash in asset_hashes,
+        keyed by their path, or by their path when it has no hash.
+        """
+        asset_hashes = asset_hashes or {}
+        slide_content = [
+            SLIDE_PARTS_VERSION,
+            slide_model.model_dump(mode="json", exclude={"shapes"}),
+            [
+                SlidePartCacheService.dump_shape(shape, asset_hashes)
+                for shape in slide_model.shapes
+            ],
+            [
+                SlidePartCacheService.dump_shape(shape, asset_hashes)
+                for shape in global_shapes or []
+            ],
+        ]
+        return hashlib.sha256(
+            json.dumps(slide_content, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, fingerprint: str) -> Optional[bytes]:
+        """
+        Returns the cached parts, read under the lock so eviction can't
+        remove them meanwhile.
+        """
+        with self._lock:
+            parts_path = self._lookup_locked(fingerprint)
+            if not parts_path:
+                return None
+            with open(parts_path, "rb") as f:
+                return f.read()
+
+    def put(self, fingerprint: str, parts_path: str) -> str:
+        return self._store(fingerprint, parts_path)
+
+
+SLIDE_PART_CACHE_SERVICE = SlidePartCacheService()
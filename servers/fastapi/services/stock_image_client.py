@@ -0,0 +1,199 @@
+import asyncio
+from collections import OrderedDict, deque
+import random
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from utils.get_env import get_pexels_api_key_env, get_pixabay_api_key_env
+
+
+class RateLimiter:
+    """
+    Allows at most max_requests per period seconds, waiting for a free slot.
+    """
+
+    def __init__(self, max_requests: int, period: float):
+        self.max_requests = max_requests
+        self.period = period
+        self._timestamps: Deque[float] = deque()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def block_for(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period:
+                    self._timestamps.popleft()
+
+                wait = self._blocked_until - now
+                if len(self._timestamps) >= self.max_requests:
+                    wait = max(wait, self._timestamps[0] + self.period - now)
+                if wait <= 0:
+                    self._timestamps.append(now)
+                    return
+                await asyncio.sleep(wait)
+
+
+class StockImageClient:
+    """
+    Shared client for Pexels and Pixabay search. Keeps one pooled HTTP session,
+    respects each provider's rate limit, retries throttled and failed requests
+    with backoff and caches candidate image urls per query.
+    """
+
+    CANDIDATES_PER_QUERY = 10
+    MAX_ATTEMPTS = 4
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    CACHE_SIZE = 1024
+    # Pixabay asks for search results to be cached for 24 hours
+    CACHE_TTL = 24 * 60 * 60
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._rate_limiters = {
+            "pexels": RateLimiter(200, 60 * 60),
+            "pixabay": RateLimiter(100, 60),
+        }
+        self._cache: OrderedDict[Tuple[str, str], Tuple[float, List[str]]] = (
+            OrderedDict()
+        )
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=20, connect=5),
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _get_request(self, provider: str, query: str) -> Tuple[str, dict, dict]:
+        if provider == "pexels":
+            return (
+                "https://api.pexels.com/v1/search",
+                {"query": query, "per_page": self.CANDIDATES_PER_QUERY},
+                {"Authorization": f"{get_pexels_api_key_env()}"},
+            )
+        return (
+            "https://pixabay.com/api/",
+            {
+                "key": get_pixabay_api_key_env(),
+                "q": query[:100],
+                "image_type": "photo",
+                "per_page": max(3, self.CANDIDATES_PER_QUERY),
+            },
+            {},
+        )
+
+    @staticmethod
+    def _get_image_urls(provider: str, data: dict) -> List[str]:
+        if provider == "pexels":
+            return [photo["src"]["large"] for photo in data.get("photos", [])]
+        return [hit["largeImageURL"] for hit in data.get("hits", [])]
+
+    @staticmethod
+    def _get_retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        for header in ("Retry-After", "X-Ratelimit-Reset"):
+            value = response.headers.get(header)
+            if value:
+                try:
+                    seconds = float(value)
+                except ValueError:
+                    continue
+                # Pexels sends the reset time as a unix timestamp
+                if seconds > 10**9:
+                    seconds -= time.time()
+                return max(0.0, seconds)
+        return None
+
+    async def _fetch(self, provider: str, query: str) -> List[str]:
+        url, params, headers = self._get_request(provider, query)
+        rate_limiter = self._rate_limiters[provider]
+
+        for attempt in range(self.MAX_ATTEMPTS):
+            backoff = 2**attempt + random.random()
+            await rate_limiter.acquire()
+            try:
+                response = await self.session.get(url, params=params, headers=headers)
+                async with response:
+                    if response.status not in self.RETRY_STATUSES:
+                        if not response.ok:
+                            raise Exception(
+                                f"{provider} search failed with status {response.status}"
+                            )
+                        return self._get_image_urls(provider, await response.json())
+
+                    retry_after = self._get_retry_after(response)
+                    if response.status == 429:
+                        rate_limiter.block_for(retry_after or backoff)
+                    print(
+                        f"{provider} search returned {response.status}, retrying ({attempt + 1}/{self.MAX_ATTEMPTS})"
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"{provider} search failed: {e}, retrying ({attempt + 1}/{self.MAX_ATTEMPTS})")
+                retry_after = None
+
+            if attempt + 1 < self.MAX_ATTEMPTS:
+                await asyncio.sleep(retry_after or backoff)
+
+        raise Exception(f"{provider} search failed after {self.MAX_ATTEMPTS} attempts")
+
+    async def search(self, provider: str, query: str) -> List[str]:
+        """
+        Returns candidate image urls for the query, most relevant first.
+        """
+        key = (provider, " ".join(query.lower().split()))
+
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.CACHE_TTL:
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        # Identical queries of one deck share a single request
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # The caller that owned the request was cancelled, this one takes over
+                return await self.search(provider, query)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            urls = await self._fetch(provider, query)
+            future.set_result(urls)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved when no one else waits for it
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+        if urls:
+            self._cache[key] = (time.monotonic(), urls)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return urls
+
+
+STOCK_IMAGE_CLIENT = StockImageClient()
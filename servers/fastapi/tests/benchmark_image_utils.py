@@ -0,0 +1,70 @@
+"""
+Micro-benchmarks of utils/image_utils at typical slide picture sizes.
+
+Run from servers/fastapi:
+    python -m tests.benchmark_image_utils [--repeat N]
+"""
+import argparse
+import timeit
+
+import numpy as np
+from PIL import Image
+
+from models.pptx_models import PptxObjectFitEnum, PptxObjectFitModel
+from utils.image_utils import (
+    clip_image,
+    create_circle_image,
+    fit_image,
+    invert_image,
+    round_image_corners,
+    set_image_opacity,
+)
+
+
+SIZES = [(640, 360), (1280, 720), (1920, 1080), (2000, 2000)]
+TARGET_SIZE = (600, 400)
+
+
+def make_image(width: int, height: int) -> Image.Image:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    return Image.fromarray(pixels, "RGBA")
+
+
+def get_benchmarks():
+    return {
+        "round_image_corners": lambda image: round_image_corners(
+            image, [24, 24, 24, 24]
+        ),
+        "invert_image": invert_image,
+        "create_circle_image": create_circle_image,
+        "set_image_opacity": lambda image: set_image_opacity(image, 0.5),
+        "clip_image": lambda image: clip_image(image, *TARGET_SIZE),
+        "fit_image[cover]": lambda image: fit_image(
+            image, *TARGET_SIZE, PptxObjectFitModel(fit=PptxObjectFitEnum.COVER)
+        ),
+        "fit_image[contain]": lambda image: fit_image(
+            image, *TARGET_SIZE, PptxObjectFitModel(fit=PptxObjectFitEnum.CONTAIN)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'function':<22}{'size':>12}{'best ms':>12}{'mean ms':>12}")
+    for name, func in get_benchmarks().items():
+        for width, height in SIZES:
+            image = make_image(width, height)
+            func(image)  # warm up caches and lazy imports
+            timings = timeit.repeat(lambda: func(image), number=1, repeat=args.repeat)
+            print(
+                f"{name:<22}{f'{width}x{height}':>12}"
+                f"{min(timings) * 1000:>12.1f}{sum(timings) / len(timings) * 1000:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Benchmarks of PptxPresentationCreator on synthetic decks.
+
+Times create_ppt and save for text-heavy, image-heavy and shape-heavy decks
+of 10, 100 and 500 slides, reports peak memory and breaks the time of
+in-process slide building down by shape type.
+
+Every run starts with empty image and slide caches, so timings are cold
+exports. Picture processing runs in the process pool, whose memory isn't
+part of the tracemalloc peak.
+
+Run from servers/fastapi:
+    python -m tests.benchmark_pptx_creator [--sizes 10 100] [--variants text]
+        [--repeat N] [--incremental] [--parallel]
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+import io
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+from PIL import Image
+from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE
+
+from models.pptx_models import (
+    PptxAutoShapeBoxModel,
+    PptxBoxShapeEnum,
+    PptxConnectorModel,
+    PptxFillModel,
+    PptxFontModel,
+    PptxObjectFitEnum,
+    PptxObjectFitModel,
+    PptxParagraphModel,
+    PptxPictureBoxModel,
+    PptxPictureModel,
+    PptxPositionModel,
+    PptxPresentationModel,
+    PptxShadowModel,
+    PptxSlideModel,
+    PptxSpacingModel,
+    PptxStrokeModel,
+    PptxTextBoxModel,
+    PptxTextRunModel,
+)
+
+
+SIZES = [10, 100, 500]
+SOURCE_IMAGE_COUNT = 8
+# Methods whose time is reported; apply_shadow_to_shape is part of add_autoshape
+PROFILED_METHODS = [
+    "add_textbox",
+    "add_autoshape",
+    "add_picture",
+    "add_connector",
+    "apply_shadow_to_shape",
+]
+
+
+def make_source_images(directory: str) -> List[str]:
+    rng = np.random.default_rng(0)
+    image_paths = []
+    for index in range(SOURCE_IMAGE_COUNT):
+        pixels = rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+        extension = "png" if index % 2 else "jpg"
+        image_path = os.path.join(directory, f"source_{index}.{extension}")
+        Image.fromarray(pixels, "RGB").save(image_path)
+        image_paths.append(image_path)
+    return image_paths
+
+
+def make_text_slide(index: int, image_paths: List[str]) -> PptxSlideModel:
+    font = PptxFontModel(name="Inter", size=14, color="222222")
+    shapes = [
+        PptxTextBoxModel(
+            position=PptxPositionModel(left=60, top=40, width=1160, height=60),
+            paragraphs=[
+                PptxParagraphModel(
+                    font=PptxFontModel(size=32, font_weight=700),
+                    text=f"Quarterly review {index}",
+                )
+            ],
+        )
+    ]
+    for column in range(3):
+        shapes.append(
+            PptxTextBoxModel(
+                position=PptxPositionModel(
+                    left=60 + column * 390, top=140, width=360, height=520
+                ),
+                margin=PptxSpacingModel.all(8),
+                paragraphs=[
+                    PptxParagraphModel(
+                        font=font,
+                        spacing=PptxSpacingModel(top=4, bottom=4),
+                        line_height=1.2,
+                        text=(
+                            f"<b>Point {line}</b> revenue grew <i>{line * 3}%</i> "
+                            "while <u>costs</u> stayed flat across regions"
+                        ),
+                    )
+                    for line in range(8)
+                ]
+                + [
+                    PptxParagraphModel(
+                        text_runs=[
+                            PptxTextRunModel(text="Source: ", font=font),
+                            PptxTextRunModel(
+                                text="internal data",
+                                font=PptxFontModel(italic=True, strike=True),
+                            ),
+                        ]
+                    )
+                ],
+            )
+        )
+    return PptxSlideModel(note=f"Notes of slide {index}", shapes=shapes)
+
+
+def make_image_slide(index: int, image_paths: List[str]) -> PptxSlideModel:
+    transforms = [
+        dict(clip=True),
+        dict(border_radius=[24, 24, 24, 24]),
+        dict(invert=True),
+        dict(opacity=0.6),
+        dict(object_fit=PptxObjectFitModel(fit=PptxObjectFitEnum.COVER)),
+        dict(
+            object_fit=PptxObjectFitModel(
+                fit=PptxObjectFitEnum.CONTAIN, focus=[30.0, 70.0]
+            )
+        ),
+        dict(object_fit=PptxObjectFitModel(fit=PptxObjectFitEnum.FILL)),
+        dict(shape=PptxBoxShapeEnum.CIRCLE),
+    ]
+    shapes = []
+    for shape_index, transform in enumerate(transforms):
+        shapes.append(
+            PptxPictureBoxModel(
+                position=PptxPositionModel(
+                    left=40 + (shape_index % 4) * 310,
+                    top=60 + (shape_index // 4) * 330,
+                    # Sizes vary per slide, so processing isn't shared
+                    width=280 + index % 7,
+                    height=300,
+                ),
+                margin=PptxSpacingModel.all(4) if shape_index % 3 == 0 else None,
+                picture=PptxPictureModel(
+                    is_network=False,
+                    path=image_paths[(index + shape_index) % len(image_paths)],
+                ),
+                **transform,
+            )
+        )
+    return PptxSlideModel(shapes=shapes)
+
+
+def make_shape_slide(index: int, image_paths: List[str]) -> PptxSlideModel:
+    shapes = []
+    for shape_index in range(24):
+        shapes.append(
+            PptxAutoShapeBoxModel(
+                type=(
+                    MSO_AUTO_SHAPE_TYPE.ROUNDED_RECTANGLE
+                    if shape_index % 2
+                    else MSO_AUTO_SHAPE_TYPE.RECTANGLE
+                ),
+                position=PptxPositionModel(
+                    left=40 + (shape_index % 6) * 200,
+                    top=60 + (shape_index // 6) * 160,
+                    width=180,
+                    height=140,
+                ),
+                fill=PptxFillModel(color="3366AA", opacity=0.8),
+                stroke=PptxStrokeModel(color="112244", thickness=1.5),
+                shadow=(
+                    PptxShadowModel(radius=8, offset=4, angle=45)
+                    if shape_index % 3
+                    else None
+                ),
+                border_radius=12 if shape_index % 2 else None,
+                paragraphs=[PptxParagraphModel(text=f"Step {shape_index}")],
+            )
+        )
+    for line_index in range(6):
+        shapes.append(
+            PptxConnectorModel(
+                position=PptxPositionModel(
+                    left=40, top=130 + line_index * 100, width=1200, height=0
+                ),
+                thickness=1,
+            )
+        )
+    return PptxSlideModel(background=PptxFillModel(color="F5F5F5"), shapes=shapes)
+
+
+VARIANTS: Dict[str, Callable[[int, List[str]], PptxSlideModel]] = {
+    "text": make_text_slide,
+    "image": make_image_slide,
+    "shape": make_shape_slide,
+}
+
+
+def make_presentation(
+    variant: str, slide_count: int, image_paths: List[str]
+) -> PptxPresentationModel:
+    make_slide = VARIANTS[variant]
+    return PptxPresentationModel(
+        slides=[make_slide(index, image_paths) for index in range(slide_count)]
+    )
+
+
+def profile_methods(pptx_creator, timings: Dict[str, List[float]]):
+    """
+    Wraps the shape methods of one creator to accumulate their call times.
+    """
+    for name in PROFILED_METHODS:
+        method = getattr(pptx_creator, name)
+
+        def timed(*args, method=method, name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[name].append(time.perf_counter() - start)
+
+        setattr(pptx_creator, name, timed)
+
+
+def reset_caches():
+    from services.processed_image_cache_service import PROCESSED_IMAGE_CACHE_SERVICE
+    from services.slide_part_cache_service import SLIDE_PART_CACHE_SERVICE
+
+    for cache_service in (PROCESSED_IMAGE_CACHE_SERVICE, SLIDE_PART_CACHE_SERVICE):
+        cache_service._index = None
+
+
+def run_export(
+    ppt_model: PptxPresentationModel,
+    work_directory: str,
+    incremental: bool,
+    parallel: bool,
+    method_timings: Dict[str, List[float]],
+):
+    from services.pptx_presentation_creator import PptxPresentationCreator
+
+    # Fresh app data every run, so nothing is served from earlier runs
+    app_data_directory = tempfile.mkdtemp(dir=work_directory)
+    os.environ["APP_DATA_DIRECTORY"] = app_data_directory
+    reset_caches()
+
+    pptx_creator = PptxPresentationCreator(
+        ppt_model.model_copy(deep=True),
+        os.path.join(app_data_directory, "temp"),
+        incremental=incremental,
+        parallel=parallel,
+    )
+    profile_methods(pptx_creator, method_timings)
+
+    start = time.perf_counter()
+    asyncio.run(pptx_creator.create_ppt())
+    create_time = time.perf_counter() - start
+
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    pptx_creator.save(buffer)
+    save_time = time.perf_counter() - start
+
+    return create_time, save_time, buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument(
+        "--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--parallel", action="store_true")
+    args = parser.parse_args()
+
+    from services.process_pool_service import PROCESS_POOL_SERVICE
+
+    with tempfile.TemporaryDirectory() as work_directory:
+        image_paths = make_source_images(work_directory)
+
+        print(
+            f"{'variant':<8}{'slides':>8}{'create ms':>12}{'save ms':>10}"
+            f"{'size MB':>10}{'py peak MB':>12}{'max rss MB':>12}"
+        )
+        breakdowns = {}
+        for variant in args.variants:
+            for slide_count in args.sizes:
+                ppt_model = make_presentation(variant, slide_count, image_paths)
+                method_timings: Dict[str, List[float]] = defaultdict(list)
+
+                # First run warms up the process pool and lazy imports
+                run_export(
+                    ppt_model,
+                    work_directory,
+                    args.incremental,
+                    args.parallel,
+                    defaultdict(list),
+                )
+                runs = [
+                    run_export(
+                        ppt_model,
+                        work_directory,
+                        args.incremental,
+                        args.parallel,
+                        method_timings,
+                    )
+                    for _ in range(args.repeat)
+                ]
+
+                # tracemalloc slows allocations down, so memory is a run of its own
+                tracemalloc.start()
+                run_export(
+                    ppt_model,
+                    work_directory,
+                    args.incremental,
+                    args.parallel,
+                    defaultdict(list),
+                )
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+                create_time = min(run[0] for run in runs)
+                save_time = min(run[1] for run in runs)
+                print(
+                    f"{variant:<8}{slide_count:>8}{create_time * 1000:>12.1f}"
+                    f"{save_time * 1000:>10.1f}{runs[0][2] / 1024 / 1024:>10.1f}"
+                    f"{peak / 1024 / 1024:>12.1f}{max_rss:>12.1f}"
+                )
+                breakdowns[(variant, slide_count)] = {
+                    name: (len(timings) // args.repeat, sum(timings) / args.repeat)
+                    for name, timings in method_timings.items()
+                }
+
+        print()
+        print(
+            f"{'variant':<8}{'slides':>8}  {'method':<24}{'calls':>8}"
+            f"{'total ms':>12}{'per call us':>14}"
+        )
+        for (variant, slide_count), breakdown in breakdowns.items():
+            for name, (calls, total) in sorted(
+                breakdown.items(), key=lambda item: -item[1][1]
+            ):
+                print(
+                    f"{variant:<8}{slide_count:>8}  {name:<24}{calls:>8}"
+                    f"{total * 1000:>12.1f}{total / max(calls, 1) * 1e6:>14.1f}"
+                )
+        if args.parallel:
+            print("Slides built in worker processes aren't part of the breakdown.")
+
+    PROCESS_POOL_SERVICE.shutdown()
+
+
+if __name__ == "__main__":
+    main()
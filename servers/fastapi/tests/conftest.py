@@ -0,0 +1,15 @@
+import asyncio
+
+import pytest
+
+from services.stock_image_client import STOCK_IMAGE_CLIENT
+
+
+@pytest.fixture(autouse=True)
+def reset_stock_image_client():
+    """Stock image searches are cached process-wide, so tests start empty."""
+    STOCK_IMAGE_CLIENT._cache.clear()
+    asyncio.run(STOCK_IMAGE_CLIENT.close())
+    yield
+    STOCK_IMAGE_CLIENT._cache.clear()
+    asyncio.run(STOCK_IMAGE_CLIENT.close())
@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+from aiohttp import web
+import pytest
+
+from services.asset_resolver_service import AssetResolverService
+
+
+@pytest.fixture
+def app_data(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    return tmp_path / "app_data"
+
+
+def test_internal_urls_map_to_local_files(app_data):
+    image_path = app_data / "images" / "a b.png"
+    image_path.parent.mkdir(parents=True)
+    image_path.write_bytes(b"image")
+
+    assert AssetResolverService.get_local_path(
+        "http://localhost/app_data/images/a%20b.png"
+    ) == str(image_path)
+    assert AssetResolverService.get_local_path("/app_data/images/a b.png") == str(
+        image_path
+    )
+    assert AssetResolverService.get_local_path("/app_data/images/missing.png") is None
+    assert AssetResolverService.get_local_path("https://example.com/x.png") is None
+
+
+def test_local_paths_outside_asset_directories_are_rejected(app_data, tmp_path):
+    (app_data / "images").mkdir(parents=True)
+    secret_path = tmp_path / "secret.png"
+    secret_path.write_bytes(b"secret")
+
+    for url in [
+        "/app_data/../secret.png",
+        "/app_data/images/%2e%2e/%2e%2e/secret.png",
+        f"/app_data/{secret_path}",
+        "http://localhost/app_data/images/../../secret.png",
+        "https://example.com/files/app_data/../secret.png",
+        "/static/../../../../../../etc/passwd",
+        "/static/%2e%2e/%2e%2e/%2e%2e/%2e%2e/etc/passwd",
+    ]:
+        assert AssetResolverService.get_local_path(url) is None, url
+
+
+def run_with_server(handler, test):
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await test(f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_remote_images_are_deduplicated_and_revalidated(app_data, tmp_path):
+    requests = []
+
+    async def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=b"remote image", headers={"ETag": '"v1"'})
+
+    resolver = AssetResolverService()
+    resolver.max_age = 0
+
+    async def test(base_url):
+        url = f"{base_url}/photo.jpg"
+        first = await resolver.resolve([url, url, url], str(tmp_path / "first"))
+        second = await resolver.resolve([url], str(tmp_path / "second"))
+        await resolver.close()
+        return first[url], second[url]
+
+    first, second = run_with_server(handler, test)
+
+    assert requests == [None, '"v1"']
+    assert first != second
+    for path in (first, second):
+        with open(path, "rb") as f:
+            assert f.read() == b"remote image"
+    assert len(os.listdir(tmp_path / "first")) == 1
+
+
+def test_stale_copy_is_used_when_download_fails(app_data, tmp_path):
+    responses = [web.Response(body=b"image"), web.Response(status=500)]
+
+    async def handler(request):
+        return responses.pop(0)
+
+    resolver = AssetResolverService()
+    resolver.max_age = 0
+
+    async def test(base_url):
+        url = f"{base_url}/photo.png"
+        await resolver.resolve([url], str(tmp_path))
+        resolved = await resolver.resolve([url], str(tmp_path))
+        await resolver.close()
+        return resolved[url]
+
+    path = run_with_server(handler, test)
+
+    with open(path, "rb") as f:
+        assert f.read() == b"image"
+
+
+def test_file_evicted_before_linking_is_fetched_again(app_data, tmp_path):
+    requests = []
+
+    async def handler(request):
+        requests.append(request.path)
+        return web.Response(body=b"remote image")
+
+    resolver = AssetResolverService()
+    fetch = resolver.fetch
+
+    async def fetch_then_evict(url):
+        cached_path = await fetch(url)
+        if len(requests) == 1:
+            # A concurrent export evicts the file before it is linked
+            os.remove(cached_path)
+        return cached_path
+
+    resolver.fetch = fetch_then_evict
+
+    async def test(base_url):
+        url = f"{base_url}/photo.jpg"
+        resolved = await resolver.resolve([url], str(tmp_path / "export"))
+        await resolver.close()
+        return resolved[url]
+
+    path = run_with_server(handler, test)
+
+    assert len(requests) == 2
+    with open(path, "rb") as f:
+        assert f.read() == b"remote image"
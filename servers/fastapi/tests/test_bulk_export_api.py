@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+import zipfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api.v1.ppt.endpoints import presentation as presentation_endpoints
+from api.v1.ppt.endpoints.presentation import (
+    PRESENTATION_ROUTER,
+    export_presentations_in_bulk,
+)
+from models.presentation_and_path import PresentationAndPath
+from models.sql.presentation import PresentationModel
+from services.database import get_async_session
+
+
+@pytest.fixture
+def session_maker(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def add_presentations(session_maker, titles):
+    presentation_ids = [uuid.uuid4() for _ in titles]
+
+    async def add():
+        async with session_maker() as sql_session:
+            for presentation_id, title in zip(presentation_ids, titles):
+                sql_session.add(
+                    PresentationModel(
+                        id=presentation_id,
+                        content="",
+                        n_slides=1,
+                        language="English",
+                        title=title,
+                    )
+                )
+            await sql_session.commit()
+
+    asyncio.run(add())
+    return presentation_ids
+
+
+def get_events(body: str):
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_bulk_export_zips_exports_and_removes_expired_zips(
+    tmp_path, monkeypatch, session_maker
+):
+    presentation_ids = add_presentations(session_maker, ["Deck", "Deck"])
+    export_directory = tmp_path / "exports"
+    export_directory.mkdir()
+
+    async def export_presentation(presentation_id, title, export_as):
+        path = export_directory / f"{presentation_id}.{export_as}"
+        path.write_text(f"{presentation_id} {export_as}")
+        return PresentationAndPath(presentation_id=presentation_id, path=str(path))
+
+    monkeypatch.setattr(
+        presentation_endpoints, "export_presentation", export_presentation
+    )
+    bulk_directory = tmp_path / "app_data" / "exports" / "bulk"
+    bulk_directory.mkdir(parents=True)
+    expired_zip = bulk_directory / "expired.zip"
+    expired_zip.write_bytes(b"zip")
+    os.utime(expired_zip, (time.time() - 7200, time.time() - 7200))
+    recent_zip = bulk_directory / "recent.zip"
+    recent_zip.write_bytes(b"zip")
+
+    async def get_session():
+        async with session_maker() as sql_session:
+            yield sql_session
+
+    app = FastAPI()
+    app.include_router(PRESENTATION_ROUTER, prefix="/api/v1/ppt")
+    app.dependency_overrides[get_async_session] = get_session
+    response = TestClient(app).post(
+        "/api/v1/ppt/presentation/export/bulk",
+        json={"ids": [str(each) for each in presentation_ids + [uuid.uuid4()]]},
+    )
+
+    events = get_events(response.text)
+    assert [each["status"] for each in events[:-1]].count("done") == 2
+    assert [each["status"] for each in events[:-1]].count("error") == 1
+    assert events[-1]["type"] == "complete"
+    with zipfile.ZipFile(events[-1]["path"]) as zip_file:
+        assert sorted(zip_file.namelist()) == ["Deck (2).pptx", "Deck.pptx"]
+    assert not expired_zip.exists()
+    assert recent_zip.exists()
+
+
+def test_disconnected_client_cancels_remaining_exports(monkeypatch, session_maker):
+    presentation_ids = add_presentations(session_maker, ["Fast", "Slow", "Slower"])
+    cancelled = []
+
+    async def export_presentation(presentation_id, title, export_as):
+        if title != "Fast":
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(title)
+                raise
+        return PresentationAndPath(presentation_id=presentation_id, path=title)
+
+    monkeypatch.setattr(
+        presentation_endpoints, "export_presentation", export_presentation
+    )
+
+    async def run():
+        async with session_maker() as sql_session:
+            response = await export_presentations_in_bulk(
+                presentation_ids, ["pptx"], sql_session
+            )
+            body = response.body_iterator
+            first_event = await asyncio.wait_for(body.__anext__(), timeout=5)
+            # The client goes away after the first progress event
+            await body.aclose()
+            await asyncio.sleep(0.01)
+            return first_event
+
+    first_event = asyncio.run(run())
+
+    assert get_events(first_event)[0]["status"] == "done"
+    assert sorted(cancelled) == ["Slow", "Slower"]
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+import uuid
+
+import chromadb
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import numpy as np
+
+from services.chroma_janitor_service import ChromaJanitorService
+from services.document_processing_service import DOCUMENT_PROCESSING_SERVICE
+
+
+def make_janitor(tmp_path, monkeypatch, live_ids=()):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    chroma_directory = str(tmp_path / "chroma")
+    monkeypatch.setattr(
+        DOCUMENT_PROCESSING_SERVICE,
+        "client",
+        chromadb.PersistentClient(path=chroma_directory),
+    )
+    monkeypatch.setattr(
+        DOCUMENT_PROCESSING_SERVICE,
+        "embedding_function",
+        DeterministicFakeEmbedding(size=32),
+    )
+
+    janitor = ChromaJanitorService()
+    janitor.directory = chroma_directory
+    janitor.grace_period = 60
+    janitor.max_age = 3600
+
+    async def get_live_presentation_ids(presentation_ids):
+        return set(live_ids) & set(presentation_ids)
+
+    janitor._get_live_presentation_ids = get_live_presentation_ids
+    return janitor
+
+
+def add_collection(presentation_id, created_at, count=200):
+    collection = DOCUMENT_PROCESSING_SERVICE.client.create_collection(
+        DOCUMENT_PROCESSING_SERVICE.get_collection_name(presentation_id),
+        metadata={"created_at": created_at},
+    )
+    collection.add(
+        ids=[str(i) for i in range(count)],
+        embeddings=np.random.default_rng(0).random((count, 32)).tolist(),
+        documents=[f"chunk {i} " + "text " * 100 for i in range(count)],
+    )
+
+
+def get_collection_names():
+    return {
+        collection.name
+        for collection in DOCUMENT_PROCESSING_SERVICE.client.list_collections()
+    }
+
+
+def test_orphan_and_expired_collections_are_removed(tmp_path, monkeypatch):
+    now = time.time()
+    live_id, expired_id, orphan_id, fresh_orphan_id, active_id = [
+        uuid.uuid4() for _ in range(5)
+    ]
+    janitor = make_janitor(
+        tmp_path, monkeypatch, live_ids=[live_id, expired_id, active_id]
+    )
+    add_collection(live_id, now - 60)
+    add_collection(expired_id, now - 7200)
+    add_collection(orphan_id, now - 7200)
+    add_collection(fresh_orphan_id, now)
+    add_collection(active_id, now - 7200)
+
+    DOCUMENT_PROCESSING_SERVICE.mark_active(active_id)
+    try:
+        asyncio.run(janitor.run_once())
+    finally:
+        DOCUMENT_PROCESSING_SERVICE.mark_inactive(active_id)
+
+    assert get_collection_names() == {
+        DOCUMENT_PROCESSING_SERVICE.get_collection_name(presentation_id)
+        for presentation_id in [live_id, fresh_orphan_id, active_id]
+    }
+    assert janitor.removed_orphans == 1
+    assert janitor.removed_expired == 1
+    # Expired collections of existing presentations stay available for editing
+    assert os.path.exists(
+        DOCUMENT_PROCESSING_SERVICE.get_compact_index_path(expired_id)
+    )
+    assert not os.path.exists(
+        DOCUMENT_PROCESSING_SERVICE.get_compact_index_path(orphan_id)
+    )
+
+
+def test_budget_evicts_oldest_collections_and_ignores_models(tmp_path, monkeypatch):
+    now = time.time()
+    presentation_ids = [uuid.uuid4() for _ in range(3)]
+    janitor = make_janitor(tmp_path, monkeypatch, live_ids=presentation_ids)
+    empty_bytes = janitor.get_used_bytes()
+    for age, presentation_id in zip([300, 200, 100], presentation_ids):
+        add_collection(presentation_id, now - age)
+
+    models_directory = os.path.join(janitor.directory, "models")
+    os.makedirs(models_directory)
+    with open(os.path.join(models_directory, "model.onnx"), "wb") as f:
+        f.write(b"\0" * 50 * 1024 * 1024)
+
+    used_bytes = janitor.get_used_bytes()
+    assert used_bytes < 50 * 1024 * 1024
+    # Half a collection over budget
+    janitor.disk_budget_bytes = used_bytes - (used_bytes - empty_bytes) // 6
+
+    asyncio.run(janitor.run_once())
+
+    assert get_collection_names() == {
+        DOCUMENT_PROCESSING_SERVICE.get_collection_name(presentation_id)
+        for presentation_id in presentation_ids[1:]
+    }
+    assert janitor.evicted_for_budget == 1
+    assert janitor.get_used_bytes() <= janitor.disk_budget_bytes
+    assert os.path.exists(os.path.join(models_directory, "model.onnx"))
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.compact_document_index import (
+    CompactDocumentIndex,
+    CompactIndexRetriever,
+)
+
+
+def _normalized(rows: int, dim: int = 384) -> np.ndarray:
+    vectors = np.random.default_rng(0).normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_write_and_search_round_trip(tmp_path):
+    path = str(tmp_path / "docs.index")
+    embeddings = _normalized(200)
+    texts = [f"Chunk {i} " + "lorem ipsum " * 60 for i in range(200)]
+    metadatas = [{"heading_path": f"Section {i}"} for i in range(200)]
+
+    CompactDocumentIndex.write(path, embeddings, texts, metadatas)
+
+    index = CompactDocumentIndex(path)
+    try:
+        assert len(index) == 200
+        results = index.search(embeddings[42], k=3)
+        document, score = results[0]
+        assert document.page_content == texts[42]
+        assert document.metadata == {"heading_path": "Section 42"}
+        assert abs(score - 1.0) < 0.02
+        assert [score for _, score in results] == sorted(
+            [score for _, score in results], reverse=True
+        )
+    finally:
+        index.close()
+
+    # int8 vectors and compressed texts stay far below float32 and raw text size
+    raw_size = embeddings.nbytes + sum(len(text) for text in texts)
+    assert os.path.getsize(path) < raw_size / 3
+
+
+def test_ranking_matches_float_embeddings(tmp_path):
+    path = str(tmp_path / "docs.index")
+    embeddings = _normalized(100)
+    CompactDocumentIndex.write(path, embeddings, [str(i) for i in range(100)])
+    query = _normalized(1)[0]
+
+    index = CompactDocumentIndex(path)
+    try:
+        found = [int(document.page_content) for document, _ in index.search(query, k=5)]
+    finally:
+        index.close()
+
+    expected = np.argsort(-(embeddings @ query))[:5].tolist()
+    assert found == expected
+
+
+def test_retriever_reads_index_file(tmp_path):
+    path = str(tmp_path / "docs.index")
+    embedding_function = DeterministicFakeEmbedding(size=32)
+    texts = ["Revenue grew", "Costs stayed flat", "New markets"]
+    CompactDocumentIndex.write(path, embedding_function.embed_documents(texts), texts)
+
+    retriever = CompactIndexRetriever(
+        index_path=path, embeddings=embedding_function, k=2
+    )
+    documents = retriever.invoke("Costs stayed flat")
+
+    assert len(documents) == 2
+    assert documents[0].page_content == "Costs stayed flat"
@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from services import document_parser_pool
+from services.document_parser_pool import DocumentParserPool
+
+
+def _echo(value: str) -> str:
+    return value
+
+
+def _hang(value: str) -> str:
+    time.sleep(60)
+    return value
+
+
+def _crash(value: str) -> str:
+    os._exit(1)
+
+
+class LightDocumentParserPool(DocumentParserPool):
+    """Same pool without warming docling in every worker."""
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+
+def make_pool(timeout=2.0):
+    pool = LightDocumentParserPool()
+    pool.max_workers = 1
+    pool.timeout = timeout
+    return pool
+
+
+def test_hanging_worker_times_out_and_pool_recovers():
+    pool = make_pool()
+
+    async def run():
+        # Starts the worker, so the timeout only covers the hanging call
+        assert await pool._run(_echo, "warm") == "warm"
+        hanging_executor = pool.executor
+        processes = list(hanging_executor._processes.values())
+
+        with pytest.raises(asyncio.TimeoutError):
+            await pool._run(_hang, "hang")
+
+        assert pool._executor is None
+        result = await pool._run(_echo, "after timeout")
+
+        # The old pool is terminated once in-flight tasks had their timeout
+        await asyncio.sleep(pool.timeout + 0.5)
+        return result, processes
+
+    try:
+        result, processes = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert result == "after timeout"
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_crashed_worker_is_replaced():
+    pool = make_pool()
+
+    async def run():
+        crashed_executor = pool.executor
+        with pytest.raises(BrokenProcessPool):
+            await pool._run(_crash, "crash")
+
+        assert pool._executor is None
+        result = await pool._run(_echo, "after crash")
+        assert pool.executor is not crashed_executor
+        return result
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert result == "after crash"
+
+
+def test_pdf_text_is_streamed_in_page_order_within_window(monkeypatch):
+    pool = make_pool()
+    pool.max_workers = 2
+    pool.pages_per_task = 10
+    monkeypatch.setattr(document_parser_pool, "_count_pdf_pages", lambda _: 45)
+    active = []
+    max_active = []
+
+    async def extract_page_range(file_path, start_page, end_page):
+        active.append(start_page)
+        max_active.append(len(active))
+        # Later ranges finish first
+        await asyncio.sleep(0.05 - start_page / 1000)
+        active.remove(start_page)
+        return f"{start_page}-{end_page}"
+
+    pool._extract_page_range = extract_page_range
+
+    async def run():
+        return [text async for text in pool.stream_pdf_text("deck.pdf")]
+
+    texts = asyncio.run(run())
+
+    assert texts == ["0-10", "10-20", "20-30", "30-40", "40-45"]
+    assert max(max_active) == 2
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import uuid
+
+import chromadb
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import pytest
+
+from services.document_processing_service import DocumentProcessingService
+from services.documents_loader import DocumentsLoader
+
+
+def make_service(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    service = DocumentProcessingService()
+    service.client = chromadb.EphemeralClient()
+    service.embedding_function = DeterministicFakeEmbedding(size=32)
+    service.embedding_batch_size = 4
+    service.stream_split_threshold = 2000
+    return service
+
+
+def test_files_are_indexed_once_and_documents_are_collected(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    presentation_id = uuid.uuid4()
+    pdf_path = tmp_path / "report.pdf"
+    pdf_path.write_bytes(b"")
+    text_path = tmp_path / "notes.txt"
+    text_path.write_text("# Notes\n\nNotes text.")
+    streamed = []
+
+    async def stream_pdf_pages(file_path):
+        for page in range(10):
+            streamed.append(page)
+            yield f"## Page {page}\n\n" + f"Text of page {page}. " * 40
+
+    monkeypatch.setattr(DocumentsLoader, "stream_pdf_pages", stream_pdf_pages)
+
+    documents = []
+    vectorstore = asyncio.run(
+        service.create_vectorstore_from_files(
+            presentation_id, [str(pdf_path), str(text_path)], documents
+        )
+    )
+
+    assert vectorstore is not None
+    assert streamed == list(range(10))
+    assert len(documents) == 2
+    assert documents[0].startswith("## Page 0")
+    assert "## Page 9" in documents[0]
+    assert documents[1] == "# Notes\n\nNotes text."
+
+    collection = service.client.get_collection(
+        service.get_collection_name(presentation_id)
+    )
+    chunks = collection.get()["documents"]
+    assert any("Text of page 9." in chunk for chunk in chunks)
+    assert any("Notes text." in chunk for chunk in chunks)
+    assert not service.is_active(presentation_id)
+
+
+def test_documents_are_not_collected_by_default(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    text_path = tmp_path / "notes.txt"
+    text_path.write_text("# Notes\n\nNotes text.")
+
+    vectorstore = asyncio.run(
+        service.create_vectorstore_from_files(uuid.uuid4(), [str(text_path)])
+    )
+
+    assert vectorstore is not None
+
+
+def test_failed_indexing_waits_for_running_insert_before_cleanup(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    events = []
+
+    class SlowEmbedding(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            time.sleep(0.2)
+            events.append("inserted")
+            return super().embed_documents(texts)
+
+    service.embedding_function = SlowEmbedding(size=32)
+    cleanup = service.cleanup
+
+    def track_cleanup(presentation_id):
+        events.append("cleanup")
+        cleanup(presentation_id)
+
+    service.cleanup = track_cleanup
+
+    async def stream_pdf_pages(file_path):
+        yield "Text of the first page. " * 200
+        await asyncio.sleep(0.05)
+        raise ValueError("broken page")
+
+    monkeypatch.setattr(DocumentsLoader, "stream_pdf_pages", stream_pdf_pages)
+    pdf_path = tmp_path / "report.pdf"
+    pdf_path.write_bytes(b"")
+
+    with pytest.raises(ValueError):
+        asyncio.run(
+            service.create_vectorstore_from_files(uuid.uuid4(), [str(pdf_path)])
+        )
+
+    # The first cleanup drops a collection left by an earlier upload
+    assert events == ["cleanup", "inserted", "cleanup"]
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from services.embedding_service import EmbeddingService
+
+
+DIMENSIONS = 384
+
+
+class FakeTokenizer:
+    """Character ids, padded to the longest text of a batch like the real one."""
+
+    def encode_batch(self, texts):
+        length = max(len(text) for text in texts)
+        return [
+            SimpleNamespace(
+                ids=[ord(c) for c in text] + [0] * (length - len(text)),
+                attention_mask=[1] * len(text) + [0] * (length - len(text)),
+            )
+            for text in texts
+        ]
+
+
+class FakeSession:
+    """One-hot hidden state per character, padding gets noise the mask must drop."""
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, _, inputs):
+        input_ids = inputs["input_ids"]
+        self.batches.append(input_ids.shape)
+        hidden = np.ones(input_ids.shape + (DIMENSIONS,), dtype=np.float32)
+        for b, t in zip(*np.nonzero(input_ids)):
+            hidden[b, t] = 0
+            hidden[b, t, input_ids[b, t] % DIMENSIONS] = 1
+        return [hidden]
+
+
+def expected_embedding(text):
+    embedding = np.zeros(DIMENSIONS, dtype=np.float32)
+    for c in text:
+        embedding[ord(c) % DIMENSIONS] += 1
+    return embedding / np.linalg.norm(embedding)
+
+
+def make_service(batch_size=2):
+    service = EmbeddingService(batch_size=batch_size)
+    service._session = FakeSession()
+    service._tokenizer = FakeTokenizer()
+    return service
+
+
+def test_embeddings_are_normalized_and_keep_input_order():
+    service = make_service()
+    texts = ["a much longer text", "ab", "medium text", "x", "abc abc"]
+
+    embeddings = service.embed(texts)
+
+    assert embeddings.shape == (len(texts), DIMENSIONS)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1, rtol=1e-5)
+    for text, embedding in zip(texts, embeddings):
+        np.testing.assert_allclose(embedding, expected_embedding(text), atol=1e-6)
+    # Batches are sorted by length, so padding stays small
+    assert service._session.batches == [(2, 2), (2, 11), (1, 18)]
+
+
+def test_empty_input_returns_no_embeddings():
+    service = make_service()
+
+    assert service.embed([]).shape[0] == 0
+    assert service.embed_documents([]) == []
+    assert service._session.batches == []
+
+
+def test_model_is_stored_in_app_data(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+
+    service = EmbeddingService()
+
+    assert service.model_path == str(
+        tmp_path / "embedding_models" / "onnx" / "model.onnx"
+    )
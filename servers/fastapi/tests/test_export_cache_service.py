@@ -0,0 +1,222 @@
+import asyncio
+import os
+import uuid
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.sql.presentation import PresentationModel
+from models.sql.slide import SlideModel
+from services import export_cache_service
+from services.export_cache_service import ExportCacheService
+
+
+def make_service(tmp_path, monkeypatch, max_versions=3):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    service = ExportCacheService()
+    service.max_versions = max_versions
+    return service
+
+
+def test_unchanged_version_is_exported_once(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    presentation_id = uuid.uuid4()
+    exports = []
+
+    async def export(output_directory):
+        exports.append(output_directory)
+        await asyncio.sleep(0.01)
+        path = os.path.join(output_directory, "deck.pptx")
+        with open(path, "w") as f:
+            f.write("pptx")
+        return path
+
+    async def run():
+        paths = await asyncio.gather(
+            *[
+                service.get_or_export(presentation_id, "v1", "pptx", export)
+                for _ in range(5)
+            ]
+        )
+        paths.append(
+            await service.get_or_export(presentation_id, "v1", "pptx", export)
+        )
+        return paths
+
+    paths = asyncio.run(run())
+
+    assert len(exports) == 1
+    assert len(set(paths)) == 1
+    assert os.path.dirname(paths[0]).endswith(os.path.join(str(presentation_id), "v1"))
+
+
+def test_artifact_outside_version_directory_is_copied(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    presentation_id = uuid.uuid4()
+    pdf_path = tmp_path / "deck.pdf"
+    pdf_path.write_text("pdf")
+
+    async def export(_):
+        return str(pdf_path)
+
+    path = asyncio.run(service.get_or_export(presentation_id, "v1", "pdf", export))
+
+    assert path != str(pdf_path)
+    with open(path) as f:
+        assert f.read() == "pdf"
+
+
+def test_old_versions_are_collected(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch, max_versions=2)
+    presentation_id = uuid.uuid4()
+
+    async def export(output_directory):
+        path = os.path.join(output_directory, "deck.pptx")
+        with open(path, "w") as f:
+            f.write("pptx")
+        return path
+
+    async def run():
+        for index, version in enumerate(["v1", "v2", "v3"]):
+            await service.get_or_export(presentation_id, version, "pptx", export)
+            version_directory = os.path.join(
+                service.get_presentation_directory(presentation_id), version
+            )
+            os.utime(version_directory, (index, index))
+
+    asyncio.run(run())
+
+    presentation_directory = service.get_presentation_directory(presentation_id)
+    assert sorted(os.listdir(presentation_directory)) == ["v2", "v3"]
+
+    service.delete(presentation_id)
+    assert not os.path.exists(presentation_directory)
+
+
+def test_fingerprint_changes_with_slides(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setattr(
+        export_cache_service,
+        "async_session_maker",
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+    )
+    presentation_id = uuid.uuid4()
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+        missing = await service.get_fingerprint(presentation_id)
+
+        async with export_cache_service.async_session_maker() as sql_session:
+            sql_session.add(
+                PresentationModel(
+                    id=presentation_id, content="", n_slides=1, language="English"
+                )
+            )
+            slide = SlideModel(
+                presentation=presentation_id,
+                layout_group="general",
+                layout="general:intro",
+                index=0,
+                content={"title": "Hello"},
+                html_content=None,
+                properties=None,
+            )
+            sql_session.add(slide)
+            await sql_session.commit()
+
+        first = await service.get_fingerprint(presentation_id)
+        unchanged = await service.get_fingerprint(presentation_id)
+
+        async with export_cache_service.async_session_maker() as sql_session:
+            slide = await sql_session.get(SlideModel, slide.id)
+            slide.content = {"title": "Changed"}
+            sql_session.add(slide)
+            await sql_session.commit()
+
+        changed = await service.get_fingerprint(presentation_id)
+        await engine.dispose()
+        return missing, first, unchanged, changed
+
+    missing, first, unchanged, changed = asyncio.run(run())
+
+    assert missing is None
+    assert first == unchanged
+    assert first != changed
+
+
+def test_waiter_takes_over_when_exporting_caller_is_cancelled(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch)
+    presentation_id = uuid.uuid4()
+    exports = []
+
+    async def export(output_directory):
+        exports.append(output_directory)
+        await asyncio.sleep(0.1 if len(exports) == 1 else 0)
+        path = os.path.join(output_directory, "deck.pptx")
+        with open(path, "w") as f:
+            f.write("pptx")
+        return path
+
+    async def run():
+        leader = asyncio.create_task(
+            service.get_or_export(presentation_id, "v1", "pptx", export)
+        )
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(
+            service.get_or_export(presentation_id, "v1", "pptx", export)
+        )
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        path = await asyncio.wait_for(waiter, timeout=2)
+        assert leader.cancelled()
+        return path
+
+    path = asyncio.run(run())
+
+    assert len(exports) == 2
+    with open(path) as f:
+        assert f.read() == "pptx"
+    assert not service._in_flight
+
+
+def test_streamed_pptx_is_stored_in_export_cache(tmp_path, monkeypatch):
+    import io
+
+    from utils import export_utils
+
+    service = make_service(tmp_path, monkeypatch)
+    monkeypatch.setattr(export_utils, "EXPORT_CACHE_SERVICE", service)
+    presentation_id = uuid.uuid4()
+    builds = []
+
+    async def get_fingerprint(_):
+        return "v1"
+
+    async def export_presentation_as_pptx_buffer(_):
+        builds.append(1)
+        return io.BytesIO(b"pptx")
+
+    monkeypatch.setattr(service, "get_fingerprint", get_fingerprint)
+    monkeypatch.setattr(
+        export_utils,
+        "export_presentation_as_pptx_buffer",
+        export_presentation_as_pptx_buffer,
+    )
+
+    async def run():
+        contents = []
+        for _ in range(2):
+            file, filename = await export_utils.open_presentation_export(
+                presentation_id, "Deck", "pptx"
+            )
+            with file:
+                contents.append((file.read(), filename))
+        return contents
+
+    assert asyncio.run(run()) == [(b"pptx", "Deck.pptx")] * 2
+    assert len(builds) == 1
@@ -0,0 +1,49 @@
+import asyncio
+import io
+import zipfile
+
+from utils.export_utils import (
+    get_content_disposition,
+    iterate_file,
+    write_exports_zip,
+)
+
+
+def test_iterate_file_yields_chunks_and_closes():
+    file = io.BytesIO(b"x" * (150 * 1024))
+
+    async def read():
+        return [chunk async for chunk in iterate_file(file)]
+
+    chunks = asyncio.run(read())
+
+    assert b"".join(chunks) == b"x" * (150 * 1024)
+    assert len(chunks) == 3
+    assert file.closed
+
+
+def test_content_disposition_keeps_unicode_filename():
+    content_disposition = get_content_disposition('Übersicht "Q3".pptx')
+
+    assert content_disposition == (
+        'attachment; filename="bersicht Q3.pptx"; '
+        "filename*=UTF-8''%C3%9Cbersicht%20%22Q3%22.pptx"
+    )
+
+
+def test_exports_zip_stores_files_with_unique_names(tmp_path):
+    exports = []
+    for index in range(3):
+        path = tmp_path / f"{index}.pptx"
+        path.write_bytes(b"pptx %d" % index)
+        exports.append((str(path), "Deck.pptx"))
+    zip_path = str(tmp_path / "exports.zip")
+
+    write_exports_zip(exports, zip_path)
+
+    with zipfile.ZipFile(zip_path) as zip_file:
+        assert zip_file.namelist() == ["Deck.pptx", "Deck (2).pptx", "Deck (3).pptx"]
+        assert zip_file.read("Deck (3).pptx") == b"pptx 2"
+        assert all(
+            info.compress_type == zipfile.ZIP_STORED for info in zip_file.infolist()
+        )
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+import services.icon_finder_service as icon_finder_service
+from services.icon_finder_service import IconFinderService
+
+
+class FakeEmbeddingService:
+    def __init__(self):
+        self.calls = []
+        self._vectors = {}
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        rows = []
+        for text in texts:
+            # Icon documents are "<name> <tags>", queries are the bare name
+            key = text.split()[0]
+            if key not in self._vectors:
+                seed = sum(key.encode())
+                vector = np.random.default_rng(seed).normal(size=16)
+                self._vectors[key] = vector / np.linalg.norm(vector)
+            rows.append(self._vectors[key])
+        return np.array(rows, dtype=np.float32)
+
+
+@pytest.fixture
+def embedding_service(tmp_path, monkeypatch):
+    icons = [{"name": f"icon{i}-bold", "tags": "tag"} for i in range(20)]
+    icons.append({"name": "icon0-light", "tags": "tag"})
+    icons_path = tmp_path / "icons.json"
+    icons_path.write_text(json.dumps({"icons": icons}))
+
+    fake = FakeEmbeddingService()
+    monkeypatch.setattr(icon_finder_service, "EMBEDDING_SERVICE", fake)
+    monkeypatch.setattr(icon_finder_service, "ICONS_PATH", str(icons_path))
+    monkeypatch.setattr(
+        icon_finder_service, "ICON_EMBEDDINGS_PATH", str(tmp_path / "icons.npy")
+    )
+    monkeypatch.setattr(
+        icon_finder_service, "ICON_IDS_PATH", str(tmp_path / "icon_ids.json")
+    )
+    return fake
+
+
+def test_embeddings_are_built_lazily_and_memory_mapped(embedding_service):
+    service = IconFinderService()
+    assert embedding_service.calls == []
+
+    icons = asyncio.run(service.search_icons("icon3-bold", 2))
+
+    assert icons[0] == "/static/icons/bold/icon3-bold.svg"
+    assert len(icons) == 2
+    assert isinstance(service._embeddings, np.memmap)
+    assert service._embeddings.shape == (20, 16)
+
+
+def test_search_icons_batch_embeds_unique_queries_once(embedding_service):
+    service = IconFinderService()
+
+    icons = asyncio.run(
+        service.search_icons_batch(["icon1-bold", "ICON1-bold ", "icon2-bold"])
+    )
+
+    assert [each[0] for each in icons] == [
+        "/static/icons/bold/icon1-bold.svg",
+        "/static/icons/bold/icon1-bold.svg",
+        "/static/icons/bold/icon2-bold.svg",
+    ]
+    # First call builds the icon matrix, second embeds the unique queries
+    assert embedding_service.calls[1] == ["icon1-bold", "icon2-bold"]
+
+    asyncio.run(service.search_icons("icon2-bold"))
+    assert len(embedding_service.calls) == 2
+
+
+def test_query_cache_is_bounded(embedding_service):
+    service = IconFinderService(cache_size=2)
+
+    asyncio.run(service.search_icons_batch(["icon1-bold", "icon2-bold", "icon3-bold"]))
+
+    assert list(service._cache) == [("icon2-bold", 1), ("icon3-bold", 1)]
+
+
+def test_embeddings_are_rebuilt_when_icons_change(embedding_service):
+    assert icon_finder_service.icon_embeddings_are_stale()
+    icon_finder_service.build_icon_embeddings()
+    assert not icon_finder_service.icon_embeddings_are_stale()
+
+    # Embeddings from before the last icons.json change
+    icons_mtime = os.path.getmtime(icon_finder_service.ICONS_PATH)
+    os.utime(
+        icon_finder_service.ICON_EMBEDDINGS_PATH, (icons_mtime - 10, icons_mtime - 10)
+    )
+    assert icon_finder_service.icon_embeddings_are_stale()
+
+    service = IconFinderService()
+    asyncio.run(service.search_icons("icon3"))
+    assert len(embedding_service.calls[0]) == 20
+    assert len(embedding_service.calls) == 3
+    assert not icon_finder_service.icon_embeddings_are_stale()
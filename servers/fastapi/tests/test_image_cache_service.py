@@ -0,0 +1,183 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from services.image_cache_service import ImageCacheService
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path))
+    return ImageCacheService()
+
+
+def make_generator(output_directory, calls, size=100, delay=0.0):
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        path = os.path.join(output_directory, f"{uuid.uuid4()}.jpg")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        return path
+
+    return generate
+
+
+def test_key_normalizes_prompt():
+    key = ImageCacheService.get_key("dall-e-3", "dall-e-3", "A  Cat", None, "1024x1024")
+
+    assert key == ImageCacheService.get_key(
+        "dall-e-3", "dall-e-3", "a cat ", "", "1024x1024"
+    )
+    assert key != ImageCacheService.get_key(
+        "dall-e-3", "dall-e-3", "a cat", "dark theme", "1024x1024"
+    )
+
+
+def test_cached_image_is_linked_into_output_directory(cache, tmp_path):
+    output_directory = str(tmp_path / "out")
+    os.makedirs(output_directory)
+    calls = []
+
+    async def run():
+        first = await cache.get_or_generate(
+            "key", output_directory, make_generator(output_directory, calls)
+        )
+        second = await cache.get_or_generate(
+            "key", output_directory, make_generator(output_directory, calls)
+        )
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert first != second
+    assert os.path.dirname(second) == output_directory
+    with open(first, "rb") as f1, open(second, "rb") as f2:
+        assert f1.read() == f2.read()
+
+
+def test_concurrent_identical_requests_generate_once(cache, tmp_path):
+    output_directory = str(tmp_path)
+    calls = []
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                cache.get_or_generate(
+                    "key",
+                    output_directory,
+                    make_generator(output_directory, calls, delay=0.05),
+                )
+                for _ in range(5)
+            ]
+        )
+
+    paths = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 5
+
+
+def test_use_cached_false_regenerates(cache, tmp_path):
+    output_directory = str(tmp_path)
+    calls = []
+
+    async def run():
+        for _ in range(2):
+            await cache.get_or_generate(
+                "key",
+                output_directory,
+                make_generator(output_directory, calls),
+                use_cached=False,
+            )
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+    assert len(os.listdir(cache.cache_directory)) == 1
+
+
+def test_least_recently_used_files_are_evicted(cache, tmp_path):
+    output_directory = str(tmp_path)
+    cache.max_bytes = 250
+    calls = []
+
+    async def run():
+        for key in ["a", "b"]:
+            await cache.get_or_generate(
+                key, output_directory, make_generator(output_directory, calls)
+            )
+        os.utime(os.path.join(cache.cache_directory, "a.jpg"), (0, 0))
+        os.utime(os.path.join(cache.cache_directory, "b.jpg"), (1, 1))
+        # "a" becomes the most recently used one
+        await cache.get_or_generate(
+            "a", output_directory, make_generator(output_directory, calls)
+        )
+        await cache.get_or_generate(
+            "c", output_directory, make_generator(output_directory, calls)
+        )
+
+    asyncio.run(run())
+
+    assert sorted(os.listdir(cache.cache_directory)) == ["a.jpg", "c.jpg"]
+    assert len(calls) == 3
+
+
+def test_cached_image_is_linked_while_holding_eviction_lock(cache, tmp_path):
+    output_directory = str(tmp_path / "out")
+    os.makedirs(output_directory)
+    calls = []
+    locked = []
+    link = cache._link
+
+    def track_link(source_path, target_path):
+        locked.append(cache._lock.locked())
+        link(source_path, target_path)
+
+    cache._link = track_link
+
+    async def run():
+        for _ in range(2):
+            await cache.get_or_generate(
+                "key", output_directory, make_generator(output_directory, calls)
+            )
+
+    asyncio.run(run())
+
+    assert len(calls) == 1
+    assert locked == [True, True]
+
+
+def test_waiter_generates_when_shared_image_is_evicted(cache, tmp_path):
+    output_directory = str(tmp_path / "out")
+    os.makedirs(output_directory)
+    calls = []
+    store = cache._store
+
+    def store_then_evict(key, image_path):
+        cached_path = store(key, image_path)
+        # A concurrent store evicts the image before the waiter links it
+        os.remove(cached_path)
+        return cached_path
+
+    cache._store = store_then_evict
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                cache.get_or_generate(
+                    "key",
+                    output_directory,
+                    make_generator(output_directory, calls, delay=0.01),
+                )
+                for _ in range(2)
+            ]
+        )
+
+    paths = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert all(os.path.exists(path) for path in paths)
@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from utils.image_utils import (
+    create_circle_image,
+    invert_image,
+    round_image_corners,
+    set_image_opacity,
+)
+
+
+# Previous pure PIL / per pixel implementations, kept as the reference output
+
+
+def reference_round_image_corners(image, radii):
+    w, h = image.size
+    max_radius = min(w // 2, h // 2)
+    clamped_radii = [min(radius, max_radius) for radius in radii]
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+
+    rounded_mask = Image.new("L", image.size, 0)
+    rectangular_mask = Image.new("L", image.size, 255)
+    for i, radius in enumerate(clamped_radii):
+        if radius > 0:
+            circle = Image.new("L", (radius * 2, radius * 2), 0)
+            draw = ImageDraw.Draw(circle)
+            draw.ellipse((0, 0, radius * 2 - 1, radius * 2 - 1), fill=255)
+            if i == 0:
+                rounded_mask.paste(circle.crop((0, 0, radius, radius)), (0, 0))
+                rectangular_mask.paste(0, (0, 0, radius, radius))
+            elif i == 1:
+                rounded_mask.paste(
+                    circle.crop((radius, 0, radius * 2, radius)), (w - radius, 0)
+                )
+                rectangular_mask.paste(0, (w - radius, 0, w, radius))
+            elif i == 2:
+                rounded_mask.paste(
+                    circle.crop((radius, radius, radius * 2, radius * 2)),
+                    (w - radius, h - radius),
+                )
+                rectangular_mask.paste(0, (w - radius, h - radius, w, h))
+            else:
+                rounded_mask.paste(
+                    circle.crop((0, radius, radius, radius * 2)), (0, h - radius)
+                )
+                rectangular_mask.paste(0, (0, h - radius, radius, h))
+
+    original_alpha = image.getchannel("A")
+    corner_mask = Image.composite(rounded_mask, rectangular_mask, rounded_mask)
+    final_alpha = Image.composite(
+        original_alpha, Image.new("L", image.size, 0), corner_mask
+    )
+    result = Image.new("RGBA", image.size)
+    result.paste(image.convert("RGB"), (0, 0))
+    result.putalpha(final_alpha)
+    return result
+
+
+def reference_invert_image(img):
+    new_data = []
+    for r, g, b, a in np.asarray(img).reshape(-1, 4).tolist():
+        if a != 0:
+            new_data.append((255 - r, 255 - g, 255 - b, a))
+        else:
+            new_data.append((0, 0, 0, 0))
+    new_img = Image.new("RGBA", img.size)
+    new_img.putdata(new_data)
+    return new_img
+
+
+def reference_create_circle_image(image):
+    img = image.convert("RGBA")
+    size = img.size
+    mask = Image.new("RGBA", size, color=(0, 0, 0, 0))
+    draw = ImageDraw.Draw(mask)
+    center_x = size[0] // 2
+    center_y = size[1] // 2
+    radius = min(size) // 2
+    draw.ellipse(
+        (center_x - radius, center_y - radius, center_x + radius, center_y + radius),
+        fill=(255, 255, 255, 255),
+    )
+    return Image.composite(img, mask, mask)
+
+
+def reference_set_image_opacity(image, opacity):
+    opacity = max(0.0, min(1.0, opacity))
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    new_alpha = image.getchannel("A").point(lambda x: int(x * opacity))
+    result = Image.new("RGBA", image.size)
+    result.paste(image.convert("RGB"), (0, 0))
+    result.putalpha(new_alpha)
+    return result
+
+
+def random_image(width, height, mode="RGBA", seed=0):
+    rng = np.random.default_rng(seed)
+    channels = len(mode)
+    pixels = rng.integers(0, 256, (height, width, channels), dtype=np.uint8)
+    if mode == "RGBA":
+        # Some fully transparent pixels, as in real cut-outs
+        pixels[rng.random((height, width)) < 0.2, 3] = 0
+    return Image.fromarray(pixels, mode)
+
+
+def assert_same_pixels(actual, expected):
+    assert actual.mode == expected.mode
+    assert actual.size == expected.size
+    assert np.array_equal(np.asarray(actual), np.asarray(expected))
+
+
+SIZES = [(1, 1), (7, 5), (64, 48), (101, 203), (320, 180)]
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize(
+    "radii", [[0, 0, 0, 0], [8, 8, 8, 8], [1, 5, 12, 30], [500, 0, 500, 3]]
+)
+@pytest.mark.parametrize("mode", ["RGBA", "RGB"])
+def test_round_image_corners_matches_reference(size, radii, mode):
+    image = random_image(*size, mode=mode)
+
+    assert_same_pixels(
+        round_image_corners(image, radii), reference_round_image_corners(image, radii)
+    )
+
+
+def test_round_image_corners_requires_four_radii():
+    with pytest.raises(ValueError):
+        round_image_corners(random_image(10, 10), [1, 2, 3])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_invert_image_matches_reference(size):
+    image = random_image(*size)
+
+    assert_same_pixels(invert_image(image), reference_invert_image(image))
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("mode", ["RGBA", "RGB"])
+def test_create_circle_image_matches_reference(size, mode):
+    image = random_image(*size, mode=mode)
+
+    assert_same_pixels(create_circle_image(image), reference_create_circle_image(image))
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("opacity", [-1, 0, 0.33, 0.5, 1, 2])
+@pytest.mark.parametrize("mode", ["RGBA", "RGB"])
+def test_set_image_opacity_matches_reference(size, opacity, mode):
+    image = random_image(*size, mode=mode)
+
+    assert_same_pixels(
+        set_image_opacity(image, opacity), reference_set_image_opacity(image, opacity)
+    )
@@ -0,0 +1,125 @@
+import asyncio
+import base64
+import os
+from types import SimpleNamespace
+import uuid
+
+from fusionbrain_sdk_python.models import PipelineResultStatus
+
+from enums.image_provider import ImageProvider
+from models.image_prompt import ImagePrompt
+from models.sql.image_asset import ImageAsset
+from services import image_generation_service
+from services.image_generation_service import ImageGenerationService
+from services.kandinsky_client import KandinskyClient
+from services.resource_governor import RESOURCE_GOVERNOR, ResourcePool
+
+
+class FakeFBClient:
+    def __init__(self, polls_until_done=2):
+        self.polls_until_done = polls_until_done
+        self.pipeline_requests = 0
+        self.status_requests = {}
+
+    async def get_pipelines_by_type(self, _):
+        self.pipeline_requests += 1
+        await asyncio.sleep(0.01)
+        return [SimpleNamespace(id=uuid.uuid4())]
+
+    async def run_pipeline(self, pipeline_id, prompt, **kwargs):
+        task_id = uuid.uuid4()
+        self.status_requests[task_id] = 0
+        return SimpleNamespace(uuid=task_id, status_time=0)
+
+    async def get_status(self, task_id):
+        self.status_requests[task_id] += 1
+        if self.status_requests[task_id] < self.polls_until_done:
+            return SimpleNamespace(status=PipelineResultStatus.PROCESSING)
+        return SimpleNamespace(
+            status=PipelineResultStatus.DONE,
+            result=SimpleNamespace(files=[base64.b64encode(b"image").decode()]),
+        )
+
+
+def make_client(fake):
+    client = KandinskyClient()
+    client.POLL_INTERVAL = 0.01
+    client._client = fake
+    client._credentials = (None, None)
+    return client
+
+
+def test_deck_images_share_pipeline_discovery_and_poll_loop(tmp_path, monkeypatch):
+    monkeypatch.delenv("KANDINSKY_API_KEY", raising=False)
+    monkeypatch.delenv("KANDINSKY_SECRET_KEY", raising=False)
+    fake = FakeFBClient()
+    client = make_client(fake)
+
+    async def run():
+        return await asyncio.gather(
+            *[client.generate(f"prompt {i}", str(tmp_path)) for i in range(5)]
+        )
+
+    paths = asyncio.run(run())
+
+    assert fake.pipeline_requests == 1
+    assert len(set(paths)) == 5
+    assert all(count == 2 for count in fake.status_requests.values())
+    for path in paths:
+        with open(path, "rb") as f:
+            assert f.read() == b"image"
+    assert len(os.listdir(tmp_path)) == 5
+
+
+def test_failed_generation_raises(tmp_path, monkeypatch):
+    monkeypatch.delenv("KANDINSKY_API_KEY", raising=False)
+    monkeypatch.delenv("KANDINSKY_SECRET_KEY", raising=False)
+    fake = FakeFBClient()
+
+    async def get_status(task_id):
+        return SimpleNamespace(status=PipelineResultStatus.FAIL)
+
+    fake.get_status = get_status
+    client = make_client(fake)
+
+    async def run():
+        try:
+            await client.generate("prompt", str(tmp_path))
+        except Exception as e:
+            return e
+
+    assert "failed" in str(asyncio.run(run()))
+
+
+def test_image_slot_is_only_held_while_submitting(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    monkeypatch.setenv("IMAGE_PROVIDER", ImageProvider.KANDINSKY.value)
+    monkeypatch.delenv("KANDINSKY_API_KEY", raising=False)
+    monkeypatch.delenv("KANDINSKY_SECRET_KEY", raising=False)
+    monkeypatch.setitem(RESOURCE_GOVERNOR.pools, "image", ResourcePool("image", 1))
+    fake = FakeFBClient(polls_until_done=3)
+    client = make_client(fake)
+    monkeypatch.setattr(image_generation_service, "KANDINSKY_CLIENT", client)
+    pending_counts = []
+    get_status = fake.get_status
+
+    async def track_status(task_id):
+        pending_counts.append(len(client._pending))
+        return await get_status(task_id)
+
+    fake.get_status = track_status
+    service = ImageGenerationService(str(tmp_path / "images"))
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                service.generate_image(ImagePrompt(prompt=f"prompt {i}"), False)
+                for i in range(4)
+            ]
+        )
+
+    images = asyncio.run(run())
+
+    assert all(isinstance(image, ImageAsset) for image in images)
+    # Every image was submitted before the first one finished
+    assert max(pending_counts) == 4
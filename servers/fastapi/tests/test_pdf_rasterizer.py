@@ -0,0 +1,40 @@
+import asyncio
+
+from PIL import Image
+import pypdfium2
+
+from services.pdf_rasterizer import PdfRasterizer
+from services.process_pool_service import PROCESS_POOL_SERVICE
+
+
+def test_pages_are_rasterized_in_page_order(tmp_path, monkeypatch):
+    pdf_path = str(tmp_path / "deck.pdf")
+    pdf = pypdfium2.PdfDocument.new()
+    page_widths = [200, 300, 400, 500, 600]
+    for width in page_widths:
+        pdf.new_page(width, 100)
+    pdf.save(pdf_path)
+    pdf.close()
+
+    monkeypatch.setattr(PROCESS_POOL_SERVICE, "max_workers", 2)
+    rasterizer = PdfRasterizer()
+    try:
+        pages = asyncio.run(
+            rasterizer.rasterize(
+                pdf_path, str(tmp_path), dpi=72, image_format="webp", thumbnail_width=50
+            )
+        )
+    finally:
+        PROCESS_POOL_SERVICE.shutdown()
+
+    assert len(pages) == len(page_widths)
+    for number, ((image_path, thumbnail_path), width) in enumerate(
+        zip(pages, page_widths), start=1
+    ):
+        assert image_path.endswith(f"page_{number}.webp")
+        with Image.open(image_path) as image:
+            assert image.format == "WEBP"
+            assert image.size == (width, 100)
+        with Image.open(thumbnail_path) as thumbnail:
+            assert thumbnail.format == "WEBP"
+            assert thumbnail.width == 50
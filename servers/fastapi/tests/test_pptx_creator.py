@@ -1,13 +1,47 @@
 import asyncio
+from collections import OrderedDict
+import os
+import re
+import uuid
+import zipfile
+
+from PIL import Image
+from pptx import Presentation
+import pytest
 from models.pptx_models import (
     PptxAutoShapeBoxModel,
+    PptxConnectorModel,
     PptxFillModel,
+    PptxParagraphModel,
+    PptxPictureBoxModel,
+    PptxPictureModel,
     PptxPositionModel,
     PptxPresentationModel,
+    PptxShadowModel,
     PptxSlideModel,
+    PptxTextBoxModel,
 )
 from services.pptx_presentation_creator import PptxPresentationCreator
-from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE
+from services.process_pool_service import PROCESS_POOL_SERVICE
+from services.processed_image_cache_service import PROCESSED_IMAGE_CACHE_SERVICE
+from services.slide_part_cache_service import SLIDE_PART_CACHE_SERVICE
+from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE, MSO_SHAPE_TYPE
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """
+    Every test gets empty caches and a new process pool, whose workers
+    see the app data directory of the test.
+    """
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    for cache in (SLIDE_PART_CACHE_SERVICE, PROCESSED_IMAGE_CACHE_SERVICE):
+        monkeypatch.setattr(cache, "_index", None)
+        monkeypatch.setattr(cache, "_in_flight", {})
+    monkeypatch.setattr(PROCESSED_IMAGE_CACHE_SERVICE, "_source_hashes", OrderedDict())
+    PROCESS_POOL_SERVICE.shutdown()
+    yield
+    PROCESS_POOL_SERVICE.shutdown()
 
 
 pptx_model = PptxPresentationModel(
@@ -38,3 +72,236 @@ def test_pptx_creator():
     pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
     asyncio.run(pptx_creator.create_ppt())
     pptx_creator.save("debug/test.pptx")
+
+
+def test_pictures_are_processed_once_per_transformation(tmp_path):
+    image_path = str(tmp_path / "source.png")
+    Image.new("RGB", (64, 48), (200, 10, 10)).save(image_path)
+
+    def picture(width):
+        return PptxPictureBoxModel(
+            position=PptxPositionModel(left=0, top=0, width=width, height=20),
+            border_radius=[4, 4, 4, 4],
+            picture=PptxPictureModel(is_network=False, path=image_path),
+        )
+
+    slides = [PptxSlideModel(shapes=[picture(40), picture(30)]) for _ in range(3)]
+    pptx_creator = PptxPresentationCreator(
+        PptxPresentationModel(slides=slides), str(tmp_path)
+    )
+    asyncio.run(pptx_creator.create_ppt())
+
+    processed = list(pptx_creator._processed_images.values())
+    assert len(processed) == 6
+    assert len(set(processed)) == 2
+    assert Image.open(processed[0]).size == (40, 20)
+
+
+def test_incremental_export_rebuilds_changed_slides(tmp_path):
+    image_paths = []
+    for index, color in enumerate([(200, 10, 10), (10, 200, 10)]):
+        image_paths.append(str(tmp_path / f"source_{index}.png"))
+        Image.new("RGB", (64, 48), color).save(image_paths[-1])
+
+    def make_model(fill_color):
+        return PptxPresentationModel(
+            slides=[
+                PptxSlideModel(
+                    note=f"Slide {index}",
+                    shapes=[
+                        PptxPictureBoxModel(
+                            position=PptxPositionModel(
+                                left=0, top=0, width=40, height=20
+                            ),
+                            picture=PptxPictureModel(
+                                is_network=False, path=image_paths[index % 2]
+                            ),
+                        ),
+                        PptxAutoShapeBoxModel(
+                            type=MSO_AUTO_SHAPE_TYPE.RECTANGLE,
+                            position=PptxPositionModel(
+                                left=20, top=20, width=100, height=100
+                            ),
+                            fill=PptxFillModel(
+                                color=fill_color if index == 1 else "000000"
+                            ),
+                        ),
+                    ],
+                )
+                for index in range(3)
+            ]
+        )
+
+    def export(fill_color, incremental):
+        pptx_creator = PptxPresentationCreator(
+            make_model(fill_color), str(tmp_path), incremental=incremental
+        )
+        built = []
+        add_and_populate_slide = pptx_creator.add_and_populate_slide
+
+        def track(slide_model):
+            built.append(slide_model)
+            return add_and_populate_slide(slide_model)
+
+        pptx_creator.add_and_populate_slide = track
+        asyncio.run(pptx_creator.create_ppt())
+        path = str(tmp_path / f"{uuid.uuid4()}.pptx")
+        pptx_creator.save(path)
+        return len(built), Presentation(path)
+
+    def get_slides(presentation):
+        return [
+            (
+                [shape.shape_type for shape in slide.shapes],
+                [
+                    shape.image.blob
+                    for shape in slide.shapes
+                    if shape.shape_type == MSO_SHAPE_TYPE.PICTURE
+                ],
+                slide.notes_slide.notes_text_frame.text,
+            )
+            for slide in presentation.slides
+        ]
+
+    assert export("FF0000", True)[0] == 3
+    assert export("FF0000", True)[0] == 0
+    built, incremental = export("00FF00", True)
+    assert built == 1
+
+    _, full = export("00FF00", False)
+    assert get_slides(incremental) == get_slides(full)
+    assert (
+        incremental.slides[1].shapes[1].fill.fore_color.rgb
+        == full.slides[1].shapes[1].fill.fore_color.rgb
+    )
+
+
+def test_corrupt_or_changed_cached_slides_are_rebuilt(tmp_path):
+    image_path = str(tmp_path / "source.png")
+    Image.new("RGB", (64, 48), (120, 30, 60)).save(image_path)
+
+    def export():
+        model = PptxPresentationModel(
+            slides=[
+                PptxSlideModel(
+                    shapes=[
+                        PptxPictureBoxModel(
+                            position=PptxPositionModel(width=40, height=20),
+                            border_radius=[4, 4, 4, 4],
+                            picture=PptxPictureModel(
+                                is_network=False, path=image_path
+                            ),
+                        )
+                    ]
+                )
+            ]
+        )
+        pptx_creator = PptxPresentationCreator(
+            model, str(tmp_path / "temp"), incremental=True
+        )
+        asyncio.run(pptx_creator.create_ppt())
+        path = str(tmp_path / f"{uuid.uuid4()}.pptx")
+        pptx_creator.save(path)
+        picture = Presentation(path).slides[0].shapes[0]
+        return len(pptx_creator._cached_slide_parts), picture.image.blob
+
+    _, built = export()
+    assert export() == (1, built)
+
+    for entry in os.scandir(SLIDE_PART_CACHE_SERVICE.cache_directory):
+        with open(entry.path, "wb") as f:
+            f.write(b"corrupt")
+    # The slide is built again, with its picture processed
+    assert export() == (0, built)
+
+    # Same path, new content
+    Image.new("RGB", (64, 48), (30, 120, 60)).save(image_path)
+    cached_count, rebuilt = export()
+    assert cached_count == 0
+    assert rebuilt != built
+
+
+def test_parallel_export_matches_sequential_package(tmp_path, monkeypatch):
+    uuid_pattern = re.compile(rb"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}")
+    image_paths = []
+    for index, color in enumerate([(200, 10, 10), (10, 200, 10), (10, 10, 200)]):
+        image_paths.append(str(tmp_path / f"source_{index}.png"))
+        Image.new("RGB", (64, 48), color).save(image_paths[-1])
+
+    def make_model():
+        return PptxPresentationModel(
+            slides=[
+                PptxSlideModel(
+                    background=PptxFillModel(color="F0F0F0") if index % 2 else None,
+                    note=f"Slide {index}" if index % 3 else None,
+                    shapes=[
+                        PptxPictureBoxModel(
+                            position=PptxPositionModel(width=40, height=20),
+                            border_radius=[4, 4, 4, 4] if index % 2 else None,
+                            picture=PptxPictureModel(
+                                is_network=False, path=image_paths[index % 3]
+                            ),
+                        ),
+                        PptxPictureBoxModel(
+                            position=PptxPositionModel(left=50, width=30, height=30),
+                            picture=PptxPictureModel(
+                                is_network=False, path=image_paths[(index + 1) % 3]
+                            ),
+                        ),
+                        PptxAutoShapeBoxModel(
+                            position=PptxPositionModel(width=100, height=100),
+                            fill=PptxFillModel(color="336699", opacity=0.5),
+                            shadow=PptxShadowModel(radius=4, offset=2),
+                            border_radius=8,
+                        ),
+                        PptxTextBoxModel(
+                            position=PptxPositionModel(top=120, width=300, height=50),
+                            paragraphs=[
+                                PptxParagraphModel(
+                                    text=f"<b>Title {index}</b> with <i>runs</i>"
+                                )
+                            ],
+                        ),
+                        PptxConnectorModel(
+                            position=PptxPositionModel(top=200, width=300),
+                            thickness=1,
+                        ),
+                    ],
+                )
+                for index in range(12)
+            ]
+        )
+
+    def export(parallel):
+        monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / f"app_data_{parallel}"))
+        monkeypatch.setattr(PROCESSED_IMAGE_CACHE_SERVICE, "_index", None)
+
+        pptx_creator = PptxPresentationCreator(
+            make_model(), str(tmp_path / f"temp_{parallel}"), parallel=parallel
+        )
+        built_here = []
+        add_and_populate_slide = pptx_creator.add_and_populate_slide
+
+        def track(slide_model):
+            built_here.append(slide_model)
+            return add_and_populate_slide(slide_model)
+
+        pptx_creator.add_and_populate_slide = track
+        asyncio.run(pptx_creator.create_ppt())
+        assert len(built_here) == (0 if parallel else 12)
+        path = str(tmp_path / f"{parallel}.pptx")
+        pptx_creator.save(path)
+        with zipfile.ZipFile(path) as package:
+            # Processed pictures get random names, which end up in the slide XML
+            return {
+                name: uuid_pattern.sub(b"uuid", package.read(name))
+                for name in package.namelist()
+            }
+
+    monkeypatch.setattr(PROCESS_POOL_SERVICE, "max_workers", 3)
+    sequential = export(False)
+    parallel = export(True)
+
+    assert list(parallel) == list(sequential)
+    for name, blob in sequential.items():
+        assert parallel[name] == blob, name
@@ -0,0 +1,30 @@
+import io
+import zipfile
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Pt
+
+from utils.pptx_package_writer import save_presentation
+
+
+def test_media_is_stored_and_xml_is_deflated():
+    image = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 10, 10)).save(image, format="PNG")
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+    slide.shapes.add_picture(io.BytesIO(image.getvalue()), 0, 0, Pt(40), Pt(30))
+
+    buffer = io.BytesIO()
+    save_presentation(presentation, buffer)
+
+    with zipfile.ZipFile(buffer) as package:
+        compression = {info.filename: info.compress_type for info in package.infolist()}
+    media = [name for name in compression if name.startswith("ppt/media/")]
+    assert media
+    assert all(compression[name] == zipfile.ZIP_STORED for name in media)
+    assert compression["ppt/slides/slide1.xml"] == zipfile.ZIP_DEFLATED
+
+    buffer.seek(0)
+    reloaded = Presentation(buffer)
+    assert reloaded.slides[0].shapes[0].image.blob == image.getvalue()
@@ -100,6 +100,7 @@ def patch_presentation_api(monkeypatch, mock_get_layout):
         patch('api.v1.ppt.endpoints.presentation.get_exports_directory', return_value='/tmp/exports'),
         patch('api.v1.ppt.endpoints.presentation.PptxPresentationCreator'),
         patch('api.v1.ppt.endpoints.presentation.aiohttp.ClientSession', return_value=MockAiohttpSession()),
+        patch('api.v1.ppt.endpoints.presentation.process_slides_and_fetch_icons', new_callable=AsyncMock),
     ]
     mocks = [p.start() for p in patches]
 
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+
+from services.process_pool_service import ProcessPoolService
+
+
+def _echo(value: str) -> str:
+    return value
+
+
+def _hang(value: str) -> str:
+    time.sleep(60)
+    return value
+
+
+def test_timed_out_job_replaces_pool():
+    pool = ProcessPoolService()
+    pool.max_workers = 1
+
+    async def run():
+        # Starts the worker, so the timeout only covers the hanging job
+        assert await pool.run(_echo, "warm") == "warm"
+        hanging_executor = pool.executor
+        processes = list(hanging_executor._processes.values())
+
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(_hang, "hang", timeout=1)
+
+        result = await pool.run(_echo, "after timeout", timeout=5)
+        assert pool.executor is not hanging_executor
+
+        # The old pool is terminated once in-flight jobs had their timeout
+        await asyncio.sleep(1.5)
+        return result, processes
+
+    try:
+        result, processes = asyncio.run(run())
+    finally:
+        pool.shutdown()
+
+    assert result == "after timeout"
+    assert not any(process.is_alive() for process in processes)
@@ -0,0 +1,53 @@
+import asyncio
+import os
+
+import pytest
+
+from services.processed_image_cache_service import ProcessedImageCacheService
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_DATA_DIRECTORY", str(tmp_path / "app_data"))
+    return ProcessedImageCacheService()
+
+
+def test_source_hash_follows_file_content(cache, tmp_path):
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.png"
+    first.write_bytes(b"image")
+    second.write_bytes(b"image")
+
+    first_hash = cache.get_source_hash(str(first))
+    assert first_hash == cache.get_source_hash(str(second))
+
+    first.write_bytes(b"changed image")
+    assert cache.get_source_hash(str(first)) != first_hash
+
+
+def test_processed_image_is_reused_for_same_transform(cache, tmp_path):
+    calls = []
+
+    async def process():
+        calls.append(1)
+        path = str(tmp_path / f"processed_{len(calls)}.png")
+        with open(path, "wb") as f:
+            f.write(b"processed")
+        return path
+
+    key = cache.get_transform_key("source", '[100, 100, true]')
+    other_key = cache.get_transform_key("source", '[200, 100, true]')
+
+    async def run():
+        first = await cache.get_or_generate(key, str(tmp_path), process)
+        second = await cache.get_or_generate(key, str(tmp_path), process)
+        await cache.get_or_generate(other_key, str(tmp_path), process)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert first != second
+    with open(second, "rb") as f:
+        assert f.read() == b"processed"
+    assert len(os.listdir(cache.cache_directory)) == 2
@@ -0,0 +1,83 @@
+import sys
+from types import ModuleType
+
+from langchain_core.documents.base import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from utils import rag_context
+from utils.rag_context import (
+    CONTEXT_SEPARATOR,
+    build_rag_context,
+    count_tokens,
+    drop_near_duplicates,
+    merge_overlapping_chunks,
+)
+
+
+TEXT = " ".join(
+    f"Sentence number {i} talks about quarterly revenue of region {i % 7}."
+    for i in range(120)
+)
+
+
+def test_merge_overlapping_chunks_restores_split_text():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = splitter.split_text(TEXT)
+    assert len(chunks) > 3
+
+    # Retriever order is by relevance, not by position in the document
+    merged = merge_overlapping_chunks([chunks[2], chunks[1], chunks[3], chunks[0]])
+
+    assert merged == [TEXT[: TEXT.index(chunks[3]) + len(chunks[3])]]
+
+
+def test_merge_overlapping_chunks_keeps_unrelated_chunks():
+    merged = merge_overlapping_chunks(["First chunk text.", "Second chunk text."])
+
+    assert merged == ["First chunk text.", "Second chunk text."]
+
+
+def test_drop_near_duplicates():
+    original = "Revenue grew by twenty percent in the third quarter of the year thanks to new markets"
+    near_duplicate = original + " overall"
+
+    assert drop_near_duplicates([original, near_duplicate, "Costs stayed flat."]) == [
+        original,
+        "Costs stayed flat.",
+    ]
+
+
+def test_build_rag_context_respects_token_budget():
+    documents = [
+        Document(page_content=f"Passage {i}: " + "word " * 200) for i in range(10)
+    ]
+
+    context = build_rag_context(documents, token_budget=500)
+
+    assert count_tokens(context) <= 500
+    assert context.startswith("Passage 0:")
+    assert len(context.split(CONTEXT_SEPARATOR)) < len(documents)
+
+
+def test_build_rag_context_without_documents():
+    assert build_rag_context([]) == ""
+
+
+def test_tokens_are_estimated_once_tokenizer_cannot_load(monkeypatch):
+    downloads = []
+    tiktoken = ModuleType("tiktoken")
+
+    def get_encoding(name):
+        downloads.append(name)
+        raise ConnectionError("offline")
+
+    tiktoken.get_encoding = get_encoding
+    monkeypatch.setitem(sys.modules, "tiktoken", tiktoken)
+    rag_context._get_encoding.cache_clear()
+    try:
+        assert count_tokens("a" * 40) == 10
+        assert count_tokens("a" * 80) == 20
+    finally:
+        rag_context._get_encoding.cache_clear()
+
+    assert downloads == ["cl100k_base"]
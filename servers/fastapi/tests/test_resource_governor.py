@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+from services.resource_governor import Priority, ResourceGovernor, ResourcePool
+
+
+def make_governor(limit):
+    governor = ResourceGovernor()
+    governor.pools = {"test": ResourcePool("test", limit)}
+    return governor
+
+
+def test_slot_limits_concurrency():
+    governor = make_governor(2)
+    active = []
+    max_active = []
+
+    async def work():
+        async with governor.slot("test"):
+            active.append(1)
+            max_active.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+    async def run():
+        await asyncio.gather(*[work() for _ in range(10)])
+
+    asyncio.run(run())
+
+    metrics = governor.get_metrics()["test"]
+    assert max(max_active) == 2
+    assert metrics["acquired_total"] == 10
+    assert metrics["waited_total"] == 8
+    assert metrics["active"] == 0
+
+
+def test_waiters_are_served_by_priority():
+    governor = make_governor(1)
+    order = []
+
+    async def work(name, priority):
+        async with governor.slot("test", priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        first = asyncio.create_task(work("first", Priority.NORMAL))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(work("background", Priority.BACKGROUND)),
+            asyncio.create_task(work("normal", Priority.NORMAL)),
+        ]
+        await asyncio.sleep(0)
+        with governor.priority(Priority.INTERACTIVE):
+            tasks.append(asyncio.create_task(work("interactive", None)))
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(run())
+
+    assert order == ["first", "interactive", "normal", "background"]
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    governor = make_governor(1)
+
+    async def hold(event):
+        async with governor.slot("test"):
+            await event.wait()
+
+    async def run():
+        event = asyncio.Event()
+        holder = asyncio.create_task(hold(event))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(asyncio.Event()))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        event.set()
+        await holder
+        async with governor.slot("test"):
+            pass
+
+    asyncio.run(asyncio.wait_for(run(), timeout=1))
+
+    assert governor.get_metrics()["test"]["active"] == 0
+
+
+def test_run_in_thread_takes_slot_before_dispatching():
+    governor = make_governor(1)
+    active = []
+    overlaps = []
+
+    def work():
+        active.append(1)
+        overlaps.append(len(active) > 1)
+        time.sleep(0.01)
+        active.pop()
+
+    async def run():
+        await asyncio.gather(*[governor.run_in_thread("test", work) for _ in range(4)])
+
+    asyncio.run(run())
+
+    assert not any(overlaps)
+    assert governor.get_metrics()["test"]["acquired_total"] == 4
+    assert governor.get_metrics()["test"]["waited_total"] == 3
+
+
+def test_stream_releases_slot_when_upstream_finishes():
+    governor = make_governor(1)
+
+    async def upstream():
+        for i in range(3):
+            yield i
+
+    async def run():
+        items = []
+        async for each in governor.stream("test", upstream()):
+            items.append(each)
+            # A slow consumer, upstream is already done after the first item
+            await asyncio.sleep(0.01)
+            items.append(governor.get_metrics()["test"]["active"])
+        return items
+
+    assert asyncio.run(run()) == [0, 0, 1, 0, 2, 0]
+
+
+def test_stream_raises_upstream_errors_and_frees_slot_on_early_exit():
+    governor = make_governor(1)
+    closed = []
+
+    async def failing():
+        yield 1
+        raise ValueError("upstream failed")
+
+    async def endless():
+        try:
+            while True:
+                yield 1
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    async def run():
+        items = []
+        try:
+            async for each in governor.stream("test", failing()):
+                items.append(each)
+        except ValueError as e:
+            items.append(str(e))
+
+        stream = governor.stream("test", endless())
+        async for _ in stream:
+            break
+        await stream.aclose()
+        await asyncio.sleep(0.05)
+        return items
+
+    assert asyncio.run(run()) == [1, "upstream failed"]
+    assert closed == [True]
+    assert governor.get_metrics()["test"]["active"] == 0
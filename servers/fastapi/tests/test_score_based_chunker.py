@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from langchain_core.documents.base import Document
+
+from api.v1.ppt.endpoints.presentation import get_outlines_from_documents
+from models.document_chunk import OUTLINE_MAX_LENGTH, DocumentChunk
+from services.score_based_chunker import ScoreBasedChunker
+
+
+MARKDOWN = """# Annual Report
+
+Intro paragraph.
+
+## Revenue
+
+Revenue grew by 20%.
+
+### Q1
+
+Q1 details.
+
+### Q2
+
+Q2 details.
+
+## Costs
+
+Costs text.
+"""
+
+
+def test_get_n_chunks_splits_on_selected_headings():
+    chunks = asyncio.run(ScoreBasedChunker().get_n_chunks(MARKDOWN, 3))
+
+    assert [chunk.heading for chunk in chunks] == [
+        "# Annual Report",
+        "## Revenue",
+        "## Costs",
+    ]
+    assert chunks[1].content.startswith("Revenue grew by 20%.")
+    assert "### Q2" in chunks[1].content
+    assert chunks[2].content == "Costs text."
+
+
+def test_get_n_chunks_raises_when_not_enough_headings():
+    with pytest.raises(ValueError):
+        asyncio.run(ScoreBasedChunker().get_n_chunks(MARKDOWN, 10))
+
+
+def test_get_chunks_from_headings_matches_extracted_headings():
+    chunker = ScoreBasedChunker()
+    headings = chunker.extract_headings(MARKDOWN)
+    scores = chunker.score_headings(headings)
+
+    chunks = chunker.get_chunks_from_headings(MARKDOWN, headings, scores, 10)
+
+    assert [chunk.heading for chunk in chunks] == headings
+    assert [chunk.heading_index for chunk in chunks] == list(range(len(headings)))
+
+
+def test_split_text_keeps_sections_aligned_with_heading_path():
+    chunker = ScoreBasedChunker(chunk_size=60, chunk_overlap=10)
+
+    chunks = chunker.split_text_with_metadata(MARKDOWN)
+
+    assert [metadata["heading_path"] for _, metadata in chunks] == [
+        "Annual Report",
+        "Annual Report > Revenue",
+        "Annual Report > Revenue > Q2",
+        "Annual Report > Costs",
+    ]
+    assert chunks[1][0].endswith("### Q1\n\nQ1 details.")
+    assert chunks[3][0] == "## Costs\n\nCosts text."
+
+
+def test_split_text_sub_splits_large_sections():
+    chunker = ScoreBasedChunker(chunk_size=100, chunk_overlap=0)
+    long_section = "## Details\n\n" + " ".join(["word"] * 100)
+
+    chunks = chunker.split_text_with_metadata(long_section)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk, _ in chunks)
+    assert all(metadata["heading_path"] == "Details" for _, metadata in chunks)
+
+
+def test_split_documents_without_headings_falls_back_to_plain_text():
+    chunker = ScoreBasedChunker()
+
+    documents = chunker.split_documents(
+        [Document(page_content="Plain text", metadata={"source": "a.txt"})]
+    )
+
+    assert len(documents) == 1
+    assert documents[0].page_content == "Plain text"
+    assert documents[0].metadata == {"source": "a.txt", "heading_path": ""}
+
+
+def test_slide_outline_is_capped_at_outline_length():
+    chunk = DocumentChunk(
+        heading="## Revenue",
+        content=" ".join(f"Revenue grew in region {i}." for i in range(100)),
+        heading_index=0,
+        score=1.0,
+    )
+
+    outline = chunk.to_slide_outline().content
+
+    assert len(outline) <= OUTLINE_MAX_LENGTH
+    assert outline.startswith("## Revenue\nRevenue grew in region 0.")
+    assert outline.endswith(".")
+
+
+def test_short_slide_outline_is_kept_whole():
+    chunk = DocumentChunk(
+        heading="## Costs", content="Costs text.", heading_index=0, score=1.0
+    )
+
+    assert chunk.to_slide_outline().content == "## Costs\nCosts text."
+
+
+def test_document_outlines_start_with_title_slide_when_requested():
+    outlines = asyncio.run(
+        get_outlines_from_documents([MARKDOWN], 4, include_title_slide=True)
+    )
+
+    assert len(outlines.slides) == 4
+    assert outlines.slides[0].content == "Title slide: Annual Report"
+    assert outlines.slides[1].content.startswith("# Annual Report")
+
+
+def test_document_outlines_title_slide_uses_prompt():
+    outlines = asyncio.run(
+        get_outlines_from_documents(
+            [MARKDOWN], 3, include_title_slide=True, content="Yearly results"
+        )
+    )
+
+    assert len(outlines.slides) == 3
+    assert outlines.slides[0].content == "Title slide: Yearly results"
+
+
+def test_document_outlines_have_no_title_slide_by_default():
+    outlines = asyncio.run(get_outlines_from_documents([MARKDOWN], 3))
+
+    assert [slide.content.split("\n")[0] for slide in outlines.slides] == [
+        "# Annual Report",
+        "## Revenue",
+        "## Costs",
+    ]
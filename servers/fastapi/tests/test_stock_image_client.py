@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from services.stock_image_client import RateLimiter, StockImageClient
+
+
+def make_client(calls, urls=None, delay=0.0):
+    client = StockImageClient()
+
+    async def fetch(provider, query):
+        calls.append((provider, query))
+        await asyncio.sleep(delay)
+        return urls if urls is not None else [f"{query}-{i}" for i in range(3)]
+
+    client._fetch = fetch
+    return client
+
+
+def test_search_results_are_cached_by_normalized_query():
+    calls = []
+    client = make_client(calls)
+
+    async def run():
+        first = await client.search("pexels", "Mountain  Lake")
+        second = await client.search("pexels", "mountain lake ")
+        await client.search("pixabay", "mountain lake")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert len(first) == 3
+    assert [provider for provider, _ in calls] == ["pexels", "pixabay"]
+
+
+def test_concurrent_identical_searches_share_one_request():
+    calls = []
+    client = make_client(calls, delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*[client.search("pexels", "city") for _ in range(5)])
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_empty_results_are_not_cached():
+    calls = []
+    client = make_client(calls, urls=[])
+
+    async def run():
+        await client.search("pexels", "nothing")
+        await client.search("pexels", "nothing")
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
+
+
+def test_rate_limiter_waits_for_free_slot():
+    limiter = RateLimiter(2, 0.2)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_waiter_takes_over_when_requesting_caller_is_cancelled():
+    calls = []
+    client = make_client(calls, delay=0.05)
+
+    async def run():
+        owner = asyncio.create_task(client.search("pexels", "forest"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(client.search("pexels", "forest"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    urls = asyncio.run(run())
+
+    assert urls == [f"forest-{i}" for i in range(3)]
+    assert len(calls) == 2
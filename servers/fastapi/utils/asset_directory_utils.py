@@ -17,3 +17,41 @@ def get_uploads_directory():
     uploads_directory = os.path.join(get_app_data_directory_env(), "uploads")
     os.makedirs(uploads_directory, exist_ok=True)
     return uploads_directory
+
+
+def get_document_indexes_directory():
+    document_indexes_directory = os.path.join(
+        get_app_data_directory_env(), "document_indexes"
+    )
+    os.makedirs(document_indexes_directory, exist_ok=True)
+    return document_indexes_directory
+
+
+def get_processed_images_directory():
+    processed_images_directory = os.path.join(
+        get_app_data_directory_env(), "processed_images"
+    )
+    os.makedirs(processed_images_directory, exist_ok=True)
+    return processed_images_directory
+
+
+def get_remote_assets_directory():
+    remote_assets_directory = os.path.join(
+        get_app_data_directory_env(), "remote_assets"
+    )
+    os.makedirs(remote_assets_directory, exist_ok=True)
+    return remote_assets_directory
+
+
+def get_slide_parts_directory():
+    slide_parts_directory = os.path.join(get_app_data_directory_env(), "slide_parts")
+    os.makedirs(slide_parts_directory, exist_ok=True)
+    return slide_parts_directory
+
+
+def get_embedding_models_directory():
+    embedding_models_directory = os.path.join(
+        get_app_data_directory_env(), "embedding_models"
+    )
+    os.makedirs(embedding_models_directory, exist_ok=True)
+    return embedding_models_directory
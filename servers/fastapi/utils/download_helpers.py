@@ -6,10 +6,12 @@ from urllib.parse import urlparse
 
 import aiohttp
 
+from services.resource_governor import RESOURCE_GOVERNOR
+
 import uuid
 
 
-async def download_file(
+async def _download_file(
     url: str, save_directory: str, headers: Optional[dict] = None
 ) -> Optional[str]:
     try:
@@ -58,6 +60,13 @@ async def download_file(
         return None
 
 
+async def download_file(
+    url: str, save_directory: str, headers: Optional[dict] = None
+) -> Optional[str]:
+    async with RESOURCE_GOVERNOR.slot("download"):
+        return await _download_file(url, save_directory, headers)
+
+
 async def download_files(
     urls: List[str], save_directory: str, headers: Optional[dict] = None
 ) -> List[Optional[str]]:
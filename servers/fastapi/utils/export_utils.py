@@ -1,67 +1,232 @@
-import json
+import asyncio
 import os
+import shutil
+import tempfile
+import time
+import zipfile
 import aiohttp
-from typing import Literal
+from typing import IO, AsyncIterator, List, Literal, Tuple
+from urllib.parse import quote
 import uuid
 from fastapi import HTTPException
 from pathvalidate import sanitize_filename
 
 from models.pptx_models import PptxPresentationModel
 from models.presentation_and_path import PresentationAndPath
+from services.export_cache_service import EXPORT_CACHE_SERVICE
 from services.pptx_presentation_creator import PptxPresentationCreator
 from services.temp_file_service import TEMP_FILE_SERVICE
 from utils.asset_directory_utils import get_exports_directory
+from utils.get_env import get_export_spool_max_mb_env
 import uuid
 
 
-async def export_presentation(
-    presentation_id: uuid.UUID, title: str, export_as: Literal["pptx", "pdf"]
-) -> PresentationAndPath:
-    if export_as == "pptx":
+EXPORT_MEDIA_TYPES = {
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "pdf": "application/pdf",
+}
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
-        # Get the converted PPTX model from the Next.js service
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"http://localhost/api/presentation_to_pptx_model?id={presentation_id}"
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    print(f"Failed to get PPTX model: {error_text}")
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Failed to convert presentation to PPTX model",
-                    )
-                pptx_model_data = await response.json()
-
-        # Create PPTX file using the converted model
-        pptx_model = PptxPresentationModel(**pptx_model_data)
-        temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
-        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
-        await pptx_creator.create_ppt()
-
-        export_directory = get_exports_directory()
+async def create_pptx(presentation_id: uuid.UUID, temp_dir: str):
+    # Get the converted PPTX model from the Next.js service
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            f"http://localhost/api/presentation_to_pptx_model?id={presentation_id}"
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                print(f"Failed to get PPTX model: {error_text}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to convert presentation to PPTX model",
+                )
+            pptx_model_data = await response.json()
+
+    # Create PPTX file using the converted model
+    pptx_model = PptxPresentationModel(**pptx_model_data)
+    pptx_creator = PptxPresentationCreator(
+        pptx_model, temp_dir, incremental=True, parallel=True
+    )
+    await pptx_creator.create_ppt()
+    return pptx_creator
+
+
+async def export_presentation_as_pptx(
+    presentation_id: uuid.UUID, title: str, output_directory: str
+) -> str:
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
+    try:
+        pptx_creator = await create_pptx(presentation_id, temp_dir)
         pptx_path = os.path.join(
-            export_directory,
+            output_directory,
             f"{sanitize_filename(title or str(uuid.uuid4()))}.pptx",
         )
-        pptx_creator.save(pptx_path)
+        await asyncio.to_thread(pptx_creator.save, pptx_path)
+        return pptx_path
+    finally:
+        await asyncio.to_thread(TEMP_FILE_SERVICE.cleanup_temp_dir, temp_dir)
+
+
+async def export_presentation_as_pptx_buffer(presentation_id: uuid.UUID) -> IO[bytes]:
+    """
+    Builds the PPTX into a buffer that stays in memory up to
+    EXPORT_SPOOL_MAX_MB and only spills to disk beyond that.
+    """
+    buffer = tempfile.SpooledTemporaryFile(
+        max_size=int(get_export_spool_max_mb_env() or 64) * 1024 * 1024
+    )
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir()
+    try:
+        pptx_creator = await create_pptx(presentation_id, temp_dir)
+        await asyncio.to_thread(pptx_creator.save, buffer)
+    except Exception:
+        buffer.close()
+        raise
+    finally:
+        await asyncio.to_thread(TEMP_FILE_SERVICE.cleanup_temp_dir, temp_dir)
+    buffer.seek(0)
+    return buffer
 
-        return PresentationAndPath(
-            presentation_id=presentation_id,
-            path=pptx_path,
+
+async def export_presentation_as_pdf(presentation_id: uuid.UUID, title: str) -> str:
+    async with aiohttp.ClientSession() as session:
+        async with session.post(
+            "http://localhost/api/export-as-pdf",
+            json={
+                "id": str(presentation_id),
+                "title": sanitize_filename(title or str(uuid.uuid4())),
+            },
+        ) as response:
+            response_json = await response.json()
+    return response_json["path"]
+
+
+async def export_presentation(
+    presentation_id: uuid.UUID, title: str, export_as: Literal["pptx", "pdf"]
+) -> PresentationAndPath:
+    async def export(output_directory: str) -> str:
+        if export_as == "pptx":
+            return await export_presentation_as_pptx(
+                presentation_id, title, output_directory
+            )
+        return await export_presentation_as_pdf(presentation_id, title)
+
+    # Unchanged presentations reuse the file of their last export
+    fingerprint = await EXPORT_CACHE_SERVICE.get_fingerprint(presentation_id)
+    if fingerprint:
+        path = await EXPORT_CACHE_SERVICE.get_or_export(
+            presentation_id, fingerprint, export_as, export
         )
     else:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "http://localhost/api/export-as-pdf",
-                json={
-                    "id": str(presentation_id),
-                    "title": sanitize_filename(title or str(uuid.uuid4())),
-                },
-            ) as response:
-                response_json = await response.json()
-
-        return PresentationAndPath(
-            presentation_id=presentation_id,
-            path=response_json["path"],
+        path = await export(get_exports_directory())
+
+    return PresentationAndPath(
+        presentation_id=presentation_id,
+        path=path,
+    )
+
+
+async def iterate_file(file: IO[bytes]) -> AsyncIterator[bytes]:
+    """
+    Yields the file in chunks and closes it, also when the client disconnects.
+    """
+    try:
+        while chunk := await asyncio.to_thread(file.read, STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+def copy_file_object(file: IO[bytes], path: str):
+    file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(file, f, STREAM_CHUNK_SIZE)
+    file.seek(0)
+
+
+async def store_pptx_buffer(
+    presentation_id: uuid.UUID, fingerprint: str, filename: str, buffer: IO[bytes]
+):
+    """
+    Stores a PPTX built in memory in the export cache. The export is served
+    from the buffer either way, so failures are only reported.
+    """
+
+    async def export(output_directory: str) -> str:
+        path = os.path.join(output_directory, filename)
+        await asyncio.to_thread(copy_file_object, buffer, path)
+        return path
+
+    try:
+        await EXPORT_CACHE_SERVICE.get_or_export(
+            presentation_id, fingerprint, "pptx", export
         )
+    except Exception as e:
+        print(f"Could not cache export of {presentation_id}: {e}")
+    buffer.seek(0)
+
+
+async def open_presentation_export(
+    presentation_id: uuid.UUID, title: str, export_as: Literal["pptx", "pdf"]
+) -> Tuple[IO[bytes], str]:
+    """
+    Returns an open file with the exported presentation and its filename.
+    PPTX files that aren't cached are built in memory and streamed from
+    there, a copy is stored in the export cache for later exports.
+    """
+    filename = f"{sanitize_filename(title or str(presentation_id))}.{export_as}"
+    if export_as == "pptx":
+        fingerprint = await EXPORT_CACHE_SERVICE.get_fingerprint(presentation_id)
+        cached_path = fingerprint and await EXPORT_CACHE_SERVICE.get_cached(
+            presentation_id, fingerprint, export_as
+        )
+        if not cached_path:
+            buffer = await export_presentation_as_pptx_buffer(presentation_id)
+            if fingerprint:
+                await store_pptx_buffer(presentation_id, fingerprint, filename, buffer)
+            return buffer, filename
+        path = cached_path
+    else:
+        path = (await export_presentation(presentation_id, title, export_as)).path
+    return await asyncio.to_thread(open, path, "rb"), filename
+
+
+def get_content_disposition(filename: str) -> str:
+    ascii_filename = filename.encode("ascii", "ignore").decode() or "presentation"
+    ascii_filename = ascii_filename.replace('"', "")
+    return (
+        f'attachment; filename="{ascii_filename}"; '
+        f"filename*=UTF-8''{quote(filename)}"
+    )
+
+
+def remove_expired_bulk_exports(bulk_directory: str, max_age: float):
+    """
+    Removes bulk export zips older than max_age seconds. Clients download
+    a zip right after the export, so nothing else needs them.
+    """
+    now = time.time()
+    for entry in os.scandir(bulk_directory):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def write_exports_zip(exports: List[Tuple[str, str]], zip_path: str):
+    """
+    Writes (path, filename) pairs into one zip. Exports are already
+    compressed, so they are stored as is. Repeated filenames get a suffix.
+    """
+    used_filenames = set()
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as zip_file:
+        for path, filename in exports:
+            name, extension = os.path.splitext(filename)
+            count = 1
+            while filename in used_filenames:
+                count += 1
+                filename = f"{name} ({count}){extension}"
+            used_filenames.add(filename)
+            zip_file.write(path, filename)
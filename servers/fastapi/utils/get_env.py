@@ -81,6 +81,10 @@ def get_kandinsky_api_key_env():
     return os.getenv("KANDINSKY_API_KEY")
 
 
+def get_kandinsky_secret_key_env():
+    return os.getenv("KANDINSKY_SECRET_KEY")
+
+
 def get_pixabay_api_key_env():
     return os.getenv("PIXABAY_API_KEY")
 
@@ -99,3 +103,131 @@ def get_extended_reasoning_env():
 
 def get_web_grounding_env():
     return os.getenv("WEB_GROUNDING")
+
+
+def get_document_parser_workers_env():
+    return os.getenv("DOCUMENT_PARSER_WORKERS")
+
+
+def get_document_parse_timeout_env():
+    return os.getenv("DOCUMENT_PARSE_TIMEOUT")
+
+
+def get_document_parser_memory_limit_mb_env():
+    return os.getenv("DOCUMENT_PARSER_MEMORY_LIMIT_MB")
+
+
+def get_pdf_pages_per_task_env():
+    return os.getenv("PDF_PAGES_PER_TASK")
+
+
+def get_embedding_threads_env():
+    return os.getenv("EMBEDDING_THREADS")
+
+
+def get_embedding_quantize_env():
+    return os.getenv("EMBEDDING_QUANTIZE")
+
+
+def get_document_chunker_env():
+    return os.getenv("DOCUMENT_CHUNKER")
+
+
+def get_rag_context_token_budget_env():
+    return os.getenv("RAG_CONTEXT_TOKEN_BUDGET")
+
+
+def get_chroma_janitor_interval_env():
+    return os.getenv("CHROMA_JANITOR_INTERVAL")
+
+
+def get_chroma_orphan_grace_period_env():
+    return os.getenv("CHROMA_ORPHAN_GRACE_PERIOD")
+
+
+def get_chroma_disk_budget_mb_env():
+    return os.getenv("CHROMA_DISK_BUDGET_MB")
+
+
+def get_chroma_collection_max_age_env():
+    return os.getenv("CHROMA_COLLECTION_MAX_AGE")
+
+
+def get_cpu_pool_workers_env():
+    return os.getenv("CPU_POOL_WORKERS")
+
+
+def get_pdf_raster_dpi_env():
+    return os.getenv("PDF_RASTER_DPI")
+
+
+def get_pdf_raster_format_env():
+    return os.getenv("PDF_RASTER_FORMAT")
+
+
+def get_pdf_raster_thumbnail_width_env():
+    return os.getenv("PDF_RASTER_THUMBNAIL_WIDTH")
+
+
+def get_pdf_raster_timeout_env():
+    return os.getenv("PDF_RASTER_TIMEOUT")
+
+
+def get_image_cache_max_mb_env():
+    return os.getenv("IMAGE_CACHE_MAX_MB")
+
+
+def get_llm_concurrency_env():
+    return os.getenv("LLM_CONCURRENCY")
+
+
+def get_image_concurrency_env():
+    return os.getenv("IMAGE_CONCURRENCY")
+
+
+def get_embed_concurrency_env():
+    return os.getenv("EMBED_CONCURRENCY")
+
+
+def get_parse_concurrency_env():
+    return os.getenv("PARSE_CONCURRENCY")
+
+
+def get_office_concurrency_env():
+    return os.getenv("OFFICE_CONCURRENCY")
+
+
+def get_download_concurrency_env():
+    return os.getenv("DOWNLOAD_CONCURRENCY")
+
+
+def get_processed_image_cache_max_mb_env():
+    return os.getenv("PROCESSED_IMAGE_CACHE_MAX_MB")
+
+
+def get_remote_asset_cache_max_mb_env():
+    return os.getenv("REMOTE_ASSET_CACHE_MAX_MB")
+
+
+def get_remote_asset_max_age_env():
+    return os.getenv("REMOTE_ASSET_MAX_AGE")
+
+
+def get_export_cache_versions_env():
+    return os.getenv("EXPORT_CACHE_VERSIONS")
+
+
+def get_slide_part_cache_max_mb_env():
+    return os.getenv("SLIDE_PART_CACHE_MAX_MB")
+
+
+def get_export_spool_max_mb_env():
+    return os.getenv("EXPORT_SPOOL_MAX_MB")
+
+
+def get_bulk_export_concurrency_env():
+    return os.getenv("BULK_EXPORT_CONCURRENCY")
+
+
+def get_bulk_export_max_age_env():
+    return os.getenv("BULK_EXPORT_MAX_AGE")
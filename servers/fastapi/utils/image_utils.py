@@ -1,5 +1,7 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
+import numpy as np
 from PIL import Image, ImageDraw
 
 from models.pptx_models import PptxObjectFitEnum, PptxObjectFitModel
@@ -46,6 +48,14 @@ def clip_image(
     return clipped_image
 
 
+@lru_cache(maxsize=64)
+def _get_circle(radius: int) -> np.ndarray:
+    circle = Image.new("L", (radius * 2, radius * 2), 0)
+    draw = ImageDraw.Draw(circle)
+    draw.ellipse((0, 0, radius * 2 - 1, radius * 2 - 1), fill=255)
+    return np.asarray(circle) > 0
+
+
 def round_image_corners(image: Image.Image, radii: List[int]) -> Image.Image:
     if len(radii) != 4:
         raise ValueError(
@@ -62,80 +72,38 @@ def round_image_corners(image: Image.Image, radii: List[int]) -> Image.Image:
     if image.mode != "RGBA":
         image = image.convert("RGBA")
 
-    # Create a mask for the rounded corners (start with fully transparent)
-    rounded_mask = Image.new("L", image.size, 0)
-
-    # Create a rectangular mask (fully opaque)
-    rectangular_mask = Image.new("L", image.size, 255)
-
-    # Process each corner
+    # Only the corner squares change, pixels outside the quarter circles get alpha 0
+    alpha = np.array(image.getchannel("A"))
     for i, radius in enumerate(clamped_radii):
-        if radius > 0:  # Only process if radius is positive
-            # Create a circle for this radius
-            circle = Image.new("L", (radius * 2, radius * 2), 0)
-            draw = ImageDraw.Draw(circle)
-            draw.ellipse((0, 0, radius * 2 - 1, radius * 2 - 1), fill=255)
-
-            # Calculate position based on corner index
-            if i == 0:  # top-left
-                rounded_mask.paste(circle.crop((0, 0, radius, radius)), (0, 0))
-                rectangular_mask.paste(0, (0, 0, radius, radius))
-            elif i == 1:  # top-right
-                rounded_mask.paste(
-                    circle.crop((radius, 0, radius * 2, radius)), (w - radius, 0)
-                )
-                rectangular_mask.paste(0, (w - radius, 0, w, radius))
-            elif i == 2:  # bottom-right
-                rounded_mask.paste(
-                    circle.crop((radius, radius, radius * 2, radius * 2)),
-                    (w - radius, h - radius),
-                )
-                rectangular_mask.paste(0, (w - radius, h - radius, w, h))
-            else:  # bottom-left
-                rounded_mask.paste(
-                    circle.crop((0, radius, radius, radius * 2)), (0, h - radius)
-                )
-                rectangular_mask.paste(0, (0, h - radius, radius, h))
-
-    # Get the original alpha channel
-    original_alpha = image.getchannel("A")
-
-    # Combine the rectangular mask with the rounded corners
-    corner_mask = Image.composite(rounded_mask, rectangular_mask, rounded_mask)
-
-    # Combine the corner mask with the original alpha channel
-    final_alpha = Image.composite(
-        original_alpha, Image.new("L", image.size, 0), corner_mask
-    )
-
-    # Create a new image with the modified alpha channel
-    result = Image.new("RGBA", image.size)
-    result.paste(image.convert("RGB"), (0, 0))
-    result.putalpha(final_alpha)
-
+        if radius <= 0:
+            continue
+        circle = _get_circle(radius)
+        if i == 0:  # top-left
+            alpha[:radius, :radius][~circle[:radius, :radius]] = 0
+        elif i == 1:  # top-right
+            alpha[:radius, w - radius :][~circle[:radius, radius:]] = 0
+        elif i == 2:  # bottom-right
+            alpha[h - radius :, w - radius :][~circle[radius:, radius:]] = 0
+        else:  # bottom-left
+            alpha[h - radius :, :radius][~circle[radius:, :radius]] = 0
+
+    result = image.copy()
+    result.putalpha(Image.fromarray(alpha, "L"))
     return result
 
 
 def invert_image(img: Image.Image) -> Image.Image:
-    # Get image data
-    data = img.getdata()
-
-    # Process each pixel
-    new_data = []
-    for item in data:
-        # Get current pixel values
-        r, g, b, a = item
-
-        # Invert RGB values while preserving transparency
-        if a != 0:  # Skip fully transparent pixels
-            new_data.append((255 - r, 255 - g, 255 - b, a))
-        else:
-            new_data.append((0, 0, 0, 0))
+    pixels = np.asarray(img)
+    if pixels.ndim != 3 or pixels.shape[2] != 4:
+        raise ValueError("Invert Image - image must be RGBA")
 
-    # Create new image with modified data
-    new_img = Image.new("RGBA", img.size)
-    new_img.putdata(new_data)
-    return new_img
+    # Invert RGB values while preserving transparency,
+    # fully transparent pixels become transparent black
+    inverted = np.empty_like(pixels)
+    np.subtract(255, pixels[..., :3], out=inverted[..., :3])
+    inverted[..., 3] = pixels[..., 3]
+    inverted[pixels[..., 3] == 0] = 0
+    return Image.fromarray(inverted, "RGBA")
 
 
 def create_circle_image(
@@ -147,8 +115,7 @@ def create_circle_image(
     size = img.size
     # Use the smaller dimension for the circle
     circle_size = min(size)
-    # Create a transparent image of the same size as original
-    mask = Image.new("RGBA", size, color=(0, 0, 0, 0))
+    mask = Image.new("L", size, 0)
     draw = ImageDraw.Draw(mask)
 
     # Calculate center position
@@ -164,11 +131,12 @@ def create_circle_image(
             center_x + radius,
             center_y + radius,
         ),
-        fill=(255, 255, 255, 255),
+        fill=255,
     )
 
-    # Apply the circular mask
-    result = Image.composite(img, mask, mask)
+    # Pixels outside the circle become transparent black
+    result = Image.new("RGBA", size, (0, 0, 0, 0))
+    result.paste(img, (0, 0), mask)
     return result
 
 
@@ -180,17 +148,12 @@ def set_image_opacity(image: Image.Image, opacity: float) -> Image.Image:
     if image.mode != "RGBA":
         image = image.convert("RGBA")
 
-    # Get the original alpha channel
-    original_alpha = image.getchannel("A")
-
-    # Create new alpha channel with adjusted opacity
-    new_alpha = original_alpha.point(lambda x: int(x * opacity))
+    # Alpha is scaled through a lookup table instead of per pixel
+    lut = [int(x * opacity) for x in range(256)]
+    new_alpha = image.getchannel("A").point(lut)
 
-    # Create new image with modified alpha channel
-    result = Image.new("RGBA", image.size)
-    result.paste(image.convert("RGB"), (0, 0))
+    result = image.copy()
     result.putalpha(new_alpha)
-
     return result
 
 
@@ -256,3 +219,46 @@ def fit_image(
         return image.resize((width, height), Image.LANCZOS)
 
     return image
+
+
+def process_image_file(
+    image_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    clip: bool,
+    border_radius: Optional[List[int]],
+    object_fit: Optional[PptxObjectFitModel],
+    circle: bool,
+    invert: bool,
+    opacity: Optional[float],
+) -> Optional[str]:
+    """
+    Applies picture box transformations of a PPTX export and saves the result
+    as PNG. Takes picklable arguments so it can run in a worker process.
+    Returns output_path, or None if the image can't be opened.
+    """
+    try:
+        image = Image.open(image_path)
+    except Exception:
+        print(f"Could not open image: {image_path}")
+        return None
+
+    image = image.convert("RGBA")
+    # ? Applying border radius twice to support both clip and object fit
+    if border_radius:
+        image = round_image_corners(image, border_radius)
+    if object_fit:
+        image = fit_image(image, width, height, object_fit)
+    elif clip:
+        image = clip_image(image, width, height)
+    if border_radius:
+        image = round_image_corners(image, border_radius)
+    if circle:
+        image = create_circle_image(image)
+    if invert:
+        image = invert_image(image)
+    if opacity:
+        image = set_image_opacity(image, opacity)
+    image.save(output_path)
+    return output_path
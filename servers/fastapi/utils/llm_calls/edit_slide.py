@@ -4,9 +4,12 @@ from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.presentation_layout import SlideLayoutModel
 from models.sql.slide import SlideModel
 from services.llm_client import LLMClient
+from services.resource_governor import RESOURCE_GOVERNOR
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
+from utils.rag_context import build_rag_context
 from utils.schema_utils import add_field_in_schema, remove_fields_from_schema
+from langchain_core.retrievers import BaseRetriever
 
 
 def get_system_prompt(
@@ -39,7 +42,9 @@ def get_system_prompt(
     """
 
 
-def get_user_prompt(prompt: str, slide_data: dict, language: str):
+def get_user_prompt(
+    prompt: str, slide_data: dict, language: str, slide_context: str = ""
+):
     return f"""
         ## Icon Query And Image Prompt Language
         English
@@ -50,6 +55,9 @@ def get_user_prompt(prompt: str, slide_data: dict, language: str):
         ## Slide Content Language
         {language}
 
+        ## Additional Context for this slide
+        {slide_context or "No additional context provided."}
+
         ## Prompt
         {prompt}
 
@@ -65,13 +73,14 @@ def get_messages(
     tone: Optional[str] = None,
     verbosity: Optional[str] = None,
     instructions: Optional[str] = None,
+    slide_context: str = "",
 ):
     return [
         LLMSystemMessage(
             content=get_system_prompt(tone, verbosity, instructions),
         ),
         LLMUserMessage(
-            content=get_user_prompt(prompt, slide_data, language),
+            content=get_user_prompt(prompt, slide_data, language, slide_context),
         ),
     ]
 
@@ -84,9 +93,20 @@ async def get_edited_slide_content(
     tone: Optional[str] = None,
     verbosity: Optional[str] = None,
     instructions: Optional[str] = None,
+    retriever: Optional[BaseRetriever] = None,
 ):
     model = get_model()
 
+    slide_context = ""
+    if retriever:
+        try:
+            # The query is embedded in a worker thread, so the slot is taken here
+            async with RESOURCE_GOVERNOR.slot("embed"):
+                relevant_docs = await retriever.ainvoke(prompt)
+            slide_context = build_rag_context(relevant_docs, model)
+        except Exception as e:
+            print(f"ERROR during retriever.ainvoke in get_edited_slide_content: {e}")
+
     response_schema = remove_fields_from_schema(
         slide_layout.json_schema, ["__image_url__", "__icon_url__"]
     )
@@ -108,7 +128,13 @@ async def get_edited_slide_content(
         response = await client.generate_structured(
             model=model,
             messages=get_messages(
-                prompt, slide.content, language, tone, verbosity, instructions
+                prompt,
+                slide.content,
+                language,
+                tone,
+                verbosity,
+                instructions,
+                slide_context,
             ),
             response_format=response_schema,
             strict=False,
@@ -5,9 +5,11 @@ from fastapi import HTTPException
 from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.llm_tools import SearchWebTool
 from services.llm_client import LLMClient
+from services.resource_governor import RESOURCE_GOVERNOR
 from utils.get_dynamic_models import get_presentation_outline_model_with_n_slides
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
+from utils.rag_context import build_rag_context
 from langchain_core.retrievers import BaseRetriever
 
 
@@ -105,14 +107,15 @@ async def generate_ppt_outline(
         # print("\n--- DEBUG: RAG in generate_ppt_outline ---")
         # print(f"Invoking retriever for main content: '{content[:100]}...'")
         try:
-            relevant_docs = await retriever.ainvoke(content)
+            # The query is embedded in a worker thread, so the slot is taken here
+            async with RESOURCE_GOVERNOR.slot("embed"):
+                relevant_docs = await retriever.ainvoke(content)
             print(f"Retriever returned {len(relevant_docs)} documents.")
             # for i, doc in enumerate(relevant_docs):
             #     text = doc.page_content[:150].replace('\n', ' ')
             #     print(f"  - Doc {i + 1} content: {text}...")
 
-            additional_context = "\n\n---\n\n".join([doc.page_content for doc in relevant_docs])
-            print("Total context length:", len(additional_context))
+            additional_context = build_rag_context(relevant_docs, model)
         except Exception as e:
             print(f"ERROR during retriever.ainvoke in generate_ppt_outline: {e}")
             relevant_docs = []  # Продолжаем без контекста в случае ошибки
@@ -4,8 +4,10 @@ from models.llm_message import LLMSystemMessage, LLMUserMessage
 from models.presentation_layout import SlideLayoutModel
 from models.presentation_outline_model import SlideOutlineModel
 from services.llm_client import LLMClient
+from services.resource_governor import RESOURCE_GOVERNOR
 from utils.llm_client_error_handler import handle_llm_client_exceptions
 from utils.llm_provider import get_model
+from utils.rag_context import build_rag_context
 from utils.schema_utils import add_field_in_schema, remove_fields_from_schema
 from langchain_core.retrievers import BaseRetriever
 
@@ -121,14 +123,15 @@ async def get_slide_content_from_type_and_outline(
         # text = outline.content[:100].replace('\n', ' ')
         # print(f"Invoking retriever for slide outline: '{text}...'")
         try:
-            relevant_docs = await retriever.ainvoke(outline.content)
+            # The query is embedded in a worker thread, so the slot is taken here
+            async with RESOURCE_GOVERNOR.slot("embed"):
+                relevant_docs = await retriever.ainvoke(outline.content)
             # print(f"Retriever returned {len(relevant_docs)} documents for this slide.")
             # for i, doc in enumerate(relevant_docs):
             #     text = doc.page_content[:150].replace('\n', ' ')
             #     print(f"  - Doc {i + 1} content: {text}...")
 
-            slide_context = "\n\n---\n\n".join([doc.page_content for doc in relevant_docs])
-            print("Total slide context length:", len(slide_context))
+            slide_context = build_rag_context(relevant_docs, model)
         except Exception as e:
             print(f"ERROR during retriever.ainvoke in get_slide_content: {e}")
             relevant_docs = []
@@ -23,6 +23,7 @@ from utils.get_env import get_custom_llm_api_key_env
 from utils.get_env import get_custom_llm_url_env
 from utils.get_env import get_custom_model_env
 from utils.get_env import get_kandinsky_api_key_env
+from utils.get_env import get_kandinsky_secret_key_env
 from utils.llm_provider import (
     get_llm_provider,
     is_custom_llm_selected,
@@ -132,4 +133,6 @@ async def check_llm_and_image_provider_api_or_model_availability():
         elif selected_image_provider == ImageProvider.KANDINSKY:
             kandinsky_api_key = get_kandinsky_api_key_env()
             if not kandinsky_api_key:
-                raise Exception("KANDINSKY_API_KEY must be provided")
\ No newline at end of file
+                raise Exception("KANDINSKY_API_KEY must be provided")
+            if not get_kandinsky_secret_key_env():
+                raise Exception("KANDINSKY_SECRET_KEY must be provided")
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import IO, Union
+import zipfile
+
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import PackageWriter, _ZipPkgWriter
+from pptx.presentation import Presentation
+
+
+# Media that is already compressed gains nothing from deflate
+STORED_EXTENSIONS = {"jpeg", "jpg", "png", "gif", "webp", "mp3", "mp4", "m4a"}
+
+
+class _MediaStoredZipPkgWriter(_ZipPkgWriter):
+
+    def write(self, pack_uri: PackURI, blob: bytes) -> None:
+        compress_type = (
+            zipfile.ZIP_STORED
+            if pack_uri.ext.lower() in STORED_EXTENSIONS
+            else zipfile.ZIP_DEFLATED
+        )
+        self._zipf.writestr(pack_uri.membername, blob, compress_type=compress_type)
+
+
+class PptxPackageWriter(PackageWriter):
+    """
+    python-pptx PackageWriter that stores already compressed media
+    instead of deflating every part. It relies on python-pptx internals,
+    which is why pyproject.toml pins python-pptx below 1.1.
+    """
+
+    def _write(self) -> None:
+        with _MediaStoredZipPkgWriter(self._pkg_file) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+
+def save_presentation(presentation: Presentation, pkg_file: Union[str, IO[bytes]]):
+    package = presentation.part.package
+    PptxPackageWriter.write(pkg_file, package._rels, tuple(package.iter_parts()))
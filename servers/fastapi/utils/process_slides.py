@@ -9,15 +9,38 @@ from utils.asset_directory_utils import get_images_directory
 from utils.dict_utils import get_dict_at_path, get_dict_paths_with_key, set_dict_at_path
 
 
+async def process_slides_and_fetch_icons(slides: List[SlideModel]):
+    """
+    Resolves icons of all slides with a single batched icon search.
+    """
+    icon_dicts = []
+    for slide in slides:
+        for icon_path in get_dict_paths_with_key(slide.content, "__icon_query__"):
+            icon_dicts.append(get_dict_at_path(slide.content, icon_path))
+
+    if not icon_dicts:
+        return
+
+    icons = await ICON_FINDER_SERVICE.search_icons_batch(
+        [icon_dict["__icon_query__"] for icon_dict in icon_dicts]
+    )
+    for icon_dict, icon_urls in zip(icon_dicts, icons):
+        icon_dict["__icon_url__"] = icon_urls[0]
+
+
 async def process_slide_and_fetch_assets(
     image_generation_service: ImageGenerationService,
     slide: SlideModel,
+    fetch_icons: bool = True,
 ) -> List[ImageAsset]:
 
     async_tasks = []
 
     image_paths = get_dict_paths_with_key(slide.content, "__image_prompt__")
-    icon_paths = get_dict_paths_with_key(slide.content, "__icon_query__")
+    # Icons can be left to process_slides_and_fetch_icons to batch them across slides
+    icon_paths = (
+        get_dict_paths_with_key(slide.content, "__icon_query__") if fetch_icons else []
+    )
 
     for image_path in image_paths:
         __image_prompt__parent = get_dict_at_path(slide.content, image_path)
@@ -29,13 +52,18 @@ async def process_slide_and_fetch_assets(
             )
         )
 
-    for icon_path in icon_paths:
-        __icon_query__parent = get_dict_at_path(slide.content, icon_path)
+    if icon_paths:
         async_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(__icon_query__parent["__icon_query__"])
+            ICON_FINDER_SERVICE.search_icons_batch(
+                [
+                    get_dict_at_path(slide.content, icon_path)["__icon_query__"]
+                    for icon_path in icon_paths
+                ]
+            )
         )
 
     results = await asyncio.gather(*async_tasks)
+    icon_results = results.pop() if icon_paths else []
     results.reverse()
 
     return_assets = []
@@ -49,9 +77,9 @@ async def process_slide_and_fetch_assets(
             image_dict["__image_url__"] = result
         set_dict_at_path(slide.content, image_path, image_dict)
 
-    for icon_path in icon_paths:
+    for icon_path, icon_urls in zip(icon_paths, icon_results):
         icon_dict = get_dict_at_path(slide.content, icon_path)
-        icon_dict["__icon_url__"] = results.pop()[0]
+        icon_dict["__icon_url__"] = icon_urls[0]
         set_dict_at_path(slide.content, icon_path, icon_dict)
 
     return return_assets
@@ -100,8 +128,8 @@ async def process_old_and_new_slides_and_fetch_assets(
     async_image_fetch_tasks = []
     new_images_fetch_status = []
 
-    # Creates async tasks for fetching new icons
-    async_icon_fetch_tasks = []
+    # Collects queries of new icons, they are searched in one batch
+    new_icon_queries = []
     new_icons_fetch_status = []
 
     # Creates async tasks for fetching new images
@@ -135,13 +163,11 @@ async def process_old_and_new_slides_and_fetch_assets(
             new_icons_fetch_status.append(False)
             continue
 
-        async_icon_fetch_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(new_icon["__icon_query__"])
-        )
+        new_icon_queries.append(new_icon["__icon_query__"])
         new_icons_fetch_status.append(True)
 
     new_images = await asyncio.gather(*async_image_fetch_tasks)
-    new_icons = await asyncio.gather(*async_icon_fetch_tasks)
+    new_icons = await ICON_FINDER_SERVICE.search_icons_batch(new_icon_queries)
 
     # list of new assets
     new_assets = []
@@ -0,0 +1,175 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Set, Tuple
+
+from langchain_core.documents.base import Document
+
+from utils.get_env import get_rag_context_token_budget_env
+
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Neighbouring chunks share up to chunk_overlap characters, shorter matches are coincidental
+MIN_OVERLAP_CHARS = 40
+DUPLICATE_SIMILARITY = 0.8
+SHINGLE_SIZE = 3
+# A trimmed chunk shorter than this is not worth sending
+MIN_TRIMMED_TOKENS = 50
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    """
+    Returns the tiktoken encoding of the model, None to estimate tokens from
+    the text length. tiktoken downloads encodings on first use, a failed
+    download is remembered so it isn't retried on every call.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+        except Exception as e:
+            print(f"Could not load tokenizer of {model}: {e}")
+            return None
+    try:
+        # Close enough for other providers, which don't ship a local tokenizer
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Could not load tokenizer, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _find_overlap(first: str, second: str) -> int:
+    """
+    Returns the length of the longest suffix of first that is a prefix of second.
+    """
+    probe = second[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+
+    search_from = max(0, len(first) - len(second))
+    position = first.find(probe, search_from)
+    while position != -1:
+        if second.startswith(first[position:]):
+            return len(first) - position
+        position = first.find(probe, position + 1)
+    return 0
+
+
+def merge_overlapping_chunks(texts: List[str]) -> List[str]:
+    """
+    Joins chunks that continue each other, keeping the position of the
+    earliest (most relevant) one.
+    """
+    merged: List[str] = []
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        for index, existing in enumerate(merged):
+            if text in existing:
+                break
+            if existing in text:
+                merged[index] = text
+                break
+            overlap = _find_overlap(existing, text)
+            if overlap:
+                merged[index] = existing + text[overlap:]
+                break
+            overlap = _find_overlap(text, existing)
+            if overlap:
+                merged[index] = text + existing[overlap:]
+                break
+        else:
+            merged.append(text)
+    return merged
+
+
+def _get_shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {
+        tuple(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def drop_near_duplicates(texts: List[str]) -> List[str]:
+    kept: List[Tuple[str, Set[Tuple[str, ...]]]] = []
+    for text in texts:
+        shingles = _get_shingles(text)
+        is_duplicate = False
+        for _, kept_shingles in kept:
+            union = len(shingles | kept_shingles)
+            if union and len(shingles & kept_shingles) / union >= DUPLICATE_SIMILARITY:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            kept.append((text, shingles))
+    return [text for text, _ in kept]
+
+
+def build_rag_context(
+    documents: List[Document],
+    model: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Builds the prompt context from retrieved documents, in the order the
+    retriever ranked them. Overlapping neighbours are merged, near-duplicates
+    are dropped and the result is trimmed to the token budget.
+    """
+    if token_budget is None:
+        token_budget = int(get_rag_context_token_budget_env() or 3000)
+
+    texts = [document.page_content for document in documents]
+    if not texts:
+        return ""
+
+    tokens_before = count_tokens(CONTEXT_SEPARATOR.join(texts), model)
+    texts = drop_near_duplicates(merge_overlapping_chunks(texts))
+
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR, model)
+    selected: List[str] = []
+    used_tokens = 0
+    for text in texts:
+        available = token_budget - used_tokens
+        if selected:
+            available -= separator_tokens
+
+        text_tokens = count_tokens(text, model)
+        if text_tokens > available:
+            if available >= MIN_TRIMMED_TOKENS:
+                selected.append(truncate_to_tokens(text, available, model))
+            break
+
+        selected.append(text)
+        used_tokens += text_tokens + (separator_tokens if len(selected) > 1 else 0)
+
+    context = CONTEXT_SEPARATOR.join(selected)
+    tokens_after = count_tokens(context, model)
+    print(
+        f"RAG context: {len(documents)} chunks -> {len(selected)} passages, "
+        f"{tokens_after} tokens, saved {tokens_before - tokens_after} tokens"
+    )
+    return context
@@ -69,6 +69,10 @@ def set_kandinsky_api_key_env(value):
     os.environ["KANDINSKY_API_KEY"] = value
 
 
+def set_kandinsky_secret_key_env(value):
+    os.environ["KANDINSKY_SECRET_KEY"] = value
+
+
 def set_pixabay_api_key_env(value):
     os.environ["PIXABAY_API_KEY"] = value
 
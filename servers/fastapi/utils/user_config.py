@@ -24,6 +24,7 @@ from utils.get_env import (
     get_extended_reasoning_env,
     get_web_grounding_env,
     get_kandinsky_api_key_env,
+    get_kandinsky_secret_key_env,
 )
 from utils.parsers import parse_bool_or_none
 from utils.set_env import (
@@ -47,6 +48,7 @@ from utils.set_env import (
     set_tool_calls_env,
     set_web_grounding_env,
     set_kandinsky_api_key_env,
+    set_kandinsky_secret_key_env,
 )
 
 
@@ -81,6 +83,8 @@ def get_user_config():
         PIXABAY_API_KEY=existing_config.PIXABAY_API_KEY or get_pixabay_api_key_env(),
         PEXELS_API_KEY=existing_config.PEXELS_API_KEY or get_pexels_api_key_env(),
         KANDINSKY_API_KEY=existing_config.KANDINSKY_API_KEY or get_kandinsky_api_key_env(),
+        KANDINSKY_SECRET_KEY=existing_config.KANDINSKY_SECRET_KEY
+        or get_kandinsky_secret_key_env(),
         TOOL_CALLS=(
             existing_config.TOOL_CALLS
             if existing_config.TOOL_CALLS is not None
@@ -146,3 +150,5 @@ def update_env_with_user_config():
         set_web_grounding_env(str(user_config.WEB_GROUNDING))
     if user_config.KANDINSKY_API_KEY is not None:
         set_kandinsky_api_key_env(str(user_config.KANDINSKY_API_KEY))
+    if user_config.KANDINSKY_SECRET_KEY is not None:
+        set_kandinsky_secret_key_env(str(user_config.KANDINSKY_SECRET_KEY))
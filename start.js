@@ -62,6 +62,34 @@ const setupNodeModules = () => {
   });
 };
 
+// Precompute icon embeddings before FastAPI starts, so the first icon
+// search doesn't embed every icon. The script skips up-to-date embeddings.
+const buildIconEmbeddings = () => {
+  return new Promise((resolve) => {
+    const buildProcess = spawn(
+      "python",
+      [join(__dirname, "scripts/build_icon_embeddings.py")],
+      {
+        stdio: "inherit",
+        env: process.env,
+      }
+    );
+
+    // FastAPI builds missing embeddings itself, so failures aren't fatal
+    buildProcess.on("error", (err) => {
+      console.error("Icon embeddings build failed to start:", err);
+      resolve();
+    });
+
+    buildProcess.on("exit", (code) => {
+      if (code !== 0) {
+        console.error(`Icon embeddings build failed with exit code: ${code}`);
+      }
+      resolve();
+    });
+  });
+};
+
 process.env.USER_CONFIG_PATH = userConfigPath;
 
 //? UserConfig is only setup if API Keys can be changed
@@ -97,6 +125,8 @@ const setupUserConfigFromEnv = () => {
       process.env.PIXABAY_API_KEY || existingConfig.PIXABAY_API_KEY,
     KANDINSKY_API_KEY:
       process.env.KANDINSKY_API_KEY || existingConfig.KANDINSKY_API_KEY,
+    KANDINSKY_SECRET_KEY:
+      process.env.KANDINSKY_SECRET_KEY || existingConfig.KANDINSKY_SECRET_KEY,
     IMAGE_PROVIDER: process.env.IMAGE_PROVIDER || existingConfig.IMAGE_PROVIDER,
     TOOL_CALLS: process.env.TOOL_CALLS || existingConfig.TOOL_CALLS,
     DISABLE_THINKING:
@@ -203,6 +233,7 @@ const main = async () => {
     setupUserConfigFromEnv();
   }
 
+  await buildIconEmbeddings();
   startServers();
   startNginx();
 };